@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import select
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """Minimal Ollama stand-in that streams a short answer immediately"""
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path in ("/api/tags", "/api/ps"):
+            self._send_json({"models": [{"name": "bench:latest"}]})
+        else:
+            self._send_json({}, 404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for token in ["first", " byte", "\n"]:
+            line = {"response": token, "message": {"role": "assistant", "content": token}, "done": False}
+            self.wfile.write((json.dumps(line) + "\n").encode())
+            self.wfile.flush()
+        self.wfile.write(b'{"done": true}\n')
+
+
+def time_to_first_byte(command, env) -> float:
+    """Seconds from spawning the command to the first byte on its stdout"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    select.select([process.stdout], [], [], 30)
+    first = time.perf_counter() - start
+    process.stdout.read()
+    if process.wait() != 0:
+        raise RuntimeError(process.stderr.read().decode())
+    return first
+
+
+def report(label, samples) -> None:
+    samples = sorted(samples)
+    p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+    print(
+        f"{label:<12} min {samples[0] * 1000:7.1f} ms   "
+        f"median {statistics.median(samples) * 1000:7.1f} ms   p90 {p90 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start to first byte of `onc -p`")
+    parser.add_argument("-n", "--runs", type=int, default=20)
+    parser.add_argument("--daemon", action="store_true", help="Also measure with `onc daemon` running")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(ROOT_DIR / "src"),
+            "ONC_CONFIG": f"{tmp}/config.json",
+            "ONC_OLLAMA__HOST": f"http://127.0.0.1:{server.server_port}",
+            "ONC_HISTORY__SAVE_DIR": f"{tmp}/history",
+            "ONC_DAEMON__SOCKET": f"{tmp}/daemon.sock",
+            "ONC_MODEL": "bench:latest",
+        }
+        command = [sys.executable, "-m", "ollama_nvim_cli", "-p", "hi"]
+
+        # Create the config once so every measured run sees a warm file
+        time_to_first_byte(command + ["--no-daemon"], env)
+        report("direct", [time_to_first_byte(command + ["--no-daemon"], env) for _ in range(args.runs)])
+        # A bare interpreter start, the floor for the other numbers
+        report(
+            "python",
+            [time_to_first_byte([sys.executable, "-c", "print()"], env) for _ in range(args.runs)],
+        )
+
+        if args.daemon:
+            daemon = subprocess.Popen(
+                [sys.executable, "-m", "ollama_nvim_cli", "daemon"], env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                for _ in range(100):
+                    if Path(env["ONC_DAEMON__SOCKET"]).exists():
+                        break
+                    time.sleep(0.05)
+                report("daemon", [time_to_first_byte(command, env) for _ in range(args.runs)])
+            finally:
+                daemon.terminate()
+                daemon.wait()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.recall import EXACT_ROWS, RecallIndex  # noqa: E402
+
+APPEND_ROWS = 10_000
+# Sentence embeddings occupy a low-dimensional part of their space; isotropic noise
+# has no nearest neighbours worth finding and would say nothing about recall
+TOPICS = 64
+
+
+class HistoryDir:
+    """The only part of HistoryManager the index needs for searching"""
+
+    def __init__(self, path: Path):
+        self.history_dir = path
+
+
+def embeddings(rng, topics: np.ndarray, count: int) -> np.ndarray:
+    """Unit vectors mixing a few topic directions with noise"""
+    vectors = rng.standard_normal((count, len(topics)), dtype=np.float32) @ topics * 0.2
+    vectors += rng.standard_normal((count, topics.shape[1]), dtype=np.float32) * 0.3
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def build_index(directory: Path, rows: int, dim: int) -> RecallIndex:
+    """Fill an index through the normal append path, then fit the projection as update() does"""
+    config = Config(directory / "config.json", environ={"ONC_HISTORY__SAVE_DIR": str(directory)})
+    index = RecallIndex(config, None, HistoryDir(directory))
+    rng = np.random.default_rng(0)
+    topics = rng.standard_normal((TOPICS, dim), dtype=np.float32)
+    for start in range(0, rows, APPEND_ROWS):
+        count = min(APPEND_ROWS, rows - start)
+        vectors = embeddings(rng, topics, count)
+        entries = [
+            {"session": "bench", "index": i, "role": "user", "content": f"message {i}"}
+            for i in range(start, start + count)
+        ]
+        index._append(vectors, entries)
+    index._save_meta()
+    if rows > EXACT_ROWS:
+        index._get_coarse()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /recall nearest-neighbour queries")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768, help="768 for nomic-embed-text")
+    parser.add_argument("-n", "--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_index(Path(tmp), args.rows, args.dim)
+        print(f"Built {args.rows:,} x {args.dim} index and projection in {time.perf_counter() - start:.1f}s")
+
+        # A fresh instance, as after a restart: the first query maps the file
+        index = RecallIndex(
+            Config(Path(tmp) / "config.json", environ={"ONC_HISTORY__SAVE_DIR": tmp}), None, HistoryDir(Path(tmp))
+        )
+        # Queries close to stored rows, as a question is close to the turns about it
+        matrix = np.asarray(index._get_matrix())
+        rng = np.random.default_rng(1)
+        queries = matrix[rng.integers(args.rows, size=args.queries + 1)]
+        queries = queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.02
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        start = time.perf_counter()
+        index.nearest(queries[0], args.k)
+        print(f"first query  {(time.perf_counter() - start) * 1000:7.2f} ms (maps the index, reads entries)")
+
+        samples = []
+        found = 0
+        for query in queries[1:]:
+            start = time.perf_counter()
+            results = index.nearest(query, args.k)
+            samples.append(time.perf_counter() - start)
+            exact = np.argpartition(matrix @ query, -args.k)[-args.k:]
+            found += len({result["index"] for result in results} & set(exact.tolist()))
+        samples.sort()
+        p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+        print(
+            f"warm queries median {statistics.median(samples) * 1000:7.2f} ms   "
+            f"p90 {p90 * 1000:7.2f} ms   max {samples[-1] * 1000:7.2f} ms"
+        )
+        print(f"recall@{args.k} against an exact scan: {found / (args.queries * args.k):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import pty
+import select
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+PROMPT_MARKER = b">>"
+TIMEOUT = 30.0
+
+
+def variants():
+    """Every build that exists on disk, as (label, command)"""
+    dist = ROOT_DIR / "dist"
+    found = [("source", [sys.executable, "-m", "ollama_nvim_cli"])]
+    if (dist / "ollama-nvim-cli").is_file():
+        found.append(("onefile", [str(dist / "ollama-nvim-cli")]))
+    if (dist / "ollama-nvim-cli" / "ollama-nvim-cli").is_file():
+        found.append(("onedir", [str(dist / "ollama-nvim-cli" / "ollama-nvim-cli")]))
+    if (dist / "onc.pyz").is_file():
+        found.append(("zipapp", [sys.executable, str(dist / "onc.pyz")]))
+    return found
+
+
+def time_to_prompt(command, env) -> float:
+    """Seconds from spawning onc in a pseudo-terminal until the input prompt is drawn"""
+    leader, follower = pty.openpty()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, env=env, stdin=follower, stdout=follower, stderr=follower, close_fds=True
+    )
+    os.close(follower)
+    output = b""
+    try:
+        while time.perf_counter() - start < TIMEOUT:
+            ready, _, _ = select.select([leader], [], [], TIMEOUT)
+            if not ready:
+                break
+            try:
+                output += os.read(leader, 65536)
+            except OSError:
+                break
+            if PROMPT_MARKER in output:
+                return time.perf_counter() - start
+        raise RuntimeError(f"No prompt from {' '.join(command)}:\n{output.decode(errors='replace')}")
+    finally:
+        process.kill()
+        process.wait()
+        os.close(leader)
+
+
+def time_to_exit(command, env) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "min_ms": samples[0] * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "p90_ms": samples[min(len(samples) - 1, int(len(samples) * 0.9))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time-to-prompt across build variants")
+    parser.add_argument("-n", "--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured runs per variant")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # A fixed, isolated environment so runs are comparable across machines
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "HOME": tmp,
+            "TERM": "xterm-256color",
+            "COLUMNS": "100",
+            "LINES": "40",
+            "PYTHONPATH": str(ROOT_DIR / "src"),
+            "PYTHONHASHSEED": "0",
+            "ONC_CONFIG": f"{tmp}/config.json",
+            "ONC_HISTORY__SAVE_DIR": f"{tmp}/history",
+            "ONC_CONTEXT__CACHE_DIR": f"{tmp}/cache",
+            "ONC_DAEMON__AUTOCONNECT": "false",
+            "ONC_EDITOR": "true",
+            "ONC_MODEL": "bench:latest",
+        }
+
+        for label, command in variants():
+            for _ in range(args.warmup):
+                time_to_prompt(command, env)
+            results[label] = {
+                "prompt": summarize([time_to_prompt(command, env) for _ in range(args.runs)]),
+                "help": summarize([time_to_exit(command + ["--help"], env) for _ in range(args.runs)]),
+            }
+
+    print(f"{'variant':<10}{'to prompt (median / p90)':>28}{'--help (median)':>20}")
+    for label, result in results.items():
+        prompt, help_ = result["prompt"], result["help"]
+        print(
+            f"{label:<10}{prompt['median_ms']:>15.1f} / {prompt['p90_ms']:7.1f} ms"
+            f"{help_['median_ms']:>17.1f} ms"
+        )
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,91 @@
-import PyInstaller.__main__
+import argparse
+import subprocess
+import sys
 from pathlib import Path
 
+MODES = ("onefile", "onedir", "zipapp")
 
-def build_binary():
+# Modules that are never used at runtime but get pulled in by dependency analysis
+EXCLUDED_MODULES = ["tkinter", "unittest", "pydoc", "test", "lib2to3", "PyInstaller"]
+
+
+def build_binary(mode: str = "onefile"):
     # Get the project root directory
     root_dir = Path(__file__).parent.parent
-    entry_point = root_dir / "src" / "ollama_nvim_cli" / "cli.py"
+    entry_point = root_dir / "src" / "ollama_nvim_cli" / "__main__.py"
 
     # Ensure the entry point exists
     if not entry_point.exists():
         raise FileNotFoundError(f"Entry point not found: {entry_point}")
 
+    if mode == "zipapp":
+        build_zipapp(root_dir)
+        return
+
+    import PyInstaller.__main__
+
+    if mode == "onefile":
+        PyInstaller.__main__.run(
+            [
+                "--name=ollama-nvim-cli",
+                "--onefile",
+                "--add-data=src/ollama_nvim_cli:ollama_nvim_cli",
+                "--hidden-import=ollama_nvim_cli",
+                "--hidden-import=ollama_nvim_cli.lib",
+                "--hidden-import=ollama_nvim_cli.prompt",
+                "--hidden-import=ollama_nvim_cli.api",
+                "--hidden-import=ollama_nvim_cli.commands",
+                "--hidden-import=typer",
+                "--hidden-import=rich",
+                "--hidden-import=prompt_toolkit",
+                "--hidden-import=httpx",
+                str(entry_point),
+            ]
+        )
+        return
+
+    # onedir: nothing to unpack at launch, no UPX to decompress, and only the
+    # package's own modules as hidden imports (the source tree is not bundled as data)
     PyInstaller.__main__.run(
         [
             "--name=ollama-nvim-cli",
-            "--onefile",
-            "--add-data=src/ollama_nvim_cli:ollama_nvim_cli",
-            "--hidden-import=ollama_nvim_cli",
-            "--hidden-import=ollama_nvim_cli.lib",
-            "--hidden-import=ollama_nvim_cli.prompt",
-            "--hidden-import=ollama_nvim_cli.api",
-            "--hidden-import=ollama_nvim_cli.commands",
-            "--hidden-import=typer",
-            "--hidden-import=rich",
-            "--hidden-import=prompt_toolkit",
-            "--hidden-import=httpx",
+            "--onedir",
+            "--noupx",
+            "--noconfirm",
+            "--clean",
+            f"--paths={root_dir / 'src'}",
+            "--collect-submodules=ollama_nvim_cli",
+            *(f"--exclude-module={module}" for module in EXCLUDED_MODULES),
             str(entry_point),
         ]
     )
 
 
+def build_zipapp(root_dir: Path):
+    """Build dist/onc.pyz with shiv, bytecode precompiled and extracted once to ~/.shiv"""
+    output = root_dir / "dist" / "onc.pyz"
+    output.parent.mkdir(exist_ok=True)
+    subprocess.run(
+        [
+            sys.executable, "-m", "shiv",
+            "--console-script", "onc",
+            "--output-file", str(output),
+            "--compile-pyc",
+            "--reproducible",
+            "--python", "/usr/bin/env python3",
+            str(root_dir),
+        ],
+        check=True,
+    )
+
+
 if __name__ == "__main__":
-    build_binary()
+    parser = argparse.ArgumentParser(description="Build a distributable ollama-nvim-cli")
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default="onefile",
+        help="onefile: single binary (slowest start); onedir: unpacked PyInstaller "
+        "bundle; zipapp: shiv .pyz with precompiled bytecode",
+    )
+    build_binary(parser.parse_args().mode)
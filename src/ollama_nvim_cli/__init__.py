@@ -1,8 +1,19 @@
-from .prompt.prompt import Prompt
-from .lib.config import Config
-from .lib.history import HistoryManager
-from .api.ollama import OllamaClient
+import importlib
 
 __version__ = "0.1.0"
 
 __all__ = ["Prompt", "Config", "HistoryManager", "OllamaClient"]
+
+# Resolved on first access so `onc -p` does not pay for rich/prompt_toolkit imports
+_exports = {
+    "Prompt": ".prompt.prompt",
+    "Config": ".lib.config",
+    "HistoryManager": ".lib.history",
+    "OllamaClient": ".api.ollama",
+}
+
+
+def __getattr__(name):
+    if name in _exports:
+        return getattr(importlib.import_module(_exports[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,18 @@
+import sys
+
+
+def entry_point() -> None:
+    """Console script entry: dispatch -p to the lightweight path before importing typer"""
+    from ollama_nvim_cli import oneshot
+
+    argv = sys.argv[1:]
+    if oneshot.wants_oneshot(argv):
+        sys.exit(oneshot.main(argv))
+
+    from ollama_nvim_cli.cli import app
+
+    app()
+
+
+if __name__ == "__main__":
+    entry_point()
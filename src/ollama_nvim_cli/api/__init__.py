@@ -1,3 +1,16 @@
-from .ollama import OllamaClient
+import importlib
 
-__all__ = ["OllamaClient"]
+__all__ = ["OllamaClient", "HostPool", "OllamaHost"]
+
+# httpx is only imported when a direct client is actually needed
+_exports = {
+    "OllamaClient": ".ollama",
+    "HostPool": ".hosts",
+    "OllamaHost": ".hosts",
+}
+
+
+def __getattr__(name):
+    if name in _exports:
+        return getattr(importlib.import_module(_exports[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
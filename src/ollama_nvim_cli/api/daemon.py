@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import AsyncGenerator, Dict, List, Optional, Union
+
+# Plain stdlib on purpose: thin clients must not pay for the imports the daemon keeps warm
+CONNECT_TIMEOUT = 0.2
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+def socket_path(config) -> Path:
+    """Where the daemon listens, from daemon.socket or the runtime directory"""
+    configured = config.get("daemon.socket")
+    if configured:
+        return Path(configured).expanduser()
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "ollama-nvim-cli.sock"
+    return Path("~/.cache/ollama-nvim-cli/daemon.sock").expanduser()
+
+
+def ping(path: Path) -> Optional[Dict]:
+    """Synchronously check whether a daemon answers on the socket"""
+    if not path.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.sendall(b'{"op": "ping"}\n')
+            reply = sock.makefile("rb").readline()
+        return json.loads(reply) if reply else None
+    except (OSError, ValueError):
+        return None
+
+
+class DaemonError(Exception):
+    """Raised when the daemon reports an error for a request"""
+
+
+class DaemonClient:
+    def __init__(self, config, path: Optional[Path] = None):
+        """Thin client speaking newline-delimited JSON to a running onc daemon"""
+        self.config = config
+        self.model = config.get("model")
+        self.socket_path = path or socket_path(config)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def _call(self, op: str, **payload) -> AsyncGenerator[Dict, None]:
+        """Send one request and yield reply messages until the daemon marks it done"""
+        reader, writer = await asyncio.open_unix_connection(
+            str(self.socket_path), limit=STREAM_LIMIT
+        )
+        try:
+            writer.write((json.dumps({"op": op, **payload}) + "\n").encode("utf-8"))
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise DaemonError("Daemon closed the connection")
+                message = json.loads(line)
+                if "error" in message:
+                    raise DaemonError(message["error"])
+                yield message
+                if message.get("done"):
+                    return
+        finally:
+            writer.close()
+
+    async def request(self, op: str, **payload) -> Dict:
+        """Send a request that has a single reply"""
+        replies = self._call(op, **payload)
+        try:
+            async for message in replies:
+                return message
+        finally:
+            await replies.aclose()
+        raise DaemonError(f"No reply to '{op}'")
+
+    async def list_models(self) -> List[Dict]:
+        return (await self.request("models"))["models"]
+
+    async def get_model_names(self) -> List[str]:
+        return [model["name"] for model in await self.list_models()]
+
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        reply = await self.request("embed", texts=texts, model=model or self.model)
+        return reply["embeddings"]
+
+    async def generate(
+        self, prompt: str, model: Optional[str] = None, images: Optional[List[str]] = None
+    ) -> AsyncGenerator[str, None]:
+        try:
+            replies = self._call("generate", prompt=prompt, model=model or self.model, images=images)
+            async for message in replies:
+                if message.get("chunk"):
+                    yield message["chunk"]
+        except OSError as e:
+            raise DaemonError(f"Error communicating with onc daemon: {str(e)}")
+
+    async def chat(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        stats: Optional[Dict] = None,
+        format: Union[str, Dict, None] = None,
+        tools: Optional[List[Dict]] = None,
+        tool_calls: Optional[List[Dict]] = None,
+    ) -> AsyncGenerator[str, None]:
+        sent_at = time.perf_counter()
+        try:
+            replies = self._call(
+                "chat", messages=messages, model=model or self.model, format=format, tools=tools
+            )
+            async for message in replies:
+                if message.get("chunk"):
+                    if stats is not None and "ttft" not in stats:
+                        stats["ttft"] = time.perf_counter() - sent_at
+                    yield message["chunk"]
+                if message.get("stats") and stats is not None:
+                    stats.update(message["stats"])
+                if message.get("tool_calls") and tool_calls is not None:
+                    tool_calls.extend(message["tool_calls"])
+        except OSError as e:
+            raise DaemonError(f"Error communicating with onc daemon: {str(e)}")
+
+    async def prewarm(self, messages: List[Dict], model: Optional[str] = None) -> Dict:
+        reply = await self.request("prewarm", messages=messages, model=model or self.model)
+        return reply["stats"]
+
+
+def create_client(config):
+    """Attach to a running daemon when there is one, otherwise talk to Ollama directly"""
+    if config.get("daemon.autoconnect"):
+        path = socket_path(config)
+        if ping(path):
+            return DaemonClient(config, path)
+
+    from .ollama import OllamaClient
+    return OllamaClient(config)
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+HEALTH_TIMEOUT = 2.0
+ROUTING_MODES = ("affinity", "least-loaded")
+
+
+class OllamaHost:
+    def __init__(self, url: str, timeout: float, max_concurrent: int = 2):
+        """Track connection, load and model residency for a single Ollama node"""
+        self.url = url.rstrip("/")
+        self.client = httpx.AsyncClient(base_url=self.url, timeout=timeout)
+        self.healthy = True
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_concurrent = max_concurrent
+        # Created on first use: before Python 3.10 a semaphore binds to the loop current
+        # at construction, and the pool is built before asyncio.run starts the real one
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.available_models: Set[str] = set()
+        self.resident_models: Set[str] = set()
+        self.last_check = 0.0
+
+    def __repr__(self) -> str:
+        return f"OllamaHost({self.url!r}, healthy={self.healthy}, in_flight={self.in_flight})"
+
+    async def check(self) -> bool:
+        """Probe /api/tags and /api/ps and refresh health and model residency"""
+        self.last_check = time.monotonic()
+        try:
+            tags = await self.client.get("/api/tags", timeout=HEALTH_TIMEOUT)
+            tags.raise_for_status()
+            self.available_models = {m["name"] for m in tags.json().get("models", [])}
+
+            # /api/ps is missing on older servers, residency is only a routing hint
+            ps = await self.client.get("/api/ps", timeout=HEALTH_TIMEOUT)
+            if ps.status_code == 200:
+                self.resident_models = {m["name"] for m in ps.json().get("models", [])}
+            self.healthy = True
+        except (httpx.HTTPError, ValueError):
+            self.healthy = False
+        return self.healthy
+
+    @contextmanager
+    def reserve(self):
+        """Count a request against this host for the duration of the block"""
+        self.in_flight += 1
+        try:
+            yield self
+        finally:
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for one of the host's generation slots, beyond which Ollama would only queue"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(1, self.max_concurrent))
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield self
+        finally:
+            self._slots.release()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class HostPool:
+    def __init__(
+        self,
+        urls: List[str],
+        timeout: float = 30,
+        routing: str = "affinity",
+        health_interval: float = 10.0,
+        max_concurrent: int = 2,
+    ):
+        """Route requests over one or more Ollama hosts"""
+        if not urls:
+            raise ValueError("At least one Ollama host is required")
+        if routing not in ROUTING_MODES:
+            raise ValueError(
+                f"Unknown routing mode '{routing}', expected one of: {', '.join(ROUTING_MODES)}"
+            )
+
+        # Keep the configured order, it is the tie-breaker when hosts look equal
+        unique_urls = list(dict.fromkeys(url.rstrip("/") for url in urls))
+        self.hosts = [OllamaHost(url, timeout, max_concurrent) for url in unique_urls]
+        self.routing = routing
+        self.health_interval = health_interval
+
+    @property
+    def primary(self) -> OllamaHost:
+        return self.hosts[0]
+
+    async def refresh(self, force: bool = False) -> None:
+        """Re-check hosts whose last health check is older than the interval"""
+        # A single host has nowhere to fail over to, so skip the extra round trips
+        if len(self.hosts) == 1 and not force:
+            return
+
+        now = time.monotonic()
+        stale = [
+            host for host in self.hosts
+            if force or now - host.last_check >= self.health_interval
+        ]
+        if stale:
+            await asyncio.gather(*(host.check() for host in stale))
+
+    def _sort_key(self, host: OllamaHost, model: Optional[str]):
+        not_resident = model not in host.resident_models
+        not_available = bool(host.available_models) and model not in host.available_models
+        if self.routing == "least-loaded":
+            return (host.in_flight, not_resident, not_available)
+        return (not_resident, not_available, host.in_flight)
+
+    def candidates(self, model: Optional[str] = None) -> List[OllamaHost]:
+        """Return hosts in the order they should be tried for a model"""
+        healthy = [host for host in self.hosts if host.healthy]
+        # With every host marked down, try them all rather than failing outright
+        pool = healthy or list(self.hosts)
+        return sorted(pool, key=lambda host: self._sort_key(host, model))
+
+    def mark_failed(self, host: OllamaHost) -> None:
+        """Take a host out of rotation until its next health check"""
+        host.healthy = False
+        host.last_check = time.monotonic()
+
+    def mark_resident(self, host: OllamaHost, model: str) -> None:
+        host.resident_models.add(model)
+        host.available_models.add(model)
+
+    def status(self) -> List[Dict]:
+        """Snapshot of host state for display"""
+        return [
+            {
+                "url": host.url,
+                "healthy": host.healthy,
+                "in_flight": host.in_flight,
+                "waiting": host.waiting,
+                "resident": sorted(host.resident_models),
+            }
+            for host in self.hosts
+        ]
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(host.aclose() for host in self.hosts))
@@ -1,8 +1,27 @@
-import httpx
 import asyncio
-from typing import List, Dict, AsyncGenerator
+import httpx
+from typing import List, Dict, AsyncGenerator, Optional, Union
 import json
+import time
 from ..lib.config import Config
+from .hosts import HostPool, OllamaHost
+
+GENERATE_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 40,
+}
+
+# Timing fields of a final Ollama response, durations in nanoseconds
+TIMING_FIELDS = ("eval_count", "eval_duration", "prompt_eval_count", "prompt_eval_duration")
+
+
+def timing_stats(chunk: Dict) -> Dict:
+    return {field: chunk[field] for field in TIMING_FIELDS if field in chunk}
+
+
+class OllamaError(Exception):
+    """Raised when no Ollama host could serve a request, or the one serving it failed"""
 
 
 class OllamaClient:
@@ -10,38 +29,65 @@ class OllamaClient:
         """Initialize Ollama client with config"""
         self.config = config
         self.model = config.get("model")
-        
-        if not self.model:
-            # Prompt user for model if not set
-            from rich.prompt import Prompt
-            available_models = ["qwen2.5-coder:latest", "mistral:latest", "llama2:latest"]
-            self.model = Prompt.ask(
-                "Choose a model",
-                choices=available_models,
-                default="qwen2.5-coder:latest"
-            )
-            # Save to config
-            self.config.set("model", self.model)
-        
+
         ollama_config = config.get("ollama", {})
-        self.host = ollama_config.get("host", "http://localhost:11434")
-        self.timeout = ollama_config.get("timeout", 30)
-        self.client = httpx.AsyncClient(base_url=self.host)
-        self._lock = asyncio.Lock()
+        hosts = ollama_config.get("hosts") or [ollama_config["host"]]
+        self.timeout = ollama_config["timeout"]
+        self.pool = HostPool(
+            hosts,
+            timeout=self.timeout,
+            routing=ollama_config["routing"],
+            health_interval=ollama_config["health_interval"],
+            max_concurrent=ollama_config["max_concurrent_per_host"],
+        )
+        self.host = self.pool.primary.url
+        self.client = self.pool.primary.client
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        await self.pool.aclose()
 
     async def list_models(self) -> List[Dict]:
-        """Get list of available models from Ollama"""
-        async with self._lock:
-            async with self.client.get("/api/tags") as response:
-                if response.status_code == 200:
-                    return response.json().get("models", [])
-                return []
+        """Get list of available models from all reachable Ollama hosts"""
+        await self.pool.refresh()
+        models: Dict[str, Dict] = {}
+        for host in self.pool.candidates():
+            try:
+                response = await host.client.get("/api/tags")
+            except httpx.HTTPError:
+                self.pool.mark_failed(host)
+                continue
+            if response.status_code == 200:
+                for model in response.json().get("models", []):
+                    models.setdefault(model["name"], model)
+        return list(models.values())
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a non-streaming request, failing over between hosts"""
+        await self.pool.refresh()
+        last_error = None
+        for host in self.pool.candidates(self.model):
+            try:
+                with host.reserve():
+                    response = await host.client.request(
+                        method, path, timeout=self.timeout, **kwargs
+                    )
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                last_error = e
+                if not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500:
+                    self.pool.mark_failed(host)
+        raise OllamaError(f"Error communicating with Ollama: {str(last_error)}")
+
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embed a batch of texts with /api/embed"""
+        response = await self._request(
+            "POST", "/api/embed", json={"model": model or self.model, "input": texts}
+        )
+        return response.json()["embeddings"]
 
     async def get_model_names(self) -> List[str]:
         """Get list of model names with their tags"""
@@ -52,32 +98,183 @@ class OllamaClient:
     def generate_url(self) -> str:
         return f"{self.host}/api/generate"
 
-    async def generate(self, prompt: str) -> AsyncGenerator[str, None]:
+    async def _stream(
+        self, path: str, data: Dict, extract, stats: Optional[Dict] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream a completion, failing over between hosts until the first token"""
+        model = data["model"]
+        await self.pool.refresh()
+        last_error = None
+        for host in self.pool.candidates(model):
+            started = False
+            try:
+                with host.reserve():
+                    async with host.slot():
+                        sent_at = time.perf_counter()
+                        async with host.client.stream(
+                            "POST", path, json=data, timeout=self.timeout
+                        ) as response:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if line.strip():
+                                    try:
+                                        chunk = json.loads(line)
+                                    except json.JSONDecodeError:
+                                        continue
+                                    if chunk.get("error"):
+                                        # Ollama reports failures after the 200 as a stream line
+                                        raise OllamaError(f"Ollama error: {chunk['error']}")
+                                    text = extract(chunk)
+                                    # Tool calls reach the caller through extract as well,
+                                    # so after them a replay would deliver them twice
+                                    if text or chunk.get("message", {}).get("tool_calls"):
+                                        if not started and stats is not None:
+                                            stats["ttft"] = time.perf_counter() - sent_at
+                                        started = True
+                                    if text:
+                                        yield text
+                                    if chunk.get("done"):
+                                        self.pool.mark_resident(host, model)
+                                        if stats is not None:
+                                            stats.update(timing_stats(chunk))
+                return
+            except httpx.HTTPError as e:
+                last_error = e
+                if started:
+                    # Tokens already reached the caller, replaying elsewhere would duplicate them
+                    break
+                # Fail over before the first token; a 4xx (e.g. model not pulled there) is not a health problem
+                if not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500:
+                    self.pool.mark_failed(host)
+
+        raise OllamaError(f"Error communicating with Ollama: {str(last_error)}")
+
+    async def generate(
+        self, prompt: str, model: Optional[str] = None, images: Optional[List[str]] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream a completion, with base64-encoded images for multimodal models"""
         data = {
-            "model": self.model,
+            "model": model or self.model,
             "prompt": prompt,
             "stream": True,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "top_k": 40,
-            },
+            "options": GENERATE_OPTIONS,
         }
+        if images:
+            data["images"] = images
+        async for text in self._stream("/api/generate", data, lambda chunk: chunk.get("response")):
+            yield text
+
+    async def chat(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        stats: Optional[Dict] = None,
+        format: Union[str, Dict, None] = None,
+        tools: Optional[List[Dict]] = None,
+        tool_calls: Optional[List[Dict]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Stream a reply to a conversation with /api/chat, filling stats when done
+
+        format is "json" or a JSON schema to constrain the output to. With tools, the
+        calls the model makes are appended to tool_calls as they arrive.
+        """
+        data = {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": True,
+            "options": GENERATE_OPTIONS,
+        }
+        if format:
+            data["format"] = format
+        if tools:
+            data["tools"] = tools
+
+        def extract(chunk: Dict) -> Optional[str]:
+            message = chunk.get("message", {})
+            if tool_calls is not None and message.get("tool_calls"):
+                tool_calls.extend(message["tool_calls"])
+            return message.get("content")
+
+        async for text in self._stream("/api/chat", data, extract, stats):
+            yield text
+
+    async def prewarm(self, messages: List[Dict], model: Optional[str] = None) -> Dict:
+        """Prefill a conversation into the KV cache without generating anything"""
+        # Same options as chat(): a different runner configuration would reload the model
+        data = {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": False,
+            "options": {**GENERATE_OPTIONS, "num_predict": 0},
+        }
+        response = await self._request("POST", "/api/chat", json=data)
+        return timing_stats(response.json())
+
+    def model_host(self, url: Optional[str] = None) -> OllamaHost:
+        """The host to manage models on: the one with this URL, or the primary host"""
+        if not url:
+            return self.pool.primary
+        for host in self.pool.hosts:
+            if host.url == url.rstrip("/"):
+                return host
+        raise OllamaError(f"{url} is not one of the configured hosts")
+
+    async def host_models(self) -> Dict[str, List[Dict]]:
+        """Installed models of every host, keyed by host URL"""
+
+        async def tags(host: OllamaHost) -> List[Dict]:
+            try:
+                response = await host.client.get("/api/tags")
+                response.raise_for_status()
+            except httpx.HTTPError:
+                self.pool.mark_failed(host)
+                return []
+            return response.json().get("models", [])
+
+        results = await asyncio.gather(*(tags(host) for host in self.pool.hosts))
+        return {host.url: models for host, models in zip(self.pool.hosts, results)}
+
+    async def running_models(self) -> Dict[str, List[Dict]]:
+        """Models loaded in memory on every host (/api/ps), keyed by host URL"""
+
+        async def ps(host: OllamaHost) -> List[Dict]:
+            try:
+                response = await host.client.get("/api/ps")
+                response.raise_for_status()
+            except httpx.HTTPError:
+                return []
+            return response.json().get("models", [])
+
+        results = await asyncio.gather(*(ps(host) for host in self.pool.hosts))
+        return {host.url: models for host, models in zip(self.pool.hosts, results)}
+
+    async def pull(self, model: str, host: Optional[OllamaHost] = None) -> AsyncGenerator[Dict, None]:
+        """Stream /api/pull progress messages for a model
+
+        Ollama keeps partially downloaded layers, so pulling again resumes them.
+        """
+        target = host or self.pool.primary
+        # Verifying a large layer sends nothing for a long time, only connecting may time out
+        timeout = httpx.Timeout(self.timeout, read=None)
+        async with target.client.stream(
+            "POST", "/api/pull", json={"model": model, "stream": True}, timeout=timeout
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if "error" in message:
+                    raise OllamaError(message["error"])
+                yield message
 
-        try:
-            async with self._lock:
-                async with self.client.stream(
-                    "POST", self.generate_url, json=data, timeout=self.timeout
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            try:
-                                chunk = json.loads(line)
-                                if "response" in chunk:
-                                    yield chunk["response"]
-                            except json.JSONDecodeError:
-                                continue
-        except httpx.HTTPError as e:
-            print(f"Error communicating with Ollama: {str(e)}")
-            yield "[Error communicating with Ollama]"
+    async def delete_model(self, model: str, host: Optional[OllamaHost] = None) -> None:
+        target = host or self.pool.primary
+        response = await target.client.request(
+            "DELETE", "/api/delete", json={"model": model}, timeout=self.timeout
+        )
+        if response.status_code == 404:
+            raise OllamaError(f"Model '{model}' is not installed on {target.url}")
+        response.raise_for_status()
+        target.available_models.discard(model)
+        target.resident_models.discard(model)
@@ -2,21 +2,45 @@ import typer
 from rich.console import Console
 from pathlib import Path
 import asyncio
-from typing import Optional
-from ollama_nvim_cli.lib.config import Config
+import sys
+from typing import List, Optional
+from ollama_nvim_cli.lib.config import Config, ConfigError
 from ollama_nvim_cli.lib.history import HistoryManager
+from ollama_nvim_cli.lib import profiling
 from ollama_nvim_cli.prompt.prompt import Prompt
-from ollama_nvim_cli.api.ollama import OllamaClient
+from ollama_nvim_cli.api.daemon import create_client
+from ollama_nvim_cli.commands.config import config_command
+from ollama_nvim_cli.commands.daemon import daemon_command
+from ollama_nvim_cli.commands.export import export_command
+from ollama_nvim_cli.commands.models import models_app
+from ollama_nvim_cli.commands.stats import stats_command
 
 app = typer.Typer(help="Ollama Chat CLI")
+app.command("config")(config_command)
+app.command("daemon")(daemon_command)
+app.command("export")(export_command)
+app.command("stats")(stats_command)
+app.add_typer(models_app, name="models")
 console = Console()
 
-@app.command()
+@app.callback(invoke_without_command=True)
 def main(
-    model: Optional[str] = typer.Option(None, help="Model to use for chat"),
-    config_file: str = typer.Option(
-        "~/.config/ollama-nvim-cli/config.json",
-        help="Path to config file"
+    ctx: typer.Context,
+    model: Optional[str] = typer.Option(None, help="Model to use for chat (not saved)"),
+    config_file: Optional[str] = typer.Option(
+        None,
+        help="Path to config file [default: ~/.config/ollama-nvim-cli/config.json]"
+    ),
+    prompt: Optional[str] = typer.Option(
+        None,
+        "--prompt",
+        "-p",
+        help="Ask one question, stream the answer to stdout and exit (piped stdin is appended)"
+    ),
+    save: bool = typer.Option(
+        False,
+        "--save",
+        help="Save --model to the config file as the new default"
     ),
     list_sessions: bool = typer.Option(
         False,
@@ -24,17 +48,46 @@ def main(
         "-l",
         help="List recent chat sessions"
     ),
+    trace: Optional[str] = typer.Option(
+        None,
+        "--trace",
+        help="Write timed spans of each turn to this file as Chrome trace-event JSON"
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Run each turn under cProfile and print a per-phase breakdown at exit"
+    ),
+    profile_memory: bool = typer.Option(
+        False,
+        "--profile-memory",
+        help="Track allocations with tracemalloc (slow) and report the largest at exit"
+    ),
+    image: Optional[List[str]] = typer.Option(
+        None,
+        "--image",
+        "-i",
+        help="Attach an image to the first message (repeatable, for multimodal models)"
+    ),
 ) -> None:
     """Start a chat session with an Ollama model"""
+    if ctx.invoked_subcommand:
+        ctx.obj = {"config_file": config_file}
+        return
+
+    if prompt is not None:
+        # Normally intercepted in __main__ before typer is imported
+        from ollama_nvim_cli import oneshot
+        raise typer.Exit(oneshot.main(sys.argv[1:]))
+
     try:
-        # Initialize config with expanded path
-        config = Config(str(Path(config_file).expanduser()))
-        
+        # Command-line values only apply to this run unless --save is given
+        config = Config(config_file)
         if model:
-            config.set("model", model)
+            config.set("model", model, persist=save)
 
         # Ensure history directory is created
-        history_dir = Path(config.get("history", {}).get("save_dir", "~/.local/share/ollama-nvim-cli/history")).expanduser()
+        history_dir = Path(config.get("history.save_dir")).expanduser()
         history_dir.mkdir(parents=True, exist_ok=True)
         
         # Pass the config object, not the Path object
@@ -48,14 +101,26 @@ def main(
                 console.print("[yellow]No previous sessions found[/yellow]")
             return
 
-        ollama_client = OllamaClient(config)
+        if trace or profile or profile_memory:
+            profiling.enable(trace, cprofile=profile, memory=profile_memory)
+
+        # Attaches to a running `onc daemon` when there is one
+        ollama_client = create_client(config)
         prompt = Prompt(config, history_manager, ollama_client)
         
-        asyncio.run(prompt.chat_loop())
+        try:
+            asyncio.run(prompt.chat_loop(image or ()))
+        finally:
+            prompt.close()
+            profiling.tracer.finish(console)
 
+    except ConfigError as e:
+        console.print(f"[red]Config error: {str(e)}[/red]")
+        raise typer.Exit(2)
     except Exception as e:
         console.print(f"[red]Error: {str(e)}[/red]")
         raise typer.Exit(1)
 
+
 if __name__ == "__main__":
     app()
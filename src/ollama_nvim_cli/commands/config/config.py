@@ -1,22 +1,36 @@
 from rich.console import Console
 import typer
+import json
 import os
-from ...lib.config import Config
+from ...lib.config import Config, ConfigError, SCHEMA, coerce
 from ...prompt.editor import Editor
 
 console = Console()
 
 
-def config_command() -> None:
-    """Open and edit configuration file"""
+def config_command(
+    ctx: typer.Context,
+    key: str = typer.Argument(None, help="Config key to show or set, e.g. ollama.host"),
+    value: str = typer.Argument(None, help="New value to save for the key"),
+) -> None:
+    """Show, set or edit the configuration file"""
     try:
-        config = Config()
+        config = Config((ctx.obj or {}).get("config_file"))
 
-        # Try to find available editor
-        editors = ["lvim", "nvim", "vim", "vi"]
+        if key and value is not None:
+            config.set(key, config_value(key, value))
+            config.flush()
+            console.print(f"[green]Saved {key} = {config.get(key)!r}[/green]")
+            return
+        if key:
+            console.print(f"[cyan]{key}:[/cyan] {config.get(key)!r}")
+            return
+
+        # Prefer the configured editor, then fall back to whatever is installed
+        editors = [config.get("editor"), "lvim", "nvim", "vim", "vi"]
         selected_editor = None
         for editor in editors:
-            if os.system(f"which {editor} > /dev/null 2>&1") == 0:
+            if editor and os.system(f"which {editor} > /dev/null 2>&1") == 0:
                 selected_editor = editor
                 break
 
@@ -28,16 +42,26 @@ def config_command() -> None:
 
         # Open config in editor
         editor = Editor(selected_editor)
-        editor.open_file(str(config.config_file))
+        editor.open_file(str(config.config_path))
 
         # Reload and display config
-        config = Config()  # Reload config
+        config.refresh()
         console.print("\n[bold green]Current Configuration:[/bold green]")
-        console.print(f"[cyan]Model:[/cyan] {config.config['model']}")
-        console.print(f"[cyan]Endpoint:[/cyan] {config.config['endpoint']}")
-        console.print(f"[cyan]Editor:[/cyan] {config.config['editor']}")
-        console.print(f"[cyan]History Path:[/cyan] {config.config['history_path']}")
+        console.print(f"[cyan]Model:[/cyan] {config.get('model')}")
+        console.print(f"[cyan]Hosts:[/cyan] {', '.join(config.get('ollama.hosts') or [config.get('ollama.host')])}")
+        console.print(f"[cyan]Editor:[/cyan] {config.get('editor')}")
+        console.print(f"[cyan]History Path:[/cyan] {config.get('history.save_dir')}")
 
-    except Exception as e:
+    except ConfigError as e:
         console.print(f"[red]Error: {str(e)}[/red]")
         raise typer.Exit(1)
+
+
+def config_value(key: str, raw: str):
+    """Parse a command-line value, JSON for structured values and the schema type otherwise"""
+    if key in SCHEMA and not isinstance(SCHEMA[key], (dict, list)):
+        return coerce(key, raw)
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return coerce(key, raw)
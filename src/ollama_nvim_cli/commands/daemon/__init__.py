@@ -0,0 +1,3 @@
+from .daemon import daemon_command
+
+__all__ = ["daemon_command"]
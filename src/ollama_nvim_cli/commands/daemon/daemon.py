@@ -0,0 +1,62 @@
+from rich.console import Console
+import asyncio
+import typer
+from typing import Optional
+from ...lib.config import Config, ConfigError
+from ...api.daemon import DaemonClient, ping, socket_path
+
+console = Console()
+
+
+def daemon_command(
+    ctx: typer.Context,
+    idle_timeout: Optional[float] = typer.Option(
+        None, help="Exit after this many idle seconds, 0 to never exit [default: daemon.idle_timeout]"
+    ),
+    status: bool = typer.Option(False, "--status", help="Show whether a daemon is running"),
+    stop: bool = typer.Option(False, "--stop", help="Stop the running daemon"),
+) -> None:
+    """Run a background daemon that onc clients attach to instead of cold-starting"""
+    try:
+        config = Config((ctx.obj or {}).get("config_file"))
+    except ConfigError as e:
+        console.print(f"[red]Config error: {str(e)}[/red]")
+        raise typer.Exit(2)
+
+    path = socket_path(config)
+    info = ping(path)
+
+    if status:
+        if not info:
+            console.print("[yellow]No daemon running[/yellow]")
+            raise typer.Exit(1)
+        console.print(
+            f"[green]Daemon running[/green] (pid {info['pid']}, up {info['uptime']:.0f}s, "
+            f"{info['requests']} requests, {info['clients']} clients) on {path}"
+        )
+        for host in info["hosts"]:
+            state = "[green]up[/green]" if host["healthy"] else "[red]down[/red]"
+            console.print(f"  {host['url']}: {state}, resident: {', '.join(host['resident']) or '-'}")
+        return
+
+    if stop:
+        if not info:
+            console.print("[yellow]No daemon running[/yellow]")
+            return
+        asyncio.run(DaemonClient(config, path).request("shutdown"))
+        console.print("[green]Daemon stopped[/green]")
+        return
+
+    if info:
+        console.print(f"[yellow]A daemon is already running (pid {info['pid']}) on {path}[/yellow]")
+        raise typer.Exit(1)
+
+    from ...lib.daemon import DaemonServer
+
+    server = DaemonServer(config, path, idle_timeout)
+    console.print(f"[green]onc daemon listening on {path}[/green]")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    console.print("[cyan]onc daemon stopped[/cyan]")
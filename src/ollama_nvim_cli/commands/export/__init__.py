@@ -0,0 +1,3 @@
+from .export import export_command
+
+__all__ = ["export_command"]
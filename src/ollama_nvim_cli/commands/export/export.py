@@ -0,0 +1,88 @@
+from rich.console import Console
+from pathlib import Path
+import sys
+import typer
+from typing import List, Optional
+from ...lib.config import Config, ConfigError
+from ...lib.history import HistoryManager
+from ...lib.export import FORMATS, SUFFIXES, export_file, export_many, export_session, session_name
+
+# Diagnostics go to stderr so an export to stdout can be piped
+console = Console(stderr=True)
+
+DEFAULT_EXPORT_DIR = "onc-export"
+
+
+def find_sessions(history_manager: HistoryManager, names: List[str]) -> List[Path]:
+    """Resolve 'last', 'all', paths and session names (with or without suffix)"""
+    sessions: List[Path] = []
+    for name in names:
+        if name in ("last", "all"):
+            found = history_manager.all_sessions()
+            if not found:
+                raise FileNotFoundError("No saved sessions yet")
+            sessions.extend(found if name == "all" else found[:1])
+            continue
+        candidates = [Path(name).expanduser()] + [
+            history_manager.history_dir / f"{name}{suffix}" for suffix in ("", ".jsonl", ".md")
+        ]
+        path = next((c for c in candidates if c.is_file()), None)
+        if path is None:
+            raise FileNotFoundError(f"No session '{name}' in {history_manager.history_dir}")
+        sessions.append(path)
+    return list(dict.fromkeys(sessions))
+
+
+def export_command(
+    ctx: typer.Context,
+    sessions: Optional[List[str]] = typer.Argument(
+        None, help="Sessions to export: names, paths, 'last' or 'all' [default: last]"
+    ),
+    format: str = typer.Option("md", "--format", "-f", help=f"Output format: {', '.join(FORMATS)}"),
+    output: Optional[str] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help=f"File, or '-' for stdout, for one session; directory for several [default: stdout / ./{DEFAULT_EXPORT_DIR}]",
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", help="Worker processes for exporting several sessions [default: one per CPU]"
+    ),
+) -> None:
+    """Export sessions to HTML, JSONL, OpenAI chat format or clean Markdown"""
+    if format not in FORMATS:
+        console.print(f"[red]Unknown format '{format}', expected one of: {', '.join(FORMATS)}[/red]")
+        raise typer.Exit(2)
+    try:
+        history_manager = HistoryManager(Config((ctx.obj or {}).get("config_file")))
+        paths = find_sessions(history_manager, sessions or ["last"])
+    except ConfigError as e:
+        console.print(f"[red]Config error: {str(e)}[/red]")
+        raise typer.Exit(2)
+    except FileNotFoundError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        raise typer.Exit(1)
+
+    if len(paths) == 1 and not (output and Path(output).is_dir()):
+        if output in (None, "-"):
+            export_session(paths[0], format, sys.stdout)
+            return
+        count = export_file(str(paths[0]), format, output)
+        console.print(f"[green]Exported {count} messages to {output}[/green]")
+        return
+
+    out_dir = Path(output or DEFAULT_EXPORT_DIR)
+    if len(paths) == 1:
+        count = export_file(str(paths[0]), format, str(out_dir / (session_name(paths[0]) + SUFFIXES[format])))
+        console.print(f"[green]Exported {count} messages to {out_dir}[/green]")
+        return
+
+    failed = 0
+    with console.status(f"Exporting {len(paths)} sessions..."):
+        for session, target, count, error in export_many(paths, format, out_dir, jobs):
+            if error:
+                failed += 1
+                console.print(f"[red]{session.name}: {error}[/red]")
+    console.print(f"[green]Exported {len(paths) - failed} sessions to {out_dir}/[/green]")
+    if failed:
+        raise typer.Exit(1)
@@ -0,0 +1,3 @@
+from .models import models_app
+
+__all__ = ["models_app"]
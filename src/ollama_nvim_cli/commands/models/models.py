@@ -0,0 +1,241 @@
+from rich.console import Console
+from rich.progress import BarColumn, DownloadColumn, Progress, TextColumn, TransferSpeedColumn
+from rich.table import Table
+import asyncio
+import time
+import typer
+from typing import Dict, List, Optional
+from ...lib.config import Config, ConfigError
+from ...lib.models import ModelCatalog, PullLimiter, PullState, is_transient, pull_model
+from ...api.ollama import OllamaClient, OllamaError
+
+console = Console()
+models_app = typer.Typer(help="Pull, remove and list Ollama models")
+
+PROGRESS_REFRESH = 0.2
+
+
+def load_config(ctx: typer.Context) -> Config:
+    try:
+        return Config((ctx.obj or {}).get("config_file"))
+    except ConfigError as e:
+        console.print(f"[red]Config error: {str(e)}[/red]")
+        raise typer.Exit(2)
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1e9:.1f} GB" if size >= 1e9 else f"{size / 1e6:.0f} MB"
+
+
+async def fetch_catalog(client: OllamaClient, catalog: ModelCatalog) -> Dict:
+    async with client:
+        return catalog.save(await client.host_models())
+
+
+@models_app.command("ls")
+def list_command(
+    ctx: typer.Context,
+    refresh: bool = typer.Option(False, "--refresh", "-r", help="Ask Ollama instead of using the cached catalog"),
+) -> None:
+    """List installed models (cached, see models.catalog_ttl)"""
+    config = load_config(ctx)
+    catalog = ModelCatalog(config)
+    cached = None if refresh else catalog.load()
+    data = cached or asyncio.run(fetch_catalog(OllamaClient(config), catalog))
+
+    # The same model on several hosts is listed once
+    rows: Dict[str, Dict] = {}
+    for url, models in data["hosts"].items():
+        for model in models:
+            row = rows.setdefault(model["name"], {**model, "hosts": []})
+            row["hosts"].append(url)
+
+    age = time.time() - data["fetched_at"]
+    table = Table(
+        title=f"Models (cached {age:.0f}s ago)" if cached else "Models",
+        show_header=True,
+        border_style="cyan",
+    )
+    table.add_column("Model", style="bold cyan")
+    table.add_column("Size", justify="right")
+    table.add_column("Parameters", justify="right")
+    table.add_column("Quantization")
+    table.add_column("Modified", style="dim")
+    show_hosts = len(data["hosts"]) > 1
+    if show_hosts:
+        table.add_column("Hosts", style="dim")
+    for name, model in sorted(rows.items()):
+        details = model.get("details") or {}
+        row = [
+            name,
+            format_size(model.get("size", 0)),
+            details.get("parameter_size", ""),
+            details.get("quantization_level", ""),
+            (model.get("modified_at") or "")[:10],
+        ]
+        if show_hosts:
+            row.append(", ".join(model["hosts"]))
+        table.add_row(*row)
+    console.print(table)
+
+
+@models_app.command("ps")
+def ps_command(ctx: typer.Context) -> None:
+    """Show models loaded in memory on each host"""
+    client = OllamaClient(load_config(ctx))
+
+    async def running():
+        async with client:
+            return await client.running_models()
+
+    table = Table(title="Loaded models", show_header=True, border_style="cyan")
+    table.add_column("Model", style="bold cyan")
+    table.add_column("Host", style="dim")
+    table.add_column("Size", justify="right")
+    table.add_column("In VRAM", justify="right")
+    table.add_column("Unloads at", style="dim")
+    for url, models in asyncio.run(running()).items():
+        for model in models:
+            size = model.get("size", 0)
+            vram = f"{model.get('size_vram', 0) / size * 100:.0f}%" if size else ""
+            table.add_row(model["name"], url, format_size(size), vram, (model.get("expires_at") or "")[11:19])
+    console.print(table)
+
+
+@models_app.command("rm")
+def remove_command(
+    ctx: typer.Context,
+    names: List[str] = typer.Argument(..., help="Models to remove"),
+    host: Optional[str] = typer.Option(None, "--host", help="Host to remove from [default: the first host]"),
+) -> None:
+    """Remove models from a host"""
+    config = load_config(ctx)
+    client = OllamaClient(config)
+
+    async def remove() -> int:
+        failed = 0
+        async with client:
+            target = client.model_host(host)
+            for name in names:
+                try:
+                    await client.delete_model(name, target)
+                    console.print(f"[green]Removed {name} from {target.url}[/green]")
+                except Exception as e:
+                    failed += 1
+                    console.print(f"[red]{name}: {str(e)}[/red]")
+        return failed
+
+    try:
+        failed = asyncio.run(remove())
+    except OllamaError as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        raise typer.Exit(1)
+    ModelCatalog(config).invalidate()
+    if failed:
+        raise typer.Exit(1)
+
+
+class PullDisplay:
+    def __init__(self, states: List[PullState]):
+        """Progress bars per model and per layer, refreshed from the pull states"""
+        self.states = states
+        self.progress = Progress(
+            TextColumn("{task.description}"),
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            console=console,
+        )
+        self.model_tasks = {id(state): self.progress.add_task(state.model, total=None) for state in states}
+        self.layer_tasks: Dict[tuple, int] = {}
+
+    def update(self) -> None:
+        for state in self.states:
+            status = "[green]done[/green]" if state.done else state.status
+            self.progress.update(
+                self.model_tasks[id(state)],
+                description=f"[bold cyan]{state.model}[/] {status}",
+                completed=state.completed,
+                total=state.total or None,
+            )
+            for digest, (completed, total) in state.layers.items():
+                key = (id(state), digest)
+                if key not in self.layer_tasks:
+                    self.layer_tasks[key] = self.progress.add_task(f"  [dim]{digest[7:19]}[/]", total=total)
+                self.progress.update(self.layer_tasks[key], completed=completed, total=total)
+
+    async def run(self) -> None:
+        while True:
+            self.update()
+            await asyncio.sleep(PROGRESS_REFRESH)
+
+
+@models_app.command("pull")
+def pull_command(
+    ctx: typer.Context,
+    names: Optional[List[str]] = typer.Argument(None, help="Models to pull [default: resume interrupted pulls]"),
+    host: Optional[str] = typer.Option(None, "--host", help="Host to pull to [default: the first host]"),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", help="Most pulls at once [default: models.max_parallel_pulls]"
+    ),
+) -> None:
+    """Pull models concurrently; interrupted pulls resume where they stopped"""
+    config = load_config(ctx)
+    catalog = ModelCatalog(config)
+    client = OllamaClient(config)
+    try:
+        target = client.model_host(host).url
+    except OllamaError as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        raise typer.Exit(2)
+
+    if names:
+        pulls = [{"model": name, "host": target} for name in dict.fromkeys(names)]
+    else:
+        pulls = catalog.pending_pulls()
+        if not pulls:
+            console.print("[yellow]Nothing to resume, usage: onc models pull NAME...[/yellow]")
+            return
+        console.print(f"[cyan]Resuming {', '.join(p['model'] for p in pulls)}[/cyan]")
+
+    states = [PullState(p["model"], p["host"]) for p in pulls]
+    retries = config.get("models.pull_retries")
+
+    async def pull(state: PullState, limiter: PullLimiter) -> None:
+        catalog.start_pull(state.model, state.host)
+        try:
+            await pull_model(client, state, limiter, retries)
+        except Exception as e:
+            state.error = state.error or str(e)
+            # Failures are reported once every pull has finished; only transient ones can resume
+            if is_transient(e):
+                return
+        catalog.finish_pull(state.model, state.host)
+
+    async def pull_all() -> None:
+        display = PullDisplay(states)
+        limiter = PullLimiter(jobs or config.get("models.max_parallel_pulls"))
+        async with client:
+            with display.progress:
+                tasks = [asyncio.create_task(display.run()), asyncio.create_task(limiter.tune())]
+                try:
+                    await asyncio.gather(*(pull(state, limiter) for state in states))
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    display.update()
+
+    try:
+        asyncio.run(pull_all())
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted, run `onc models pull` to resume[/yellow]")
+        raise typer.Exit(130)
+    finally:
+        catalog.invalidate()
+
+    failed = [state for state in states if not state.done]
+    for state in failed:
+        console.print(f"[red]{state.model}: {state.error} (after {state.attempts} attempts)[/red]")
+    if failed:
+        raise typer.Exit(1)
+    console.print(f"[green]Pulled {', '.join(state.model for state in states)}[/green]")
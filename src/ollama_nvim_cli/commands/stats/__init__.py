@@ -0,0 +1,3 @@
+from .stats import stats_command
+
+__all__ = ["stats_command"]
@@ -0,0 +1,79 @@
+from rich.console import Console
+from rich.table import Table
+import typer
+from typing import Optional
+from ...lib.config import Config, ConfigError
+from ...lib.history import HistoryManager
+from ...lib.analytics import HistoryStats
+
+console = Console()
+
+BAR_WIDTH = 40
+
+
+def format_range(values, fmt: str) -> str:
+    """p10 / p50 / p90, or a dash when no message recorded the value"""
+    if values is None:
+        return "-"
+    return " / ".join(format(v, fmt) for v in values)
+
+
+def stats_command(
+    ctx: typer.Context,
+    days: int = typer.Option(14, "--days", "-d", min=1, help="Days shown in the messages-per-day chart"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="Ignore the cache and parse every session again"),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", help="Worker processes for parsing Markdown sessions [default: one per CPU]"
+    ),
+) -> None:
+    """Usage report over all saved sessions: models, latency, tokens/s and activity"""
+    try:
+        history_manager = HistoryManager(Config((ctx.obj or {}).get("config_file")))
+    except ConfigError as e:
+        console.print(f"[red]Config error: {str(e)}[/red]")
+        raise typer.Exit(2)
+
+    stats = HistoryStats(history_manager)
+    with console.status("Reading sessions..."):
+        parsed, reused = stats.refresh(jobs, rebuild)
+    if not len(stats.table):
+        console.print("[yellow]No saved messages yet[/yellow]")
+        return
+
+    table = Table(title="Models", show_header=True, border_style="cyan")
+    table.add_column("Model", style="bold cyan")
+    table.add_column("Sessions", justify="right")
+    table.add_column("Answers", justify="right")
+    table.add_column("Output tokens", justify="right")
+    table.add_column("TTFT s (p10/p50/p90)", justify="right")
+    table.add_column("Tokens/s (p10/p50/p90)", justify="right")
+    for row in stats.model_summary():
+        table.add_row(
+            row["model"],
+            str(row["sessions"]),
+            str(row["answers"]),
+            f"{row['output_tokens']:,}",
+            format_range(row["ttft"], ".2f"),
+            format_range(row["tokens_per_second"], ".1f"),
+        )
+    console.print(table)
+
+    counts, dates = stats.messages_per_day(days)
+    peak = max(int(counts.max()), 1)
+    chart = Table(title=f"Messages per day (last {days})", show_header=False, border_style="cyan")
+    chart.add_column("Date", style="dim")
+    chart.add_column("Count", justify="right")
+    chart.add_column("")
+    for date, count in zip(dates, counts):
+        chart.add_row(str(date), str(count), "[cyan]" + "█" * round(count / peak * BAR_WIDTH) + "[/]")
+    console.print(chart)
+
+    lengths = stats.session_lengths()
+    console.print(
+        f"[bold]Session length[/] (messages): median {lengths['p50']:.0f}, p90 {lengths['p90']:.0f}, "
+        f"p99 {lengths['p99']:.0f}, max {lengths['max']:.0f}, mean {lengths['mean']:.1f}"
+    )
+    console.print(
+        f"[dim]{len(stats.table)} messages in {parsed + reused} sessions "
+        f"({parsed} read, {reused} from cache)[/dim]"
+    )
@@ -1,4 +1,14 @@
-from .config import Config
-from .history import HistoryManager
+import importlib
 
 __all__ = ["Config", "HistoryManager"]
+
+_exports = {
+    "Config": ".config",
+    "HistoryManager": ".history",
+}
+
+
+def __getattr__(name):
+    if name in _exports:
+        return getattr(importlib.import_module(_exports[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
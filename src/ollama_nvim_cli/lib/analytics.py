@@ -0,0 +1,255 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .history import is_jsonl, iter_own_messages, read_header
+
+CACHE_VERSION = 1
+# Below this many Markdown sessions to parse, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 8
+
+# One row per message; NaN marks a value the message does not have
+FLOAT_COLUMNS = ("time", "ttft", "eval_count", "eval_duration", "prompt_eval_count", "prompt_eval_duration")
+INT_COLUMNS = {"session": np.int32, "model": np.int32, "role": np.int8, "chars": np.int64}
+ROLES = {"user": 0, "assistant": 1}
+PERCENTILES = (10, 50, 90)
+
+
+def _timestamp(value) -> float:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return float("nan")
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def message_rows(messages: Iterable[Dict]) -> Dict[str, list]:
+    """Columns for the given messages, as plain lists"""
+    rows: Dict[str, list] = {name: [] for name in ("role", "chars", *FLOAT_COLUMNS)}
+    for message in messages:
+        stats = message.get("stats") or {}
+        rows["role"].append(ROLES.get(message.get("role"), -1))
+        rows["chars"].append(len(message.get("content") or ""))
+        rows["time"].append(_timestamp(message.get("timestamp")))
+        for name in FLOAT_COLUMNS[1:]:
+            rows[name].append(_number(stats.get(name)))
+    return rows
+
+
+def parse_session(path: str, offset: int = 0) -> Tuple[Dict, Dict[str, list], int]:
+    """Read a session's own messages, for JSONL sessions from a byte offset on
+
+    Returns the header, the rows and the offset to continue from on the next run
+    (0 for Markdown sessions, which are read whole). Runs in worker processes.
+    """
+    header = read_header(path)
+    if not is_jsonl(path):
+        return header, message_rows(iter_own_messages(path)), 0
+
+    messages = []
+    with open(path, "rb") as f:
+        if offset:
+            f.seek(offset)
+        else:
+            offset = len(f.readline())
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Still being appended, picked up on the next run
+                break
+            offset += len(line)
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                continue
+    return header, message_rows(messages), offset
+
+
+class MessageTable:
+    def __init__(self, columns: Optional[Dict[str, np.ndarray]] = None):
+        """Every saved message as NumPy columns, see FLOAT_COLUMNS and INT_COLUMNS"""
+        if columns is None:
+            columns = {name: np.empty(0, dtype=np.float64) for name in FLOAT_COLUMNS}
+            columns.update({name: np.empty(0, dtype=dtype) for name, dtype in INT_COLUMNS.items()})
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["time"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def drop_sessions(self, ids: List[int]) -> None:
+        if ids and len(self):
+            keep = ~np.isin(self.columns["session"], ids)
+            self.columns = {name: column[keep] for name, column in self.columns.items()}
+
+    def append(self, session: int, model: int, rows: Dict[str, list]) -> None:
+        count = len(rows["time"])
+        if not count:
+            return
+        new = {name: np.asarray(rows[name], dtype=np.float64) for name in FLOAT_COLUMNS}
+        new["role"] = np.asarray(rows["role"], dtype=np.int8)
+        new["chars"] = np.asarray(rows["chars"], dtype=np.int64)
+        new["session"] = np.full(count, session, dtype=np.int32)
+        new["model"] = np.full(count, model, dtype=np.int32)
+        self.columns = {name: np.concatenate([self.columns[name], new[name]]) for name in self.columns}
+
+
+class HistoryStats:
+    def __init__(self, history_manager):
+        """Message table over all saved sessions, updated incrementally between runs
+
+        Sessions are keyed by mtime and size like the recall index: unchanged ones are
+        reused from the cache, appended JSONL sessions are read from where the last run
+        stopped, and only rewritten or new sessions are parsed whole.
+        """
+        self.history_manager = history_manager
+        self.cache_dir = history_manager.history_dir / ".stats"
+        self.columns_path = self.cache_dir / "columns.npz"
+        self.meta_path = self.cache_dir / "meta.json"
+        self.meta = self._empty_meta()
+        self.table = MessageTable()
+
+    def _empty_meta(self) -> Dict:
+        return {"version": CACHE_VERSION, "models": [], "next_id": 0, "sessions": {}}
+
+    def load(self) -> None:
+        try:
+            meta = json.loads(self.meta_path.read_text())
+            with np.load(self.columns_path) as data:
+                columns = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError):
+            return
+        if meta.get("version") != CACHE_VERSION or set(columns) != {*FLOAT_COLUMNS, *INT_COLUMNS}:
+            return
+        self.meta = meta
+        self.table = MessageTable(columns)
+
+    def save(self) -> None:
+        """Write the columns, then the metadata that refers to them"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / "columns.tmp.npz"
+        np.savez(tmp_path, **self.table.columns)
+        os.replace(tmp_path, self.columns_path)
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.meta))
+        os.replace(tmp_path, self.meta_path)
+
+    def model_code(self, model: Optional[str]) -> int:
+        models = self.meta["models"]
+        model = model or "unknown"
+        if model not in models:
+            models.append(model)
+        return models.index(model)
+
+    def refresh(self, jobs: Optional[int] = None, rebuild: bool = False) -> Tuple[int, int]:
+        """Bring the table up to date, returning (sessions parsed, sessions reused)"""
+        if not rebuild:
+            self.load()
+        cached = self.meta["sessions"]
+        current = {path.name: path for path in self.history_manager.all_sessions()}
+
+        # (name, offset) to parse; offset > 0 continues an appended JSONL session
+        todo: List[Tuple[str, int]] = []
+        dropped = [cached.pop(name)["id"] for name in list(cached) if name not in current]
+        for name, path in current.items():
+            stat = path.stat()
+            entry = cached.get(name)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                continue
+            if entry and entry["offset"] and stat.st_size >= entry["size"]:
+                todo.append((name, entry["offset"]))
+                continue
+            if entry:
+                dropped.append(entry["id"])
+                del cached[name]
+            todo.append((name, 0))
+        self.table.drop_sessions(dropped)
+
+        markdown = [(name, offset) for name, offset in todo if not is_jsonl(name)]
+        results: Dict[str, Tuple[Dict, Dict[str, list], int]] = {}
+        if len(markdown) >= PARALLEL_MIN_FILES:
+            # YAML parsing dominates for legacy sessions, spread it over processes
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                paths = [str(current[name]) for name, _ in markdown]
+                offsets = [offset for _, offset in markdown]
+                results.update(zip((name for name, _ in markdown), pool.map(parse_session, paths, offsets)))
+        for name, offset in todo:
+            if name not in results:
+                results[name] = parse_session(str(current[name]), offset)
+
+        for name, offset in todo:
+            header, rows, end = results[name]
+            entry = cached.get(name)
+            if entry is None:
+                entry = cached[name] = {"id": self.meta["next_id"], "model": self.model_code(header.get("model"))}
+                self.meta["next_id"] += 1
+            stat = current[name].stat()
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, offset=end)
+            self.table.append(entry["id"], entry["model"], rows)
+
+        if todo or dropped:
+            self.save()
+        return len(todo), len(current) - len(todo)
+
+    # Aggregates, computed over the whole table at once
+
+    def model_summary(self) -> List[Dict]:
+        """Per model: sessions, answers, output tokens, TTFT and decode-rate percentiles"""
+        table = self.table
+        answers = table["role"] == ROLES["assistant"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = table["eval_count"] / (table["eval_duration"] / 1e9)
+        rate[~np.isfinite(rate)] = np.nan
+
+        summary = []
+        for code in np.unique(table["model"]):
+            rows = table["model"] == code
+            model_answers = rows & answers
+            ttft = table["ttft"][model_answers]
+            tokens_per_second = rate[model_answers]
+            summary.append({
+                "model": self.meta["models"][code],
+                "sessions": len(np.unique(table["session"][rows])),
+                "answers": int(model_answers.sum()),
+                "output_tokens": int(np.nansum(table["eval_count"][model_answers])),
+                "ttft": _percentiles(ttft),
+                "tokens_per_second": _percentiles(tokens_per_second),
+            })
+        return sorted(summary, key=lambda row: row["answers"], reverse=True)
+
+    def messages_per_day(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Message counts for the last `days` local days, oldest first, and their dates"""
+        offset = datetime.now().astimezone().utcoffset().total_seconds()
+        today = int((datetime.now().timestamp() + offset) // 86400)
+        times = self.table["time"]
+        day = (times[np.isfinite(times)] + offset) // 86400 - (today - days + 1)
+        day = day[(day >= 0) & (day < days)].astype(np.int64)
+        counts = np.bincount(day, minlength=days)
+        dates = np.arange(today - days + 1, today + 1).astype("datetime64[D]")
+        return counts, dates
+
+    def session_lengths(self) -> Dict[str, float]:
+        """Percentiles of messages per session (a branch counts its own messages)"""
+        ids = [entry["id"] for entry in self.meta["sessions"].values()]
+        if not ids:
+            return {}
+        counts = np.bincount(self.table["session"], minlength=self.meta["next_id"])[ids]
+        result = dict(zip((f"p{p}" for p in (50, 90, 99)), np.percentile(counts, (50, 90, 99))))
+        result.update(mean=counts.mean(), max=counts.max())
+        return result
+
+
+def _percentiles(values: np.ndarray) -> Optional[np.ndarray]:
+    values = values[~np.isnan(values)]
+    return np.percentile(values, PERCENTILES) if len(values) else None
@@ -0,0 +1,77 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+FENCE = re.compile(r"^(\s*)(`{3,}|~{3,})\s*([^`\s]*)[^`]*$")
+
+
+def block_hash(code: str) -> str:
+    return hashlib.sha1(code.rstrip().encode("utf-8")).hexdigest()
+
+
+class CodeBlockIndex:
+    def __init__(self):
+        """Fenced code blocks of a response, collected line by line while it streams"""
+        self.blocks: List[Dict] = []
+        self._by_hash: Dict[str, int] = {}
+        self._partial = ""
+        # The open fence: (marker, indent, language, lines)
+        self._open: Optional[tuple] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "CodeBlockIndex":
+        index = cls()
+        index.feed(text)
+        index.finish()
+        return index
+
+    def feed(self, chunk: str) -> None:
+        """Scan complete lines only; a trailing partial line waits for the next chunk"""
+        *lines, self._partial = (self._partial + chunk).split("\n")
+        for line in lines:
+            self._line(line)
+
+    def finish(self) -> None:
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+        if self._open:
+            # Like Markdown, an unclosed fence runs to the end of the text
+            self._close()
+
+    def number_of(self, code: str) -> Optional[int]:
+        """1-based number of the block with this code, as used by /copy and /save"""
+        position = self._by_hash.get(block_hash(code))
+        return position + 1 if position is not None else None
+
+    def get(self, number: int) -> Dict:
+        if not 1 <= number <= len(self.blocks):
+            raise ValueError(
+                f"No code block {number}, the last answer has {len(self.blocks)}"
+                if self.blocks else "The last answer has no code blocks"
+            )
+        return self.blocks[number - 1]
+
+    def _line(self, line: str) -> None:
+        if self._open is None:
+            match = FENCE.match(line)
+            if match and not (match.group(2)[0] == "~" and "`" in line):
+                indent, marker, language = match.groups()
+                self._open = (marker, len(indent), language, [])
+            return
+
+        marker, indent, language, lines = self._open
+        stripped = line.strip()
+        if stripped.startswith(marker[0] * len(marker)) and not stripped.strip(marker[0]):
+            self._close()
+            return
+        # Drop the fence's own indentation from the code, as Markdown does
+        lines.append(line[min(indent, len(line) - len(line.lstrip(" "))):])
+
+    def _close(self) -> None:
+        _, _, language, lines = self._open
+        self._open = None
+        code = "\n".join(lines)
+        digest = block_hash(code)
+        self._by_hash.setdefault(digest, len(self.blocks))
+        self.blocks.append({"language": language or "text", "code": code, "hash": digest})
@@ -1,44 +1,395 @@
 from pathlib import Path
+import atexit
+import copy
 import json
 import os
-from typing import Optional, Any
-from rich.console import Console
-from rich.prompt import Prompt as RichPrompt
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CONFIG_PATH = "~/.config/ollama-nvim-cli/config.json"
+LEGACY_YAML_PATH = "~/.config/ollama-nvim-cli/config.yaml"
+ENV_PREFIX = "ONC_"
+SAVE_DELAY = 0.5
+# Bump when the help text changes, so existing help.md files are rewritten
+HELP_VERSION = 2
+HELP_MARKER = f"<!-- onc help version {HELP_VERSION} -->"
+
+# The schema: every known key with its default, the default's type is the expected type
+DEFAULTS: Dict[str, Any] = {
+    "model": "qwen2.5-coder:latest",
+    "editor": "nvim",
+    "theme": {
+        "user_prompt": "green",
+        "assistant": "blue",
+        "info": "cyan",
+        "warning": "yellow",
+        "error": "red",
+        "code": "monokai",
+    },
+    "ollama": {
+        "host": "http://localhost:11434",
+        "hosts": [],
+        "timeout": 30,
+        "routing": "affinity",
+        "health_interval": 10,
+        "max_concurrent_per_host": 2,
+    },
+    "history": {
+        "save_dir": "~/.local/share/ollama-nvim-cli/history",
+        "max_sessions": 50,
+        "format": "jsonl",
+    },
+    "recall": {
+        "model": "nomic-embed-text",
+        "top_k": 5,
+        "auto_index": True,
+    },
+    "prewarm": {
+        "enabled": True,
+        "idle_delay": 0.8,
+        "refresh_interval": 240.0,
+    },
+    "context": {
+        "chunk_tokens": 1024,
+        "max_tokens": 8192,
+        "workers": 8,
+        "cache_dir": "~/.cache/ollama-nvim-cli/context",
+    },
+    "templates": {
+        "variables": {},
+    },
+    "models": {
+        "max_parallel_pulls": 3,
+        "pull_retries": 5,
+        "catalog_ttl": 300.0,
+        "cache_dir": "~/.cache/ollama-nvim-cli/models",
+    },
+    "images": {
+        "max_dimension": 1344,
+        "max_history_images": 4,
+        "cache_dir": "~/.cache/ollama-nvim-cli/images",
+    },
+    "tools": {
+        "enabled": False,
+        "allow_commands": False,
+        "test_command": "python -m pytest -q",
+        "timeout": 60.0,
+        "workers": 8,
+        "max_rounds": 8,
+        "max_output_chars": 16000,
+    },
+    "daemon": {
+        "socket": "",
+        "idle_timeout": 900,
+        "autoconnect": True,
+    },
+}
+
+# Parsed config files keyed by path, reused while (mtime, size) is unchanged
+_file_cache: Dict[str, Tuple[int, int, dict]] = {}
+
+
+class ConfigError(Exception):
+    """Raised when the config file cannot be read or fails validation"""
+
+
+def _walk_schema(schema: dict, prefix: str = ""):
+    for key, value in schema.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            yield from _walk_schema(value, f"{path}.")
+        else:
+            yield path, value
+
+
+SCHEMA: Dict[str, Any] = dict(_walk_schema(DEFAULTS))
+
+
+def _expected_type(default: Any):
+    if isinstance(default, bool):
+        return bool
+    if isinstance(default, (int, float)):
+        return (int, float)
+    return type(default)
+
+
+def _lookup(data: dict, key: str, default: Any = None) -> Any:
+    current = data
+    for part in key.split("."):
+        if not isinstance(current, dict) or part not in current:
+            return default
+        current = current[part]
+    return current
+
+
+def _assign(data: dict, key: str, value: Any) -> None:
+    *parents, last = key.split(".")
+    current = data
+    for part in parents:
+        current = current.setdefault(part, {})
+    current[last] = value
+
+
+def _assign_copy(key: str, value: Any) -> dict:
+    data: dict = {}
+    _assign(data, key, value)
+    return data
+
+
+def _merge(base: dict, overlay: dict) -> dict:
+    """Deep-merge overlay into a copy of base; None in overlay means "use the default" """
+    merged = dict(base)
+    for key, value in overlay.items():
+        if value is None and key in merged:
+            continue
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def coerce(key: str, raw: str) -> Any:
+    """Convert a string (from the environment or the command line) to the schema type
+
+    Numbers follow the schema, which accepts any number where the default is one:
+    "2.5" is valid for a key whose default is 30.
+    """
+    default = SCHEMA.get(key)
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        try:
+            return int(raw)
+        except ValueError:
+            pass
+        try:
+            return float(raw)
+        except ValueError:
+            raise ConfigError(f"{key}: expected number, got {raw!r}")
+    if isinstance(default, list):
+        return [item.strip() for item in raw.split(",") if item.strip()]
+    return raw
+
+
+def _starts_with(path: Path, line: str) -> bool:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.readline().rstrip("\n") == line
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def validate(data: dict) -> List[str]:
+    """Return a list of problems with the known keys of a config dict"""
+    problems = []
+    for key, default in SCHEMA.items():
+        value = _lookup(data, key)
+        if value is None:
+            continue
+        expected = _expected_type(default)
+        # bool is an int subclass, so reject it explicitly where a number is expected
+        if (expected is not bool and isinstance(value, bool)) or not isinstance(value, expected):
+            type_name = expected.__name__ if isinstance(expected, type) else "number"
+            problems.append(f"{key}: expected {type_name}, got {type(value).__name__}")
+    return problems
+
+
+def _read_file(path: Path) -> dict:
+    """Parse a config file, reusing the cached result while it is unchanged on disk"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return {}
+
+    cached = _file_cache.get(str(path))
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return copy.deepcopy(cached[2])
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"Failed to load config {path}: {str(e)}")
+    if not isinstance(data, dict):
+        raise ConfigError(f"Failed to load config {path}: expected a JSON object")
+
+    _file_cache[str(path)] = (stat.st_mtime_ns, stat.st_size, data)
+    return copy.deepcopy(data)
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    """Write through a temp file in the same directory and rename it over the target"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_legacy_yaml(path: Path) -> dict:
+    """Translate the old YAML config (endpoint/history_path keys) to the current layout"""
+    import yaml
+
+    with open(path) as f:
+        legacy = yaml.safe_load(f) or {}
+
+    data: Dict[str, Any] = {}
+    for key in ("model", "editor", "theme"):
+        if legacy.get(key):
+            data[key] = legacy[key]
+    if legacy.get("endpoint"):
+        _assign(data, "ollama.host", legacy["endpoint"])
+    if legacy.get("history_path"):
+        _assign(data, "history.save_dir", legacy["history_path"])
+    return data
 
-console = Console()
 
 class Config:
-    def __init__(self, config_path: Path | str = "~/.config/ollama-nvim-cli/config.json"):
-        """Initialize config with path"""
+    def __init__(
+        self,
+        config_path: Optional[Path | str] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+        environ: Optional[Dict[str, str]] = None,
+    ):
+        """Initialize config with path
+
+        Values are layered as defaults < config file < environment < overrides.
+        Only values changed with set() are written back to the file.
+        """
+        if config_path is None:
+            config_path = os.environ.get(f"{ENV_PREFIX}CONFIG", DEFAULT_CONFIG_PATH)
         if isinstance(config_path, str):
             config_path = Path(config_path).expanduser()
-        
+
         self.config_path = config_path
         self.config_dir = self.config_path.parent
+        self._environ = os.environ if environ is None else environ
+        self._overrides: Dict[str, Any] = {}
+        self._merged: Optional[dict] = None
+        self._mtime: Optional[int] = None
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+
         self._ensure_config_dir()
-        self._config = self._load_config()
-        self._validate_and_fix_config()
+        self._file_data = self._load_config()
+        for key, value in (overrides or {}).items():
+            self.override(key, value)
+        atexit.register(self.flush)
 
     def __getitem__(self, key: str) -> Any:
         """Allow dictionary-style access to config"""
-        return self._config[key]
+        value = _lookup(self.data, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    @property
+    def data(self) -> dict:
+        """The effective config with every layer applied"""
+        if self._merged is None:
+            merged = copy.deepcopy(_merge(DEFAULTS, self._file_data))
+            for key, value in self._env_overrides().items():
+                _assign(merged, key, value)
+            for key, value in self._overrides.items():
+                _assign(merged, key, value)
+            self._merged = merged
+        return self._merged
 
     def get(self, key: str, default: Any = None) -> Any:
-        """Get a config value with a default"""
-        return self._config.get(key, default)
+        """Get a config value with a default, dotted keys reach into sections"""
+        value = _lookup(self.data, key)
+        return default if value is None else value
+
+    def set(self, key: str, value: Any, persist: bool = True) -> None:
+        """Set a config value, saving it to the file unless persist is False"""
+        problems = validate(_assign_copy(key, value))
+        if problems:
+            raise ConfigError("; ".join(problems))
+        if not persist:
+            self.override(key, value)
+            return
+
+        self._overrides.pop(key, None)
+        _assign(self._file_data, key, value)
+        self._merged = None
+        self._schedule_save()
+
+    def override(self, key: str, value: Any) -> None:
+        """Set a value for this process only"""
+        if isinstance(value, str) and key in SCHEMA:
+            value = coerce(key, value)
+        problems = validate(_assign_copy(key, value))
+        if problems:
+            raise ConfigError("; ".join(problems))
+        self._overrides[key] = value
+        self._merged = None
+
+    def _env_overrides(self) -> Dict[str, Any]:
+        """Read ONC_<SECTION>__<KEY> variables, plus Ollama's own OLLAMA_HOST"""
+        values = {}
+        if self._environ.get("OLLAMA_HOST"):
+            host = self._environ["OLLAMA_HOST"]
+            values["ollama.host"] = host if "://" in host else f"http://{host}"
+        for name, raw in self._environ.items():
+            if not name.startswith(ENV_PREFIX) or name == f"{ENV_PREFIX}CONFIG":
+                continue
+            key = name[len(ENV_PREFIX):].lower().replace("__", ".")
+            if key in SCHEMA:
+                try:
+                    values[key] = coerce(key, raw)
+                except ConfigError:
+                    raise ConfigError(f"Invalid value for {name}: {raw!r}")
+        return values
+
+    def refresh(self) -> bool:
+        """Reload the file if it changed on disk; returns True if it did"""
+        try:
+            mtime = self.config_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._file_data = self._load_config()
+        self._merged = None
+        return True
 
-    def set(self, key: str, value: Any) -> None:
-        """Set a config value"""
-        self._config[key] = value
-        self._save_config()
+    def _schedule_save(self) -> None:
+        """Debounce writes so bursts of set() calls cost a single write"""
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self) -> None:
+        """Write pending changes now"""
+        with self._save_lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self._save_config()
+            self._dirty = False
 
     def _save_config(self) -> None:
-        """Save current config to file"""
+        """Save the file layer to disk atomically"""
         try:
-            with open(self.config_path, "w") as f:
-                json.dump(self._config, f, indent=4)
+            _atomic_write(self.config_path, json.dumps(self._file_data, indent=4))
+            self._mtime = self.config_path.stat().st_mtime_ns
         except Exception as e:
-            raise Exception(f"Failed to save config: {str(e)}")
+            raise ConfigError(f"Failed to save config: {str(e)}")
 
     def _ensure_config_dir(self) -> None:
         """Ensure config directory exists with all necessary files"""
@@ -46,9 +397,9 @@ class Config:
             # Create config directory if it doesn't exist
             self.config_dir.mkdir(parents=True, exist_ok=True)
 
-            # Create help.md if it doesn't exist
+            # Create help.md, or rewrite it when it was written for an older version
             help_file = self.config_dir / "help.md"
-            if not help_file.exists():
+            if not _starts_with(help_file, HELP_MARKER):
                 self._create_help_file(help_file)
 
             # Create templates directory if it doesn't exist
@@ -61,27 +412,52 @@ class Config:
                 self._create_default_template(default_template)
 
         except Exception as e:
-            raise Exception(f"Failed to initialize config directory: {str(e)}")
+            raise ConfigError(f"Failed to initialize config directory: {str(e)}")
 
     def _create_help_file(self, help_file: Path) -> None:
         """Create default help.md file"""
-        help_content = """# Ollama Chat Help
+        help_content = HELP_MARKER + """
+# Ollama Chat Help
 
 ## Keyboard Shortcuts
 - `Ctrl+H` or `F1`: Show this help
 - `Ctrl+I`: Edit current prompt in editor
+- `Ctrl+R`: Fuzzy search prompt history (Esc cancels)
 - `Esc, E`: Edit last AI response in editor
 - `Esc, S`: Show session picker
 - `Ctrl+D` or `Ctrl+C`: Exit with statistics
 
 ## Commands
-- `/template <name>`: Load template from templates directory
+- `/template <name>`: Load template from templates directory (`/template off` to stop)
+- `/recall <query>`: Add relevant turns from past sessions to the next message
+- `/add <path|glob>`: Attach files or directories as context
+- `/drop [path]`: Detach one or all attachments
+- `/copy [N]`: List the code blocks of the last answer, or copy block N to the clipboard
+- `/save N <path>`: Write code block N of the last answer to a file
+- `/image [path|clear]`: Attach an image to your next message (for multimodal models such as
+  llava), or list the attached ones
+- `/json [schema|off]`: Answer in JSON, optionally matching a schema (inline JSON, a file,
+  or a name in `schemas/`); invalid output is stopped as soon as it goes wrong
+- `/tools [on|off]`: Let the model read files, grep and run the tests (and shell commands
+  with `tools.allow_commands`); the calls of one answer run in parallel
+- `/tab [new | N | close [N]]`: List tabs, open one, switch to or close one; answers are
+  generated in the background so you can keep typing in another tab
+- `/fork`: Continue in a branch of this session, the original stays as it is
+- `/rewind [N]`: Branch off before your last N messages to try a different follow-up
+- `/branch [n]`: List the branches of this session, or switch to branch n
 - `/clear`: Clear current session
 - `/exit` or `/quit`: Exit chat
 - `/help`: Show this help
 
+## Templates
+Templates are `templates/*.md` files next to the config. `{question}`, `{context}`,
+`{model}`, `{date}` and `{cwd}` are filled in, `{> name}` includes another template
+and `{{`/`}}` produce literal braces. Edits are picked up without restarting.
+
 ## Configuration
 Config file is located at: ~/.config/ollama-nvim-cli/config.json
+Any key can be overridden for one run with `ONC_<SECTION>__<KEY>`, e.g. `ONC_OLLAMA__HOST`.
+This file is rewritten when onc updates its help, so keep notes elsewhere.
 """
         help_file.write_text(help_content)
 
@@ -95,86 +471,31 @@ Question: {question}"""
         template_file.write_text(default_content)
 
     def _load_config(self) -> dict:
-        """Load config from file or create default"""
+        """Load and validate the config file, creating it on first run"""
         if not self.config_path.exists():
             self._create_default_config()
-        
+
+        data = _read_file(self.config_path)
+        problems = validate(data)
+        if problems:
+            raise ConfigError(f"Invalid config {self.config_path}: " + "; ".join(problems))
         try:
-            with open(self.config_path) as f:
-                return json.load(f)
-        except Exception as e:
-            raise Exception(f"Failed to load config: {str(e)}")
+            self._mtime = self.config_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._mtime = None
+        return data
 
     def _create_default_config(self) -> None:
-        """Create default config file"""
-        default_config = {
-            "model": None,  # Will be prompted
-            "editor": None,  # Will be prompted
-            "theme": {
-                "user_prompt": "green",
-                "assistant": "blue",
-                "info": "cyan",
-                "warning": "yellow",
-                "error": "red"
-            },
-            "ollama": {
-                "host": None,  # Will be prompted
-                "timeout": 30
-            },
-            "history": {
-                "save_dir": None,  # Will be prompted
-                "max_sessions": 50
-            }
-        }
+        """Create default config file, importing the old YAML config if there is one"""
+        data = copy.deepcopy(DEFAULTS)
+        legacy_path = Path(LEGACY_YAML_PATH).expanduser()
+        if legacy_path.exists():
+            try:
+                data = _merge(data, _read_legacy_yaml(legacy_path))
+            except Exception:
+                pass
 
         try:
-            with open(self.config_path, "w") as f:
-                json.dump(default_config, f, indent=4)
+            _atomic_write(self.config_path, json.dumps(data, indent=4))
         except Exception as e:
-            raise Exception(f"Failed to create default config: {str(e)}")
-
-    def _validate_and_fix_config(self) -> None:
-        """Validate required settings and prompt user for missing ones"""
-        required_settings = {
-            "model": {
-                "prompt": "Enter the model name (e.g., qwen2.5-coder:latest): ",
-                "default": "qwen2.5-coder:latest"
-            },
-            "ollama.host": {
-                "prompt": "Enter Ollama host URL: ",
-                "default": "http://localhost:11434"
-            },
-            "editor": {
-                "prompt": "Enter preferred editor (nvim, vim, etc.): ",
-                "default": "nvim"
-            },
-            "history.save_dir": {
-                "prompt": "Enter history save directory: ",
-                "default": "~/.local/share/ollama-nvim-cli/history"
-            }
-        }
-
-        changed = False
-        for setting, options in required_settings.items():
-            keys = setting.split('.')
-            current = self._config
-            
-            # Check nested keys
-            for key in keys[:-1]:
-                if key not in current:
-                    current[key] = {}
-                current = current[key]
-            
-            last_key = keys[-1]
-            if last_key not in current or not current[last_key]:
-                console.print(f"[yellow]Missing or invalid setting: {setting}[/yellow]")
-                value = RichPrompt.ask(
-                    options["prompt"],
-                    default=options["default"]
-                )
-                current[last_key] = value
-                changed = True
-
-        if changed:
-            self._save_config()
-            console.print("[green]Configuration updated successfully![/green]")
+            raise ConfigError(f"Failed to create default config: {str(e)}")
@@ -0,0 +1,328 @@
+import codecs
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+BINARY_SNIFF_BYTES = 8192
+READ_BLOCK_BYTES = 64 * 1024
+ALWAYS_SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv"}
+# Files whose chunks stay in memory, least recently used dropped first
+CACHED_FILES = 256
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for budgeting, about four characters per token"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class GitIgnore:
+    def __init__(self, base_dir: Path, patterns: List[str]):
+        """Matcher for the patterns of a single .gitignore file"""
+        self.base_dir = base_dir
+        self.rules: List[Tuple[str, bool, bool, bool]] = []
+        for line in patterns:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.strip("/") if dir_only else line
+            anchored = "/" in line.lstrip("/") or line.startswith("/")
+            self.rules.append((line.lstrip("/"), negate, dir_only, anchored))
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["GitIgnore"]:
+        gitignore = directory / ".gitignore"
+        if not gitignore.is_file():
+            return None
+        return cls(directory, gitignore.read_text(errors="replace").splitlines())
+
+    def match(self, path: Path, is_dir: bool) -> Optional[bool]:
+        """Return True/False if a rule decides the path, None if no rule applies"""
+        rel_path = path.relative_to(self.base_dir).as_posix()
+        result = None
+        for pattern, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = rel_path if anchored else path.name
+            if fnmatch.fnmatch(target, pattern) or (
+                anchored and pattern.startswith("**/") and fnmatch.fnmatch(path.name, pattern[3:])
+            ):
+                result = not negate
+        return result
+
+
+class ContextLoader:
+    def __init__(self, config):
+        """Read files into token-budgeted chunks with a persistent content-hash cache"""
+        context_config = config.get("context", {})
+        self.chunk_tokens = context_config.get("chunk_tokens", 1024)
+        self.max_tokens = context_config.get("max_tokens", 8192)
+        self.workers = context_config.get("workers", 8)
+        self.cache_dir = Path(
+            context_config.get("cache_dir", "~/.cache/ollama-nvim-cli/context")
+        ).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._index_path = self.cache_dir / "index.json"
+        self._index: Dict[str, List] = self._load_index()
+        self._index_dirty = False
+        # (path, mtime_ns, size) -> (chunks, complete)
+        self._chunks: "OrderedDict[Tuple[str, int, int], Tuple[List[str], bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, List]:
+        try:
+            return json.loads(self._index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        with self._lock:
+            if not self._index_dirty:
+                return
+            tmp_path = self._index_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._index))
+            os.replace(tmp_path, self._index_path)
+            self._index_dirty = False
+
+    def resolve(self, target: str) -> List[Path]:
+        """Expand a path, directory or glob into the files it covers"""
+        expanded = os.path.expanduser(target)
+        if glob.has_magic(expanded):
+            paths = [Path(p) for p in sorted(glob.glob(expanded, recursive=True))]
+            if not paths:
+                raise FileNotFoundError(f"No files match '{target}'")
+        else:
+            paths = [Path(expanded)]
+
+        files: List[Path] = []
+        for path in paths:
+            if path.is_dir():
+                files.extend(self._walk(path.resolve()))
+            elif path.is_file():
+                files.append(path.resolve())
+        if not files and not paths[0].exists():
+            raise FileNotFoundError(f"No files match '{target}'")
+        return files
+
+    def _walk(self, root: Path) -> List[Path]:
+        """Walk a directory, honouring every .gitignore on the way down"""
+        files = []
+        ignores: Dict[str, List[GitIgnore]] = {}
+
+        # Pick up .gitignore files above the root up to the repository top level
+        inherited = []
+        for parent in [root, *root.parents]:
+            gitignore = GitIgnore.load(parent)
+            if gitignore:
+                inherited.insert(0, gitignore)
+            if (parent / ".git").exists():
+                break
+        ignores[str(root)] = inherited
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            current = Path(dirpath)
+            active = list(ignores.get(dirpath, []))
+            if current != root:
+                gitignore = GitIgnore.load(current)
+                if gitignore:
+                    active.append(gitignore)
+
+            kept_dirs = []
+            for name in sorted(dirnames):
+                if name in ALWAYS_SKIP_DIRS or self._ignored(current / name, True, active):
+                    continue
+                kept_dirs.append(name)
+                ignores[str(current / name)] = active
+            dirnames[:] = kept_dirs
+
+            for name in sorted(filenames):
+                path = current / name
+                if name != ".gitignore" and not self._ignored(path, False, active):
+                    files.append(path)
+        return files
+
+    @staticmethod
+    def _ignored(path: Path, is_dir: bool, ignores: List[GitIgnore]) -> bool:
+        ignored = False
+        for gitignore in ignores:
+            decision = gitignore.match(path, is_dir)
+            if decision is not None:
+                ignored = decision
+        return ignored
+
+    def _read_chunks(self, path: Path, limit: Optional[int] = None) -> Tuple[Optional[str], List[str]]:
+        """Stream a file into chunks, returning its digest (None for binaries)
+
+        With a limit, reading stops once the chunks hold that many characters; the
+        digest is then None too, as it does not cover the whole file.
+        """
+        chunk_chars = self.chunk_tokens * CHARS_PER_TOKEN
+        read = 0
+        chunks: List[str] = []
+        current: List[str] = []
+        size = 0
+
+        def add(line: str) -> None:
+            nonlocal current, size, read
+            read += len(line)
+            if size + len(line) > chunk_chars and current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            # Hard-split lines that are longer than a whole chunk (minified files)
+            while len(line) > chunk_chars:
+                chunks.append(line[:chunk_chars])
+                line = line[chunk_chars:]
+            current.append(line)
+            size += len(line)
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        digest = hashlib.sha256()
+        pending = ""
+        with open(path, "rb") as f:
+            block = f.read(BINARY_SNIFF_BYTES)
+            if b"\0" in block:
+                return None, []
+            while block:
+                digest.update(block)
+                *lines, pending = (pending + decoder.decode(block)).split("\n")
+                for line in lines:
+                    add(line + "\n")
+                # pending counts as well: a minified file may have no newline at all
+                if limit is not None and read + len(pending) >= limit:
+                    break
+                block = f.read(READ_BLOCK_BYTES)
+            else:
+                pending += decoder.decode(b"", final=True)
+                if pending:
+                    add(pending)
+                if current:
+                    chunks.append("".join(current))
+                return digest.hexdigest(), chunks
+
+        if pending and read < limit:
+            add(pending[:limit - read])
+        if current:
+            chunks.append("".join(current))
+        return None, chunks
+
+    def _remember(self, key: Tuple[str, int, int], chunks: List[str], complete: bool) -> None:
+        with self._lock:
+            self._chunks[key] = (chunks, complete)
+            self._chunks.move_to_end(key)
+            while len(self._chunks) > CACHED_FILES:
+                self._chunks.popitem(last=False)
+
+    def _chunk_file(self, path: Path) -> Tuple[List[str], bool]:
+        """Return the chunks for a file and whether they cover all of it
+
+        Only the first max_tokens of a file can ever be used, so a larger file is read
+        that far and kept in memory only; smaller ones are also cached on disk by content.
+        """
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._chunks:
+                self._chunks.move_to_end(key)
+                return self._chunks[key]
+
+        limit = (self.max_tokens + self.chunk_tokens) * CHARS_PER_TOKEN
+        cached = self._index.get(key[0])
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            digest = cached[2]
+            if digest is None:
+                return [], True
+            chunk_file = self.cache_dir / f"{digest}.json"
+            if chunk_file.exists():
+                chunks = json.loads(chunk_file.read_text())
+                self._remember(key, chunks, True)
+                return chunks, True
+
+        digest, chunks = self._read_chunks(path, limit)
+        if digest is None and chunks:
+            # Cut short at the limit: no digest to cache it under on disk
+            self._remember(key, chunks, False)
+            return chunks, False
+        if digest is not None:
+            chunk_file = self.cache_dir / f"{digest}.json"
+            if not chunk_file.exists():
+                chunk_file.write_text(json.dumps(chunks))
+        self._remember(key, chunks, True)
+        with self._lock:
+            self._index[key[0]] = [stat.st_mtime_ns, stat.st_size, digest]
+            self._index_dirty = True
+        return chunks, True
+
+    def load(self, targets: List[str]) -> Tuple[List[str], List[str]]:
+        """Load targets into context blocks within the token budget
+
+        Returns the blocks and a list of warnings for skipped content.
+        """
+        warnings = []
+        files: List[Path] = []
+        for target in targets:
+            try:
+                files.extend(self.resolve(target))
+            except OSError as e:
+                warnings.append(str(e))
+        files = list(dict.fromkeys(files))
+
+        blocks, used = [], 0
+        cwd = Path.cwd()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Files are read at most `workers` ahead of the one being added, so
+            # nothing far past the point where the budget runs out is chunked
+            remaining = iter(files)
+            pending = deque()
+            for path in remaining:
+                pending.append((path, executor.submit(self._safe_chunk_file, path)))
+                if len(pending) >= self.workers:
+                    break
+
+            while pending:
+                path, future = pending.popleft()
+                chunks, complete, error = future.result()
+                for path_ahead in remaining:
+                    pending.append((path_ahead, executor.submit(self._safe_chunk_file, path_ahead)))
+                    break
+                if error:
+                    warnings.append(f"{path}: {error}")
+                    continue
+                try:
+                    label = path.relative_to(cwd)
+                except ValueError:
+                    label = path
+                for i, chunk in enumerate(chunks, 1):
+                    tokens = estimate_tokens(chunk)
+                    if used + tokens > self.max_tokens:
+                        warnings.append(
+                            f"Context budget of {self.max_tokens} tokens reached, "
+                            f"skipped the rest from {label}"
+                        )
+                        for _, future in pending:
+                            future.cancel()
+                        pending.clear()
+                        break
+                    total = f"/{len(chunks)}" if complete else ""
+                    part = f" (part {i}{total})" if len(chunks) > 1 or not complete else ""
+                    blocks.append(f"File: {label}{part}\n```{path.suffix.lstrip('.')}\n{chunk}\n```")
+                    used += tokens
+        self._save_index()
+        return blocks, warnings
+
+    def _safe_chunk_file(self, path: Path) -> Tuple[List[str], bool, Optional[str]]:
+        try:
+            return (*self._chunk_file(path), None)
+        except OSError as e:
+            return [], True, str(e)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..api.daemon import STREAM_LIMIT, ping, socket_path
+from ..api.ollama import OllamaClient
+from .history import HistoryManager
+from .templates import TemplateManager
+
+CATALOG_TTL = 60.0
+SESSION_INDEX_TTL = 5.0
+IDLE_CHECK_INTERVAL = 5.0
+
+
+class DaemonServer:
+    def __init__(self, config, path: Optional[Path] = None, idle_timeout: Optional[float] = None):
+        """Keep warm clients, catalogs and templates in memory for thin onc clients"""
+        self.config = config
+        self.socket_path = path or socket_path(config)
+        self.idle_timeout = config.get("daemon.idle_timeout") if idle_timeout is None else idle_timeout
+
+        self.client = OllamaClient(config)
+        self.history_manager = HistoryManager(config)
+        self.templates = TemplateManager(config.config_dir / "templates")
+
+        self._catalog: List[Dict] = []
+        self._catalog_time = 0.0
+        self._sessions: List[str] = []
+        self._sessions_time = 0.0
+
+        self.started_at = time.time()
+        self.active_clients = 0
+        self.requests_served = 0
+        self.last_activity = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped = asyncio.Event()
+
+    async def models(self) -> List[Dict]:
+        """Model catalog, refreshed from Ollama at most once per CATALOG_TTL"""
+        if not self._catalog or time.monotonic() - self._catalog_time > CATALOG_TTL:
+            self._catalog = await self.client.list_models()
+            self._catalog_time = time.monotonic()
+        return self._catalog
+
+    def sessions(self) -> List[str]:
+        """Saved sessions, most recent first, rescanned at most once per SESSION_INDEX_TTL"""
+        if time.monotonic() - self._sessions_time > SESSION_INDEX_TTL:
+            self._sessions = [str(p) for p in self.history_manager.all_sessions()]
+            self._sessions_time = time.monotonic()
+        return self._sessions
+
+    def status(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "clients": self.active_clients,
+            "requests": self.requests_served,
+            "hosts": self.client.pool.status(),
+        }
+
+    async def handle_request(self, request: Dict, send) -> None:
+        """Dispatch one request; every reply sequence ends with a message marked done"""
+        op = request.get("op")
+        if op == "ping":
+            await send({**self.status(), "done": True})
+        elif op == "models":
+            await send({"models": await self.models(), "done": True})
+        elif op == "sessions":
+            await send({"sessions": self.sessions(), "done": True})
+        elif op == "embed":
+            embeddings = await self.client.embed(request["texts"], model=request.get("model"))
+            await send({"embeddings": embeddings, "done": True})
+        elif op == "render":
+            text = self.templates.render(request["template"], request.get("variables", {}))
+            await send({"text": text, "done": True})
+        elif op == "generate":
+            replies = self.client.generate(
+                request["prompt"], model=request.get("model"), images=request.get("images")
+            )
+            async for chunk in replies:
+                await send({"chunk": chunk})
+            await send({"done": True})
+        elif op == "chat":
+            stats: Dict = {}
+            tool_calls: List[Dict] = []
+            replies = self.client.chat(
+                request["messages"],
+                model=request.get("model"),
+                stats=stats,
+                format=request.get("format"),
+                tools=request.get("tools"),
+                tool_calls=tool_calls,
+            )
+            async for chunk in replies:
+                await send({"chunk": chunk})
+            # The client measures its own time to first token
+            stats.pop("ttft", None)
+            # Tools run on the client, in its working directory
+            await send({"stats": stats, "tool_calls": tool_calls, "done": True})
+        elif op == "prewarm":
+            stats = await self.client.prewarm(request["messages"], model=request.get("model"))
+            await send({"stats": stats, "done": True})
+        elif op == "shutdown":
+            await send({"done": True})
+            self.stop()
+        else:
+            await send({"error": f"Unknown op '{op}'"})
+
+    async def _serve_until_hangup(self, request: Dict, send, reader: asyncio.StreamReader) -> bool:
+        """Handle a request, cancelling it (e.g. a prewarm) if the client disconnects first"""
+        handler = asyncio.create_task(self.handle_request(request, send))
+        # Clients wait for "done" before sending anything else, so any read completing here
+        # is a hangup (or a protocol violation); either way the connection is finished
+        hangup = asyncio.create_task(reader.read(1))
+        try:
+            await asyncio.wait({handler, hangup}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            hangup.cancel()
+            try:
+                await hangup
+            except asyncio.CancelledError:
+                pass
+        if not handler.done():
+            handler.cancel()
+            return False
+        handler.result()
+        return not hangup.cancelled()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.active_clients += 1
+
+        async def send(message: Dict) -> None:
+            writer.write((json.dumps(message) + "\n").encode("utf-8"))
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.last_activity = time.monotonic()
+                self.requests_served += 1
+                try:
+                    if not await self._serve_until_hangup(json.loads(line), send, reader):
+                        break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    await send({"error": str(e)})
+        finally:
+            self.active_clients -= 1
+            self.last_activity = time.monotonic()
+            writer.close()
+
+    async def _idle_watchdog(self) -> None:
+        """Shut down once no client has been connected for idle_timeout seconds"""
+        while not self._stopped.is_set():
+            await asyncio.sleep(IDLE_CHECK_INTERVAL)
+            idle_for = time.monotonic() - self.last_activity
+            if self.idle_timeout and not self.active_clients and idle_for > self.idle_timeout:
+                self.stop()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def serve(self) -> None:
+        """Listen on the Unix socket until stopped or idle"""
+        if ping(self.socket_path):
+            raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_path), limit=STREAM_LIMIT
+        )
+        os.chmod(self.socket_path, 0o600)
+        watchdog = asyncio.create_task(self._idle_watchdog())
+        try:
+            # Warm the connection pool and the catalog before the first client arrives
+            try:
+                await self.models()
+            except Exception:
+                pass
+            await self._stopped.wait()
+        finally:
+            watchdog.cancel()
+            self._server.close()
+            await self.client.pool.aclose()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
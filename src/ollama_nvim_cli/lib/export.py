@@ -0,0 +1,207 @@
+import html
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .history import iter_session, read_header
+
+FORMATS = ("html", "jsonl", "openai", "md")
+SUFFIXES = {"html": ".html", "jsonl": ".jsonl", "openai": ".openai.jsonl", "md": ".md"}
+
+HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ max-width: 52rem; margin: 2rem auto; padding: 0 1rem; font: 16px/1.5 system-ui, sans-serif; color: #1e1e2e; }}
+header p, .meta {{ color: #6c7086; font-size: 0.85rem; }}
+section {{ border-left: 4px solid #89b4fa; margin: 1.5rem 0; padding: 0 1rem; }}
+section.user {{ border-color: #a6e3a1; }}
+h2 {{ font-size: 1rem; margin: 0; }}
+pre {{ background: #f5f5f5; padding: 0.75rem; overflow-x: auto; }}
+code {{ font-family: ui-monospace, monospace; font-size: 0.9em; }}
+</style>
+</head>
+<body>
+"""
+
+
+class SessionWriter(ABC):
+    """Writes one session message by message, so memory does not grow with its length"""
+
+    def __init__(self, out: TextIO, name: str, header: Dict):
+        self.out = out
+        self.name = name
+        self.header = header
+
+    def begin(self) -> None:
+        pass
+
+    @abstractmethod
+    def message(self, message: Dict) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+class MarkdownWriter(SessionWriter):
+    def begin(self) -> None:
+        self.out.write(f"# {self.name}\n\n")
+        details = [self.header.get("model"), (self.header.get("created_at") or "")[:16].replace("T", " ")]
+        self.out.write(f"_{', '.join(d for d in details if d)}_\n")
+
+    def message(self, message: Dict) -> None:
+        self.out.write(f"\n## {message['role'].title()}\n\n{message['content'].strip()}\n")
+
+
+class JSONLWriter(SessionWriter):
+    """The session store's own format, with the branch prefix resolved"""
+
+    def begin(self) -> None:
+        header = {k: v for k, v in self.header.items() if k not in ("parent", "parent_messages")}
+        self.out.write(json.dumps(header) + "\n")
+
+    def message(self, message: Dict) -> None:
+        self.out.write(json.dumps(message) + "\n")
+
+
+class OpenAIWriter(SessionWriter):
+    """One {"messages": [...]} line per session, as used for chat fine-tuning data"""
+
+    def begin(self) -> None:
+        self.out.write('{"messages": [')
+        self.first = True
+        self.calls = 0
+        # Ids of the last answer's tool calls without a result yet, in call order
+        self.pending: List[str] = []
+
+    def tool_call(self, call: Dict) -> Dict:
+        """An Ollama tool call in OpenAI's shape, with the id Ollama does not assign"""
+        self.calls += 1
+        call_id = call.get("id") or f"call_{self.calls}"
+        self.pending.append(call_id)
+        function = call.get("function", {})
+        arguments = function.get("arguments", {})
+        return {
+            "id": call_id,
+            "type": "function",
+            "function": {
+                "name": function.get("name", ""),
+                "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments),
+            },
+        }
+
+    def message(self, message: Dict) -> None:
+        # The prompt as the model saw it, template and context included
+        entry = {"role": message["role"], "content": message.get("prompt") or message["content"]}
+        if message.get("tool_calls"):
+            self.pending = []
+            entry["tool_calls"] = [self.tool_call(call) for call in message["tool_calls"]]
+            entry["content"] = entry["content"] or None
+        elif message["role"] == "tool":
+            if not self.pending:
+                # A result no exported call asked for would make the whole line invalid
+                return
+            # Results are stored in the order of the calls that asked for them
+            entry["tool_call_id"] = self.pending.pop(0)
+        self.out.write(("" if self.first else ", ") + json.dumps(entry))
+        self.first = False
+
+    def end(self) -> None:
+        self.out.write("]}\n")
+
+
+class HTMLWriter(SessionWriter):
+    def begin(self) -> None:
+        from markdown_it import MarkdownIt
+
+        # Raw HTML in messages is shown as text, never interpreted
+        self.markdown = MarkdownIt("commonmark", {"html": False})
+        title = html.escape(self.name)
+        self.out.write(HTML_HEAD.format(title=title))
+        details = ", ".join(
+            html.escape(str(d)) for d in (self.header.get("model"), self.header.get("created_at")) if d
+        )
+        self.out.write(f"<header><h1>{title}</h1><p>{details}</p></header>\n")
+
+    def message(self, message: Dict) -> None:
+        role = html.escape(message["role"])
+        timestamp = html.escape((message.get("timestamp") or "")[:19].replace("T", " "))
+        self.out.write(f'<section class="{role}">\n<h2>{role.title()}</h2>\n')
+        if timestamp:
+            self.out.write(f'<div class="meta">{timestamp}</div>\n')
+        self.out.write(self.markdown.render(message["content"]))
+        self.out.write("</section>\n")
+
+    def end(self) -> None:
+        self.out.write("</body>\n</html>\n")
+
+
+WRITERS = {"html": HTMLWriter, "jsonl": JSONLWriter, "openai": OpenAIWriter, "md": MarkdownWriter}
+
+
+def session_name(session_path) -> str:
+    name = Path(session_path).name
+    for suffix in (".jsonl", ".md"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def export_session(session_path, fmt: str, out: TextIO) -> int:
+    """Stream a session to out in the given format, returning the number of messages"""
+    writer = WRITERS[fmt](out, session_name(session_path), read_header(session_path))
+    writer.begin()
+    count = 0
+    for message in iter_session(session_path):
+        writer.message(message)
+        count += 1
+    writer.end()
+    return count
+
+
+def export_file(session_path: str, fmt: str, out_path: str) -> int:
+    """Export into a file, written beside the target and renamed over it when complete"""
+    tmp_path = f"{out_path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            count = export_session(session_path, fmt, out)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return count
+
+
+def export_many(
+    sessions: List[Path], fmt: str, out_dir: Path, jobs: Optional[int] = None
+) -> Iterator[Tuple[Path, Path, Optional[int], Optional[str]]]:
+    """Export sessions into out_dir in worker processes
+
+    Yields (session, output, messages, error) as each one finishes.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    targets: Dict[Path, Path] = {}
+    for session in sessions:
+        target = out_dir / (session_name(session) + SUFFIXES[fmt])
+        if target in targets.values():
+            # A Markdown and a JSONL session with the same name
+            target = out_dir / (Path(session).name + SUFFIXES[fmt])
+        targets[session] = target
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(export_file, str(session), fmt, str(target)): session
+            for session, target in targets.items()
+        }
+        for future in as_completed(futures):
+            session = futures[future]
+            try:
+                yield session, targets[session], future.result(), None
+            except Exception as e:
+                yield session, targets[session], None, str(e)
@@ -1,57 +1,213 @@
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+import itertools
+import json
 import yaml
-from prompt_toolkit.history import FileHistory
-from rich.table import Table
+
+# New sessions are append-only JSONL; Markdown sessions from older versions stay readable
+SESSION_PATTERNS = ("chat_session_*.jsonl", "chat_session_*.md")
+
+
+def is_jsonl(session_path) -> bool:
+    return str(session_path).endswith(".jsonl")
+
+
+def read_front_matter(session_path) -> dict:
+    """YAML front matter of a legacy Markdown session, read up to its closing line"""
+    lines = []
+    with open(session_path, "r", encoding="utf-8") as f:
+        if f.readline().rstrip("\n") != "---":
+            return {}
+        for line in f:
+            if line.rstrip("\n") == "---":
+                break
+            lines.append(line)
+    return yaml.safe_load("".join(lines)) or {}
+
+
+def read_header(session_path) -> dict:
+    """Session metadata (created_at, model, parent links) without the messages"""
+    if not is_jsonl(session_path):
+        header = read_front_matter(session_path)
+        header.pop("messages", None)
+        return header
+    with open(session_path, "r", encoding="utf-8") as f:
+        line = f.readline()
+    return json.loads(line) if line.strip() else {}
+
+
+def iter_own_messages(session_path) -> Iterator[dict]:
+    """Messages stored in the session file itself (a branch's own suffix), one at a time"""
+    if not is_jsonl(session_path):
+        yield from read_front_matter(session_path).get("messages", [])
+        return
+    with open(session_path, "r", encoding="utf-8") as f:
+        f.readline()
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A line cut short by a crash while appending
+                continue
+
+
+def iter_session(session_path) -> Iterator[dict]:
+    """A session's whole conversation, parent prefixes included, without loading it at once"""
+    path = Path(session_path)
+    header = read_header(path)
+    if header.get("parent"):
+        prefix = iter_session(path.parent / header["parent"])
+        try:
+            yield from itertools.islice(prefix, header.get("parent_messages", 0))
+        finally:
+            prefix.close()
+    yield from iter_own_messages(path)
 
 
 class HistoryManager:
     def __init__(self, config):
-        history_dir = Path(config.get("history", {}).get("save_dir", "~/.local/share/ollama-nvim-cli/history")).expanduser()
+        history_dir = Path(config.get("history.save_dir")).expanduser()
         self.history_dir = history_dir
         self.history_dir.mkdir(parents=True, exist_ok=True)
         self.current_session: Optional[str] = None
-        self.prompt_history = FileHistory(str(history_dir / ".prompt_history"))
+        self.model = config.get("model")
+        self.session_format = config.get("history.format")
         self.messages: List[dict] = []
+        self.branch_index = self.history_dir / "branches.json"
+        self._resolved: Dict[str, Tuple[Tuple[int, int], Optional[str], Optional[List[dict]], List[dict]]] = {}
+        self._prompt_history = None
+
+    @property
+    def prompt_history(self):
+        """Indexed prompt history, loaded in the background and migrated from .prompt_history"""
+        if self._prompt_history is None:
+            from .prompt_history import IndexedHistory
+
+            self._prompt_history = IndexedHistory(
+                self.history_dir / ".prompt_history.db",
+                legacy_path=self.history_dir / ".prompt_history",
+            )
+        return self._prompt_history
 
-    def create_session(self) -> str:
-        """Create a new session file"""
+    def _new_session_path(self) -> Path:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_file = self.history_dir / f"chat_session_{timestamp}.md"
+        suffix = ".md" if self.session_format == "md" else ".jsonl"
+        stem = f"chat_session_{timestamp}"
+        # A fork right after the session it branches from can land in the same second
+        n = 2
+        while any((self.history_dir / f"{stem}{s}").exists() for s in (".jsonl", ".md")):
+            stem = f"chat_session_{timestamp}_{n}"
+            n += 1
+        return self.history_dir / f"{stem}{suffix}"
+
+    def create_session(self, parent: Optional[str] = None, parent_messages: int = 0) -> str:
+        """Create a new session file, optionally as a branch of a parent session"""
+        session_file = self._new_session_path()
         self.current_session = str(session_file)
 
-        # Initialize session file with metadata
+        metadata = {
+            "created_at": datetime.now().isoformat(),
+            "model": self.model,
+        }
+        if parent:
+            # Only the divergent suffix lives in this file, the prefix is read from the parent
+            metadata["parent"] = parent
+            metadata["parent_messages"] = parent_messages
+
+        # A JSONL session is its metadata line followed by one line per message
         with open(session_file, "w", encoding="utf-8") as f:
-            f.write("---\n")
-            yaml.dump(
-                {
-                    "created_at": datetime.now().isoformat(),
-                    "model": "mistral",  # This should come from config
-                    "messages": [],
-                },
-                f,
-            )
-            f.write("---\n\n")
+            if is_jsonl(session_file):
+                f.write(json.dumps(metadata) + "\n")
+            else:
+                f.write("---\n")
+                yaml.dump({**metadata, "messages": []}, f)
+                f.write("---\n\n")
 
         return self.current_session
 
     def load_session(self, session_path: str) -> List[dict]:
-        """Load an existing session"""
-        self.current_session = session_path
-        self.messages = []
+        """Load an existing session, including the prefix it shares with its parents"""
+        self.current_session = str(session_path)
+        self.messages = list(self.resolve_messages(session_path))
+        return self.messages
 
-        with open(session_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            if content.startswith("---"):
-                _, front_matter, *parts = content.split("---", 2)
-                session_data = yaml.safe_load(front_matter)
-                self.messages = session_data.get("messages", [])
+    def read_messages(self, session_path) -> List[dict]:
+        """Read the messages stored in a session file (a branch's own suffix only)"""
+        return list(iter_own_messages(session_path))
 
-        return self.messages
+    def resolve_messages(self, session_path) -> List[dict]:
+        """Full conversation of a session, parent prefixes resolved and cached
 
-    def add_message(self, role: str, content: str):
-        """Add a message to the current session"""
+        An entry is reused while the file's mtime and size are unchanged and its parent
+        still resolves to the very list the prefix was taken from.
+        """
+        path = Path(session_path)
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._resolved.get(path.name)
+        if cached and cached[0] == key:
+            parent, prefix, messages = cached[1:]
+            if parent is None or self.resolve_messages(path.parent / parent) is prefix:
+                return messages
+
+        header = read_header(path)
+        messages = self.read_messages(path)
+        parent, prefix = header.get("parent"), None
+        if parent:
+            prefix = self.resolve_messages(path.parent / parent)
+            messages = prefix[: header.get("parent_messages", 0)] + messages
+        self._resolved[path.name] = (key, parent, prefix, messages)
+        return messages
+
+    def branches(self) -> Dict[str, dict]:
+        """Parent links of every branch, by session file name"""
+        try:
+            return json.loads(self.branch_index.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def branch(self, keep: int) -> str:
+        """Continue in a new session sharing the first keep messages of the current one"""
+        if not self.current_session:
+            raise ValueError("No session to branch from yet")
+        keep = max(0, min(keep, len(self.messages)))
+
+        # Link to the closest ancestor that holds the whole prefix, keeping chains short
+        links = self.branches()
+        parent = Path(self.current_session).name
+        while parent in links and keep <= links[parent]["parent_messages"]:
+            parent = links[parent]["parent"]
+
+        messages = self.messages[:keep]
+        self.create_session(parent=parent, parent_messages=keep)
+        self.messages = messages
+        links[Path(self.current_session).name] = {"parent": parent, "parent_messages": keep}
+        tmp_path = self.branch_index.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(links, indent=2))
+        tmp_path.replace(self.branch_index)
+        return self.current_session
+
+    def family(self, session_path=None) -> List[Path]:
+        """The root of a session's branch tree followed by all of its branches, depth first"""
+        links = self.branches()
+        root = Path(session_path or self.current_session).name
+        while root in links:
+            root = links[root]["parent"]
+
+        children: Dict[str, List[str]] = {}
+        for child, link in sorted(links.items()):
+            children.setdefault(link["parent"], []).append(child)
+
+        ordered, stack = [], [root]
+        while stack:
+            name = stack.pop()
+            ordered.append(self.history_dir / name)
+            stack.extend(reversed(children.get(name, [])))
+        return [path for path in ordered if path.exists()]
+
+    def add_message(self, role: str, content: str, **fields):
+        """Add a message to the current session, with optional extra fields (prompt, stats)"""
         if not self.current_session:
             self.create_session()
 
@@ -59,36 +215,66 @@ class HistoryManager:
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat(),
+            **{key: value for key, value in fields.items() if value},
         }
 
         self.messages.append(message)
 
-        # Update YAML front matter
-        with open(self.current_session, "r+", encoding="utf-8") as f:
-            content = f.read()
-            _, front_matter, *parts = content.split("---", 2)
-            session_data = yaml.safe_load(front_matter)
-            session_data["messages"].append(message)
+        if is_jsonl(self.current_session):
+            with open(self.current_session, "a", encoding="utf-8") as f:
+                f.write(json.dumps(message) + "\n")
+            return
 
-            # Rewrite the file
-            f.seek(0)
+        # Legacy Markdown session: the front matter holds every message, so rewrite just
+        # that; the Markdown body it used to repeat is dropped (`onc export -f md` renders one)
+        session_data = read_front_matter(self.current_session)
+        session_data.setdefault("messages", []).append(message)
+        tmp_path = Path(self.current_session).with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write("---\n")
             yaml.dump(session_data, f)
-            f.write("---\n\n")
+            f.write("---\n")
+        tmp_path.replace(self.current_session)
 
-            # Append the message in markdown format
-            f.write(f"\n### {role.title()}\n")
-            f.write(f"{content}\n")
-            f.write("\n---\n")
+    def chat_messages(self, load_image=None, max_images: int = 0) -> List[dict]:
+        """The conversation as sent to /api/chat, user turns as rendered from their template
 
-    def list_sessions(self) -> List[Path]:
-        """List all available sessions"""
-        sessions = sorted(
-            self.history_dir.glob("chat_session_*.md"),
+        Messages store image references; load_image turns one into its base64 payload.
+        Only the newest max_images images are included (0 for all).
+        """
+        messages = []
+        for message in self.messages:
+            entry = {"role": message["role"], "content": message.get("prompt") or message["content"]}
+            # Tool rounds: the calls an answer made, and each result with the tool it came from
+            for field in ("tool_calls", "tool_name"):
+                if message.get(field):
+                    entry[field] = message[field]
+            messages.append(entry)
+        if load_image is None:
+            return messages
+
+        remaining = max_images or None
+        for message, entry in zip(reversed(self.messages), reversed(messages)):
+            refs = message.get("images") or []
+            if remaining is not None:
+                refs = refs[-remaining:] if remaining else []
+                remaining -= len(refs)
+            images = [payload for payload in map(load_image, refs) if payload]
+            if images:
+                entry["images"] = images
+        return messages
+
+    def all_sessions(self) -> List[Path]:
+        """List every saved session, most recent first"""
+        return sorted(
+            (path for pattern in SESSION_PATTERNS for path in self.history_dir.glob(pattern)),
             key=lambda p: p.stat().st_mtime,
             reverse=True,
         )
-        return sessions[:5]  # Return only the 5 most recent sessions
+
+    def list_sessions(self) -> List[Path]:
+        """List all available sessions"""
+        return self.all_sessions()[:5]  # Return only the 5 most recent sessions
 
     def format_sessions(self) -> None:
         """Format and display recent sessions"""
@@ -96,6 +282,8 @@ class HistoryManager:
         if not sessions:
             return
 
+        from rich.table import Table
+
         table = Table(title="Recent Sessions", show_header=True, border_style="cyan")
         table.add_column("№", style="cyan", justify="right")
         table.add_column("Date", style="green")
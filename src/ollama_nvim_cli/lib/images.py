@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Formats Ollama can decode, recognised by their first bytes
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "PNG",
+    b"\xff\xd8\xff": "JPEG",
+    b"GIF87a": "GIF",
+    b"GIF89a": "GIF",
+    b"BM": "BMP",
+}
+
+
+def image_format(data: bytes) -> Optional[str]:
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP"
+    for signature, name in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return name
+    return None
+
+
+class ImageStore:
+    def __init__(self, config):
+        """Images resized and base64-encoded once, cached by content hash"""
+        images_config = config.get("images", {})
+        self.max_dimension = images_config.get("max_dimension", 1344)
+        self.cache_dir = Path(
+            images_config.get("cache_dir", "~/.cache/ollama-nvim-cli/images")
+        ).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # digest -> base64 payload, and (path, mtime, size) -> digest
+        self._encoded: Dict[str, str] = {}
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def _cache_path(self, digest: str) -> Path:
+        # The payload depends on the resize limit as well as the source
+        return self.cache_dir / f"{digest}-{self.max_dimension}.b64"
+
+    def _resize(self, data: bytes, kind: str) -> bytes:
+        """Shrink to max_dimension when Pillow is installed, otherwise send as is"""
+        try:
+            from PIL import Image
+        except ImportError:
+            return data
+
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= self.max_dimension:
+                return data
+            image.thumbnail((self.max_dimension, self.max_dimension))
+            out = io.BytesIO()
+            if kind == "JPEG":
+                image.convert("RGB").save(out, "JPEG", quality=90)
+            else:
+                image.save(out, "PNG", optimize=True)
+            return out.getvalue()
+
+    def _encode(self, data: bytes, digest: str) -> str:
+        cache_path = self._cache_path(digest)
+        try:
+            payload = cache_path.read_text()
+        except OSError:
+            payload = base64.b64encode(self._resize(data, image_format(data))).decode("ascii")
+            tmp_path = cache_path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_text(payload)
+            os.replace(tmp_path, cache_path)
+        with self._lock:
+            self._encoded[digest] = payload
+        return payload
+
+    def attach(self, target: str) -> Dict:
+        """Encode an image, or reuse its cached encoding, and return the reference to store
+
+        Blocking: call from a worker thread.
+        """
+        path = Path(os.path.expanduser(target)).resolve()
+        if not path.is_file():
+            raise FileNotFoundError(f"No image at '{target}'")
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        digest = self._digests.get(key)
+        if digest is None or digest not in self._encoded:
+            data = path.read_bytes()
+            if not image_format(data):
+                raise ValueError(f"'{target}' is not a PNG, JPEG, GIF, WEBP or BMP image")
+            digest = hashlib.sha256(data).hexdigest()
+            self._digests[key] = digest
+            if digest not in self._encoded:
+                self._encode(data, digest)
+        return {"path": str(path), "sha256": digest}
+
+    def encoded(self, ref: Dict) -> Optional[str]:
+        """Base64 payload for a stored reference, None when the image is gone"""
+        digest = ref["sha256"]
+        payload = self._encoded.get(digest)
+        if payload is not None:
+            return payload
+        try:
+            payload = self._cache_path(digest).read_text()
+        except OSError:
+            # Cache cleared: re-encode from the original file if it is unchanged
+            try:
+                data = Path(ref["path"]).read_bytes()
+            except OSError:
+                return None
+            if hashlib.sha256(data).hexdigest() != digest:
+                return None
+            return self._encode(data, digest)
+        with self._lock:
+            self._encoded[digest] = payload
+        return payload
+
+    def cached(self, ref: Dict) -> Optional[str]:
+        """Base64 payload if it is in memory, never touching the disk"""
+        return self._encoded.get(ref["sha256"])
+
+    def preload(self, refs: List[Dict]) -> None:
+        """Bring payloads into memory so cached() finds them
+
+        Blocking: call from a worker thread.
+        """
+        for ref in refs:
+            if ref["sha256"] not in self._encoded:
+                try:
+                    self.encoded(ref)
+                except Exception:
+                    # Unreadable now: the message is sent without it, as when the file is gone
+                    pass
+
+    def size(self, ref: Dict) -> int:
+        """Encoded size in bytes, as sent to Ollama"""
+        return len(self.encoded(ref) or "")
@@ -0,0 +1,305 @@
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Union
+
+Path = List[Union[str, int]]
+
+WHITESPACE = " \t\r\n"
+SCALAR_START = "-0123456789tfn"
+SCALAR_CHARS = set("-+.eE0123456789truefalsn")
+KIND_OF_START = {"{": "object", "[": "array", '"': "string", "t": "boolean", "f": "boolean", "n": "null"}
+
+
+class JSONStreamError(ValueError):
+    """Raised as soon as the stream can no longer become valid JSON"""
+
+
+class SchemaError(ValueError):
+    """Raised as soon as the stream can no longer satisfy the schema"""
+
+
+def format_path(path: Path) -> str:
+    return "$" + "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in path)
+
+
+class IncrementalJSONParser:
+    def __init__(
+        self,
+        on_start: Optional[Callable[[Path, str], None]] = None,
+        on_key: Optional[Callable[[Path, str], None]] = None,
+        on_value: Optional[Callable[[Path, Any], None]] = None,
+    ):
+        """Character-level JSON parser reporting values as soon as each one is complete"""
+        self.on_start = on_start
+        self.on_key = on_key
+        self.on_value = on_value
+        self.text = ""
+        self.pos = 0
+        # Open containers: [kind, start, state, key or index]
+        self.stack: List[list] = []
+        self.state = "value"
+        self.string_start: Optional[int] = None
+        self.escape = False
+        self.scalar_start: Optional[int] = None
+        self.done = False
+
+    def path(self) -> Path:
+        return [frame[3] for frame in self.stack]
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        text = self.text
+        while self.pos < len(text):
+            self._step(text[self.pos], self.pos)
+            self.pos += 1
+
+    def finish(self) -> None:
+        """End of stream: complete a trailing scalar and require a whole document"""
+        if self.scalar_start is not None:
+            self._complete(self.scalar_start, len(self.text))
+            self.scalar_start = None
+        if not self.done:
+            raise JSONStreamError("Output ended before the JSON document was complete")
+
+    def _fail(self, index: int, reason: str) -> None:
+        raise JSONStreamError(f"{reason} at character {index} ({format_path(self.path())})")
+
+    def _step(self, c: str, i: int) -> None:
+        if self.string_start is not None:
+            if self.escape:
+                self.escape = False
+            elif c == "\\":
+                self.escape = True
+            elif c == '"':
+                start, self.string_start = self.string_start, None
+                if self.stack and self.stack[-1][2] == "key":
+                    key = json.loads(self.text[start:i + 1])
+                    self.stack[-1][3] = key
+                    self.stack[-1][2] = "colon"
+                    if self.on_key:
+                        self.on_key(self.path(), key)
+                else:
+                    self._complete(start, i + 1)
+            return
+
+        if self.scalar_start is not None:
+            if c in SCALAR_CHARS:
+                return
+            start, self.scalar_start = self.scalar_start, None
+            self._complete(start, i)
+            # The delimiter still needs handling below
+
+        if c in WHITESPACE:
+            return
+        if self.done:
+            self._fail(i, "Unexpected data after the JSON document")
+
+        frame = self.stack[-1] if self.stack else None
+        state = frame[2] if frame else self.state
+
+        if state in ("value", "value_or_end"):
+            if c == "]" and state == "value_or_end":
+                self._close(i)
+            elif c in '{["' or c in SCALAR_START:
+                self._start_value(c, i)
+            else:
+                self._fail(i, f"Expected a value, got {c!r}")
+        elif state in ("key", "key_or_end"):
+            if c == '"':
+                self.string_start = i
+                frame[2] = "key"
+            elif c == "}" and state == "key_or_end":
+                self._close(i)
+            else:
+                self._fail(i, f"Expected a key, got {c!r}")
+        elif state == "colon":
+            if c != ":":
+                self._fail(i, f"Expected ':', got {c!r}")
+            frame[2] = "value"
+        elif state == "comma_or_end":
+            if c == ",":
+                if frame[0] == "{":
+                    frame[2] = "key"
+                else:
+                    frame[3] += 1
+                    frame[2] = "value"
+            elif c == ("}" if frame[0] == "{" else "]"):
+                self._close(i)
+            else:
+                self._fail(i, f"Expected ',' or a closing bracket, got {c!r}")
+
+    def _start_value(self, c: str, i: int) -> None:
+        if self.on_start:
+            self.on_start(self.path(), KIND_OF_START.get(c, "number"))
+        if c == "{":
+            self.stack.append(["{", i, "key_or_end", None])
+        elif c == "[":
+            self.stack.append(["[", i, "value_or_end", 0])
+        elif c == '"':
+            self.string_start = i
+        else:
+            self.scalar_start = i
+
+    def _close(self, i: int) -> None:
+        # Once popped, the path of the enclosing frames is the container's own path
+        frame = self.stack.pop()
+        self._complete(frame[1], i + 1)
+
+    def _complete(self, start: int, end: int) -> None:
+        try:
+            value = json.loads(self.text[start:end])
+        except ValueError:
+            self._fail(start, f"Invalid value {self.text[start:end][:20]!r}")
+        if self.on_value:
+            self.on_value(self.path(), value)
+        if self.stack:
+            self.stack[-1][2] = "comma_or_end"
+        else:
+            self.done = True
+
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def _is_type(value: Any, name: str) -> bool:
+    if name == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, JSON_TYPES.get(name, object))
+
+
+class SchemaValidator:
+    def __init__(self, schema: Dict):
+        """Check a JSON stream against a schema (type, enum, const, properties, required,
+        additionalProperties, items, min/maxItems, min/maxLength, pattern, minimum, maximum)"""
+        self.schema = schema
+
+    def subschema(self, path: Path) -> Optional[Dict]:
+        """Schema for the value at path, None when anything is allowed there"""
+        schema = self.schema
+        for part in path:
+            if not isinstance(schema, dict):
+                return None
+            if isinstance(part, int):
+                schema = schema.get("items")
+            else:
+                properties = schema.get("properties", {})
+                if part in properties:
+                    schema = properties[part]
+                else:
+                    additional = schema.get("additionalProperties")
+                    schema = additional if isinstance(additional, dict) else None
+        return schema if isinstance(schema, dict) else None
+
+    def _fail(self, path: Path, reason: str) -> None:
+        raise SchemaError(f"{format_path(path)}: {reason}")
+
+    def check_start(self, path: Path, kind: str) -> None:
+        """Reject a value by its first character: wrong type, or one array item too many"""
+        if path and isinstance(path[-1], int):
+            parent = self.subschema(path[:-1]) or {}
+            if "maxItems" in parent and path[-1] >= parent["maxItems"]:
+                self._fail(path[:-1], f"more than {parent['maxItems']} items")
+        schema = self.subschema(path)
+        if not schema or "type" not in schema:
+            return
+        allowed = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        if kind == "number" and ("integer" in allowed or "number" in allowed):
+            return
+        if kind not in allowed:
+            self._fail(path, f"expected {' or '.join(allowed)}, got {kind}")
+
+    def check_key(self, path: Path, key: str) -> None:
+        schema = self.subschema(path[:-1])
+        if schema and schema.get("additionalProperties") is False:
+            if key not in schema.get("properties", {}):
+                self._fail(path, "property not allowed by the schema")
+
+    def validate(self, value: Any, schema: Dict, path: Path, deep: bool = True) -> None:
+        """Check value against schema; deep=False skips children that were checked already"""
+        if "type" in schema:
+            allowed = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+            if not any(_is_type(value, name) for name in allowed):
+                self._fail(path, f"expected {' or '.join(allowed)}")
+        if "const" in schema and value != schema["const"]:
+            self._fail(path, f"expected {schema['const']!r}")
+        if "enum" in schema and value not in schema["enum"]:
+            self._fail(path, f"not one of {schema['enum']!r}")
+
+        if isinstance(value, dict):
+            for key in schema.get("required", []):
+                if key not in value:
+                    self._fail(path, f"missing required property {key!r}")
+            for key, item in value.items() if deep else ():
+                properties = schema.get("properties", {})
+                if key in properties:
+                    self.validate(item, properties[key], path + [key])
+                elif schema.get("additionalProperties") is False:
+                    self._fail(path + [key], "property not allowed by the schema")
+                elif isinstance(schema.get("additionalProperties"), dict):
+                    self.validate(item, schema["additionalProperties"], path + [key])
+        elif isinstance(value, list):
+            if len(value) < schema.get("minItems", 0):
+                self._fail(path, f"fewer than {schema['minItems']} items")
+            if "maxItems" in schema and len(value) > schema["maxItems"]:
+                self._fail(path, f"more than {schema['maxItems']} items")
+            if deep and isinstance(schema.get("items"), dict):
+                for i, item in enumerate(value):
+                    self.validate(item, schema["items"], path + [i])
+        elif isinstance(value, str):
+            if len(value) < schema.get("minLength", 0):
+                self._fail(path, f"shorter than {schema['minLength']} characters")
+            if "maxLength" in schema and len(value) > schema["maxLength"]:
+                self._fail(path, f"longer than {schema['maxLength']} characters")
+            if "pattern" in schema and not re.search(schema["pattern"], value):
+                self._fail(path, f"does not match {schema['pattern']!r}")
+        elif _is_type(value, "number"):
+            if "minimum" in schema and value < schema["minimum"]:
+                self._fail(path, f"below the minimum {schema['minimum']}")
+            if "maximum" in schema and value > schema["maximum"]:
+                self._fail(path, f"above the maximum {schema['maximum']}")
+
+
+class JSONStream:
+    def __init__(self, schema: Optional[Dict] = None, on_item: Optional[Callable[[Path, Any], None]] = None):
+        """Parse streamed output, validating against an optional schema while it arrives
+
+        on_item is called with each completed top-level array element or object member.
+        """
+        self.validator = SchemaValidator(schema) if schema else None
+        self.on_item = on_item
+        self.items = 0
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.parser = IncrementalJSONParser(
+            on_start=self.validator.check_start if self.validator else None,
+            on_key=self.validator.check_key if self.validator else None,
+            on_value=self._on_value,
+        )
+
+    def _on_value(self, path: Path, value: Any) -> None:
+        if self.validator:
+            schema = self.validator.subschema(path)
+            if schema:
+                # Children were validated as they completed, only this level remains
+                self.validator.validate(value, schema, path, deep=False)
+        if len(path) == 1:
+            self.items += 1
+            if self.on_item:
+                self.on_item(path, value)
+        elif not path:
+            self.value = value
+
+    def feed(self, chunk: str) -> None:
+        self.parser.feed(chunk)
+
+    def finish(self) -> Any:
+        self.parser.finish()
+        return self.value
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from ..api.ollama import OllamaError
+
+# Pull errors reported by Ollama that are worth retrying
+TRANSIENT_ERRORS = ("connection", "timeout", "timed out", "eof", "reset", "max retries", "unexpected end")
+MAX_BACKOFF = 30.0
+
+
+class ModelCatalog:
+    def __init__(self, config):
+        """Installed models per host, cached on disk so listing does not wait for Ollama"""
+        models_config = config.get("models", {})
+        self.ttl = models_config.get("catalog_ttl", 300.0)
+        self.cache_dir = Path(
+            models_config.get("cache_dir", "~/.cache/ollama-nvim-cli/models")
+        ).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / "catalog.json"
+        self.pulls_path = self.cache_dir / "pulls.json"
+
+    def _read(self, path: Path, default):
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return default
+
+    def _write(self, path: Path, data) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, path)
+
+    def load(self) -> Optional[Dict]:
+        """The cached catalog ({"fetched_at", "hosts": {url: [model, ...]}}), if fresh"""
+        catalog = self._read(self.path, None)
+        if not catalog or time.time() - catalog.get("fetched_at", 0) > self.ttl:
+            return None
+        return catalog
+
+    def save(self, hosts: Dict[str, List[Dict]]) -> Dict:
+        catalog = {"fetched_at": time.time(), "hosts": hosts}
+        self._write(self.path, catalog)
+        return catalog
+
+    def invalidate(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    # Pulls that have not finished yet, so an interrupted `onc models pull` can resume them
+
+    def pending_pulls(self) -> List[Dict]:
+        return self._read(self.pulls_path, [])
+
+    def start_pull(self, model: str, host: str) -> None:
+        pulls = self.pending_pulls()
+        if {"model": model, "host": host} not in pulls:
+            self._write(self.pulls_path, pulls + [{"model": model, "host": host}])
+
+    def finish_pull(self, model: str, host: str) -> None:
+        pulls = [p for p in self.pending_pulls() if p != {"model": model, "host": host}]
+        self._write(self.pulls_path, pulls)
+
+
+class PullLimiter:
+    def __init__(self, max_parallel: int, sample_seconds: float = 5.0, min_gain: float = 0.1):
+        """Start pulls one at a time while each extra pull still raises the total download rate
+
+        Ollama already downloads the layers of one model in parallel, so a second pull
+        only helps while the link is not saturated. Every sample_seconds the combined
+        rate is compared with the rate before the last pull was admitted; the limit
+        grows while it improves by min_gain and stops growing once it does not.
+        """
+        self.max_parallel = max(1, max_parallel)
+        self.sample_seconds = sample_seconds
+        self.min_gain = min_gain
+        self.limit = 1
+        self.active = 0
+        self.saturated = False
+        self.received = 0
+        self.rate = 0.0
+        self._baseline: Optional[float] = None
+        self._changed = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
+
+    def record(self, received: int) -> None:
+        self.received += received
+
+    async def _set_limit(self, limit: int) -> None:
+        async with self._changed:
+            self.limit = limit
+            self._changed.notify_all()
+
+    async def tune(self) -> None:
+        """Adjust the limit from measured throughput; run as a task alongside the pulls"""
+        while True:
+            before = self.received
+            await asyncio.sleep(self.sample_seconds)
+            self.rate = (self.received - before) / self.sample_seconds
+            if self.saturated or self.active < self.limit:
+                # Not enough pulls running to learn anything about another one
+                continue
+            if self._baseline is not None and self.rate < self._baseline * (1 + self.min_gain):
+                # The last pull admitted did not add bandwidth; let it finish, admit no more
+                self.saturated = True
+                await self._set_limit(max(1, self.limit - 1))
+            elif self.limit < self.max_parallel:
+                self._baseline = self.rate
+                await self._set_limit(self.limit + 1)
+
+
+class PullState:
+    def __init__(self, model: str, host: str):
+        """Progress of one model pull, per layer as reported by /api/pull"""
+        self.model = model
+        self.host = host
+        self.status = "queued"
+        # digest -> [completed, total]
+        self.layers: Dict[str, List[int]] = {}
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.done = False
+
+    @property
+    def completed(self) -> int:
+        return sum(layer[0] for layer in self.layers.values())
+
+    @property
+    def total(self) -> int:
+        return sum(layer[1] for layer in self.layers.values())
+
+    def update(self, message: Dict) -> int:
+        """Apply a progress message and return the number of newly received bytes"""
+        self.status = message.get("status", self.status)
+        digest = message.get("digest")
+        if not digest or "total" not in message:
+            return 0
+        layer = self.layers.setdefault(digest, [0, message["total"]])
+        completed = message.get("completed", 0)
+        received = max(0, completed - layer[0])
+        layer[0], layer[1] = completed, message["total"]
+        return received
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, httpx.TransportError):
+        return True
+    return any(marker in str(error).lower() for marker in TRANSIENT_ERRORS)
+
+
+async def pull_model(client, state: PullState, limiter: PullLimiter, retries: int = 5) -> None:
+    """Pull one model under the limiter, resuming after dropped connections"""
+    host = client.model_host(state.host)
+    async with limiter:
+        while True:
+            state.attempts += 1
+            try:
+                async for message in client.pull(state.model, host):
+                    limiter.record(state.update(message))
+                    if message.get("status") == "success":
+                        state.done = True
+                        return
+                raise OllamaError("unexpected end of the pull stream")
+            except (httpx.HTTPError, OllamaError) as e:
+                if state.attempts > retries or not is_transient(e):
+                    state.error = str(e)
+                    state.status = "failed"
+                    raise
+                state.status = f"retrying ({str(e)})"
+                await asyncio.sleep(min(MAX_BACKOFF, 2 ** (state.attempts - 1)))
@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional
+
+from . import profiling
+
+
+def conversation_key(messages: List[Dict]) -> str:
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Prewarmer:
+    def __init__(self, client, config):
+        """Prefill the conversation so far into Ollama's KV cache while the user types"""
+        self.client = client
+        self.enabled = config.get("prewarm.enabled")
+        self.idle_delay = config.get("prewarm.idle_delay")
+        self.refresh_interval = config.get("prewarm.refresh_interval")
+
+        self._task: Optional[asyncio.Task] = None
+        self._pending_key: Optional[str] = None
+        self._warm_key: Optional[str] = None
+        self._warm_at = 0.0
+        self._last_typed = 0.0
+        self._in_flight = False
+        self._keyed: Optional[List[Dict]] = None
+        self._keyed_value = ""
+
+        self.completed = 0
+        self.cancelled = 0
+        self.prefill_seconds = 0.0
+
+    def _key(self, messages: List[Dict]) -> str:
+        # Called on every keystroke: hash each conversation list only once
+        if messages is not self._keyed:
+            self._keyed = messages
+            self._keyed_value = conversation_key(messages)
+        return self._keyed_value
+
+    def is_warm(self, messages: List[Dict]) -> bool:
+        """Whether this exact conversation was prefilled recently enough to still be cached"""
+        return (
+            self._warm_key == self._key(messages)
+            and time.monotonic() - self._warm_at < self.refresh_interval
+        )
+
+    def _busy(self) -> bool:
+        # Never queue behind a real request on the host the next turn will use
+        pool = getattr(self.client, "pool", None)
+        if pool is None:
+            return False
+        candidates = pool.candidates(self.client.model)
+        return bool(candidates and candidates[0].in_flight)
+
+    def schedule(self, messages: List[Dict], delay: float = 0.0) -> None:
+        """Prewarm after delay seconds, replacing any prewarm of an older conversation"""
+        if not self.enabled or not messages or self.is_warm(messages):
+            return
+        key = self._key(messages)
+        if self._task and not self._task.done():
+            if self._pending_key == key:
+                return
+            self.cancel()
+        self._pending_key = key
+        self._task = asyncio.create_task(self._run(messages, key, delay))
+
+    def on_typing(self, messages: List[Dict]) -> None:
+        """Typing pause hook: re-prewarm if the cache may have been evicted meanwhile"""
+        self._last_typed = time.monotonic()
+        self.schedule(messages, delay=self.idle_delay)
+
+    async def _run(self, messages: List[Dict], key: str, delay: float) -> None:
+        if delay:
+            # Debounce: wait until the user has stopped typing for the whole delay
+            while (remaining := self._last_typed + delay - time.monotonic()) > 0:
+                await asyncio.sleep(remaining)
+        if self._busy():
+            return
+        started = time.perf_counter()
+        self._in_flight = True
+        try:
+            await self.client.prewarm(messages)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Prewarming is only an optimization, the real request reports errors
+            return
+        finally:
+            self._in_flight = False
+        finished = time.perf_counter()
+        profiling.tracer.complete("prewarm", started, finished, lane="prewarm", messages=len(messages))
+        self.prefill_seconds += finished - started
+        self.completed += 1
+        self._warm_key = key
+        self._warm_at = time.monotonic()
+
+    def cancel(self) -> None:
+        """Abort an in-flight prewarm so it does not compete with the real request"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            if self._in_flight:
+                self.cancelled += 1
+        self._task = None
+        self._pending_key = None
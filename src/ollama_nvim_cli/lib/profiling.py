@@ -0,0 +1,195 @@
+import contextlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Shared no-op context manager, so a disabled span costs one attribute lookup and a call
+_NULL_SPAN = contextlib.nullcontext()
+
+LANES = {"main": 1, "ollama": 2, "prewarm": 3}
+TOP_FUNCTIONS = 15
+TOP_ALLOCATIONS = 10
+
+
+class NullTracer:
+    """Stand-in used unless --trace or --profile is given; every hook is a no-op"""
+
+    enabled = False
+
+    def span(self, name: str, lane: str = "main", **args):
+        return _NULL_SPAN
+
+    def turn(self, number: int):
+        return _NULL_SPAN
+
+    def complete(self, name: str, start: float, end: float, lane: str = "main", **args) -> None:
+        pass
+
+    def finish(self, console=None) -> None:
+        pass
+
+
+class Tracer:
+    def __init__(self, path: Optional[Path] = None, cprofile: bool = False, memory: bool = False):
+        """Record timed spans as Chrome trace events, optionally profiling each turn"""
+        self.enabled = True
+        self.path = path
+        self.events: List[Dict] = []
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._open_turns = 0
+
+        self.profiler = None
+        if cprofile:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+
+        self.memory = memory
+        self._memory_start = None
+        if memory:
+            import tracemalloc
+
+            tracemalloc.start()
+            self._memory_start = tracemalloc.take_snapshot()
+
+    def _us(self, seconds: float) -> float:
+        return (seconds - self.origin) * 1e6
+
+    def complete(self, name: str, start: float, end: float, lane: str = "main", **args) -> None:
+        """Add a span from perf_counter() timestamps taken by the caller"""
+        self.events.append({
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": self._us(start),
+            "dur": (end - start) * 1e6,
+            "pid": self.pid,
+            "tid": LANES.get(lane, 1),
+            "args": args,
+        })
+
+    @contextlib.contextmanager
+    def span(self, name: str, lane: str = "main", **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter(), lane, **args)
+
+    @contextlib.contextmanager
+    def turn(self, number: int):
+        """Span a whole chat turn, under cProfile and tracemalloc when enabled"""
+        args: Dict = {"turn": number}
+        # Turns of different tabs can overlap; profile from the first start to the last end
+        self._open_turns += 1
+        if self._open_turns == 1:
+            if self.memory:
+                import tracemalloc
+
+                tracemalloc.reset_peak()
+            if self.profiler:
+                self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._open_turns -= 1
+            if self.profiler and not self._open_turns:
+                self.profiler.disable()
+            if self.memory:
+                import tracemalloc
+
+                args["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            self.complete("turn", start, end, **args)
+
+    def breakdown(self) -> List[Dict]:
+        """Per-phase totals, in order of first appearance"""
+        phases: Dict[str, Dict] = {}
+        for event in self.events:
+            phase = phases.setdefault(event["name"], {"name": event["name"], "count": 0, "total": 0.0, "max": 0.0})
+            phase["count"] += 1
+            phase["total"] += event["dur"] / 1000
+            phase["max"] = max(phase["max"], event["dur"] / 1000)
+        return list(phases.values())
+
+    def write(self) -> None:
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": lane}}
+            for lane, tid in LANES.items()
+        ]
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f)
+
+    def finish(self, console=None) -> None:
+        """Write the trace file and print the per-phase breakdown and profiles"""
+        if self.path:
+            self.write()
+        if console is None:
+            return
+
+        from rich.table import Table
+
+        turns = sum(phase["total"] for phase in self.breakdown() if phase["name"] == "turn")
+        table = Table(title="Time per phase", show_header=True, border_style="cyan")
+        table.add_column("Phase", style="bold cyan")
+        table.add_column("Count", justify="right")
+        table.add_column("Total ms", justify="right")
+        table.add_column("Mean ms", justify="right")
+        table.add_column("Max ms", justify="right")
+        table.add_column("% of turns", justify="right", style="yellow")
+        for phase in self.breakdown():
+            share = f"{phase['total'] / turns * 100:.1f}" if turns and phase["name"] != "turn" else ""
+            table.add_row(
+                phase["name"],
+                str(phase["count"]),
+                f"{phase['total']:.1f}",
+                f"{phase['total'] / phase['count']:.1f}",
+                f"{phase['max']:.1f}",
+                share,
+            )
+        console.print(table)
+
+        if self.profiler:
+            import io
+            import pstats
+
+            out = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=out).sort_stats("cumulative")
+            stats.print_stats(TOP_FUNCTIONS)
+            console.print(out.getvalue(), markup=False, highlight=False)
+            if self.path:
+                prof_path = Path(self.path).with_suffix(".prof")
+                stats.dump_stats(prof_path)
+                console.print(f"[cyan]cProfile data written to {prof_path}[/]")
+
+        if self.memory:
+            import tracemalloc
+
+            # Leave out the profilers' own bookkeeping and module imports
+            ignored = [
+                tracemalloc.Filter(False, pattern)
+                for pattern in ("*/tracemalloc.py", "*/cProfile.py", "*/pstats.py", "<frozen importlib.*>")
+            ]
+            snapshot = tracemalloc.take_snapshot().filter_traces(ignored)
+            start = self._memory_start.filter_traces(ignored)
+            console.print("[bold]Largest allocation growth since start:[/]")
+            for stat in snapshot.compare_to(start, "lineno")[:TOP_ALLOCATIONS]:
+                console.print(str(stat), markup=False, highlight=False)
+            tracemalloc.stop()
+
+        if self.path:
+            console.print(f"[cyan]Trace written to {self.path} (open in chrome://tracing or Perfetto)[/]")
+
+
+tracer = NullTracer()
+
+
+def enable(path: Optional[str] = None, cprofile: bool = False, memory: bool = False) -> Tracer:
+    """Replace the no-op tracer; modules look up profiling.tracer at call time"""
+    global tracer
+    tracer = Tracer(Path(path).expanduser() if path else None, cprofile=cprofile, memory=memory)
+    return tracer
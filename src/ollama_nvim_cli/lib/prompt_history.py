@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from prompt_toolkit.history import History, ThreadedHistory
+
+FETCH_SIZE = 1000
+MAX_INDEXED_CHARS = 500
+
+
+def read_file_history(path: Path) -> List[str]:
+    """Entries of a prompt_toolkit FileHistory file, oldest first"""
+    entries: List[str] = []
+    lines: List[str] = []
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.decode("utf-8", errors="replace")
+            if line.startswith("+"):
+                lines.append(line[1:])
+            elif lines:
+                entries.append("".join(lines)[:-1])
+                lines = []
+    if lines:
+        entries.append("".join(lines)[:-1])
+    return entries
+
+
+class SQLiteHistory(History):
+    def __init__(self, db_path: Path, legacy_path: Optional[Path] = None):
+        """Deduplicated prompt history in SQLite, most recently used entries first"""
+        super().__init__()
+        self.db_path = Path(db_path)
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation: loading runs on a worker thread
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    def _initialize(self) -> None:
+        with self._lock:
+            if self._initialized:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " text TEXT PRIMARY KEY,"
+                    " last_used REAL NOT NULL,"
+                    " uses INTEGER NOT NULL DEFAULT 1)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used DESC)")
+                db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                self._migrate(db)
+            self._initialized = True
+
+    def _migrate(self, db: sqlite3.Connection) -> None:
+        """Import the legacy FileHistory once, keeping its order for recency"""
+        if not self.legacy_path or not self.legacy_path.exists():
+            return
+        if db.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+            return
+
+        entries = read_file_history(self.legacy_path)
+        # Older entries get older timestamps so the original order survives the dedupe
+        base = self.legacy_path.stat().st_mtime - len(entries)
+        db.executemany(
+            "INSERT INTO entries (text, last_used) VALUES (?, ?)"
+            " ON CONFLICT(text) DO UPDATE SET last_used = excluded.last_used, uses = uses + 1",
+            ((text, base + i) for i, text in enumerate(entries) if text.strip()),
+        )
+        db.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(self.legacy_path),))
+
+    def load_history_strings(self) -> Iterable[str]:
+        """Stream entries newest first so the prompt can use them before loading finishes"""
+        self._initialize()
+        db = self._connect()
+        try:
+            cursor = db.execute("SELECT text FROM entries ORDER BY last_used DESC")
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for (text,) in rows:
+                    yield text
+        finally:
+            db.close()
+
+    def store_string(self, string: str) -> None:
+        self._initialize()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO entries (text, last_used) VALUES (?, ?)"
+                " ON CONFLICT(text) DO UPDATE SET last_used = excluded.last_used, uses = uses + 1",
+                (string, time.time()),
+            )
+
+
+class IndexedHistory(ThreadedHistory):
+    def __init__(self, db_path: Path, legacy_path: Optional[Path] = None):
+        """SQLiteHistory loaded on a background thread, deduplicated in memory too"""
+        super().__init__(SQLiteHistory(db_path, legacy_path))
+
+    def append_string(self, string: str) -> None:
+        # Move a repeated entry to the front instead of keeping a second copy
+        with self._lock:
+            try:
+                self._loaded_strings.remove(string)
+            except ValueError:
+                pass
+            self._loaded_strings.insert(0, string)
+        self.store_string(string)
+
+
+class FuzzyIndex:
+    def __init__(self):
+        """Subsequence search over history entries, one linear scan per entry"""
+        self._entries: List[str] = []
+        self._lines: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, entries: List[str]) -> None:
+        """Index entries given most recent first
+
+        Only the first MAX_INDEXED_CHARS of an entry are searched, so a pasted file in
+        the history costs no more than a long prompt.
+        """
+        entries = list(dict.fromkeys(entries))
+        lines = [" ".join(entry[:MAX_INDEXED_CHARS].split()).lower() for entry in entries]
+        # One assignment, the completer thread may be searching the previous index
+        self._entries, self._lines = entries, lines
+
+    @staticmethod
+    def span(line: str, query: str) -> Optional[int]:
+        """Length of a short window of line holding query as a subsequence, None if absent
+
+        Greedy forward to find where a match ends, then backward from there to find
+        the latest start for that end: two passes of str.find, no backtracking.
+        """
+        position = -1
+        for char in query:
+            position = line.find(char, position + 1)
+            if position < 0:
+                return None
+        end = position
+        for char in reversed(query[:-1]):
+            position = line.rfind(char, 0, position)
+        return end - position + 1
+
+    def search(self, query: str, limit: int = 50) -> List[str]:
+        """Entries containing the query characters in order, tightest matches first"""
+        query = " ".join(query.split()).lower()
+        entries, lines = self._entries, self._lines
+        if not query:
+            return entries[:limit]
+
+        scored = []
+        for index, line in enumerate(lines):
+            span = self.span(line, query)
+            if span is None:
+                continue
+            # Tighter spans rank first, recency breaks ties
+            scored.append((span, index))
+            if len(scored) >= limit * 4:
+                break
+
+        scored.sort()
+        return [entries[index] for _, index in scored[:limit]]
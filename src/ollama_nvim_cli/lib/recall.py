@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EMBED_BATCH_SIZE = 64
+# Up to this many rows a query scans the full vectors; above it, a coarse pass over
+# COARSE_DIM principal components picks COARSE_CANDIDATES rows to score exactly
+EXACT_ROWS = 20_000
+COARSE_DIM = 64
+COARSE_CANDIDATES = 512
+BASIS_SAMPLE = 5_000
+
+
+class RecallIndex:
+    def __init__(self, config, ollama_client, history_manager):
+        """Semantic index over every saved chat message"""
+        recall_config = config.get("recall", {})
+        self.model = recall_config.get("model", "nomic-embed-text")
+        self.top_k = recall_config.get("top_k", 5)
+        self.client = ollama_client
+        self.history_manager = history_manager
+
+        self.index_dir = history_manager.history_dir / ".recall"
+        self.vectors_path = self.index_dir / "vectors.f32"
+        self.entries_path = self.index_dir / "entries.jsonl"
+        self.meta_path = self.index_dir / "meta.json"
+        # Derived from the two files above and rebuilt from them when missing
+        self.offsets_path = self.index_dir / "offsets.u64"
+        self.basis_path = self.index_dir / "basis.npz"
+        self.coarse_path = self.index_dir / "coarse.f32"
+
+        self._lock = asyncio.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._basis = None
+        self._coarse: Optional[np.ndarray] = None
+        self.meta = self._load_meta()
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def _empty_meta(self) -> Dict:
+        return {"model": self.model, "dim": 0, "count": 0, "entries_bytes": 0, "sessions": {}}
+
+    def _load_meta(self) -> Dict:
+        """Load index metadata, starting over if the embedding model changed"""
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return self._empty_meta()
+        if meta.get("model") != self.model:
+            return self._empty_meta()
+        return meta
+
+    def _save_meta(self) -> None:
+        """Write metadata atomically, it is the commit point for appended rows"""
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.meta))
+        os.replace(tmp_path, self.meta_path)
+
+    def _get_matrix(self) -> Optional[np.ndarray]:
+        """Memory-map the normalized embedding matrix"""
+        if self._matrix is None and self.meta["count"]:
+            self._matrix = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.meta["count"], self.meta["dim"]),
+            )
+        return self._matrix
+
+    def _get_offsets(self) -> np.ndarray:
+        """Byte offset of each entry line, so a query reads only the entries it returns"""
+        if self._offsets is None:
+            count = self.meta["count"]
+            if not self.offsets_path.exists() or self.offsets_path.stat().st_size < count * 8:
+                # Indexes written before offsets were kept: scan the lines once
+                offsets = np.empty(count, dtype="<u8")
+                position = 0
+                with open(self.entries_path, "rb") as f:
+                    for i, line in zip(range(count), f):
+                        offsets[i] = position
+                        position += len(line)
+                offsets.tofile(self.offsets_path)
+            self._offsets = np.fromfile(self.offsets_path, dtype="<u8", count=count)
+        return self._offsets
+
+    def _read_entries(self, rows: List[int]) -> List[Dict]:
+        offsets = self._get_offsets()
+        entries = []
+        with open(self.entries_path, "rb") as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def _get_basis(self):
+        """Mean and top principal components of a sample of the vectors, fitted once"""
+        if self._basis is None:
+            if not self.basis_path.exists():
+                matrix = self._get_matrix()
+                rng = np.random.default_rng(0)
+                sample = np.sort(rng.choice(len(matrix), min(BASIS_SAMPLE, len(matrix)), replace=False))
+                rows = np.asarray(matrix[sample])
+                mean = rows.mean(axis=0)
+                _, _, vt = np.linalg.svd(rows - mean, full_matrices=False)
+                with open(self.basis_path, "wb") as f:
+                    np.savez(f, mean=mean, components=np.ascontiguousarray(vt[:COARSE_DIM].T))
+            with np.load(self.basis_path) as basis:
+                self._basis = (basis["mean"], basis["components"])
+        return self._basis
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        mean, components = self._get_basis()
+        return ((vectors - mean) @ components).astype(np.float32)
+
+    def _get_coarse(self) -> np.ndarray:
+        """Memory-map the projected vectors, projecting every row on first use"""
+        if self._coarse is None:
+            count = self.meta["count"]
+            if not self.coarse_path.exists() or self.coarse_path.stat().st_size != count * COARSE_DIM * 4:
+                matrix = self._get_matrix()
+                with open(self.coarse_path, "wb") as f:
+                    for start in range(0, count, 8192):
+                        f.write(self._project(matrix[start:start + 8192]).tobytes())
+            self._coarse = np.memmap(self.coarse_path, dtype=np.float32, mode="r", shape=(count, COARSE_DIM))
+        return self._coarse
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches and return L2-normalized float32 rows"""
+        rows = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[start:start + EMBED_BATCH_SIZE]
+            rows.extend(await self.client.embed(batch, model=self.model))
+
+        matrix = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def _append(self, vectors: np.ndarray, entries: List[Dict]) -> None:
+        """Append rows to the on-disk index"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if self.meta["count"] == 0:
+            self.meta["dim"] = vectors.shape[1]
+            # A new index, possibly for another model: the old projection does not apply
+            self.basis_path.unlink(missing_ok=True)
+            self.coarse_path.unlink(missing_ok=True)
+            self._basis = None
+        elif vectors.shape[1] != self.meta["dim"]:
+            raise ValueError(
+                f"Embedding size changed from {self.meta['dim']} to {vectors.shape[1]}, "
+                f"delete {self.index_dir} to rebuild the index"
+            )
+
+        # Drop anything written after the last committed metadata (e.g. an interrupted append)
+        count = self.meta["count"]
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(count * self.meta["dim"] * 4)
+            f.write(vectors.tobytes())
+        offsets = []
+        position = self.meta["entries_bytes"]
+        with open(self.entries_path, "ab") as f:
+            f.truncate(position)
+            for entry in entries:
+                line = (json.dumps(entry) + "\n").encode("utf-8")
+                offsets.append(position)
+                f.write(line)
+                position += len(line)
+        self.meta["entries_bytes"] = position
+        # Extend the derived files when they are in step, otherwise they are rebuilt on use
+        self._extend(self.offsets_path, count * 8, np.asarray(offsets, dtype="<u8").tobytes())
+        if self.basis_path.exists():
+            self._extend(self.coarse_path, count * COARSE_DIM * 4, self._project(vectors).tobytes())
+
+        self.meta["count"] += len(entries)
+        self._matrix = None
+        self._offsets = None
+        self._coarse = None
+
+    @staticmethod
+    def _extend(path, size: int, data: bytes) -> None:
+        """Append to a derived file cut back to size, or drop it if it is behind"""
+        if size and (not path.exists() or path.stat().st_size < size):
+            path.unlink(missing_ok=True)
+            return
+        with open(path, "ab") as f:
+            f.truncate(size)
+            f.write(data)
+
+    async def update(self) -> int:
+        """Embed messages from sessions that changed since the last update"""
+        async with self._lock:
+            added = 0
+            for session_path in self.history_manager.all_sessions():
+                mtime = session_path.stat().st_mtime
+                state = self.meta["sessions"].get(session_path.name, {"count": 0, "mtime": 0})
+                if state["mtime"] == mtime:
+                    continue
+
+                messages = self.history_manager.read_messages(session_path)
+                pending = [
+                    {
+                        "session": session_path.name,
+                        "index": i,
+                        "role": message["role"],
+                        "content": message["content"],
+                        "timestamp": message.get("timestamp"),
+                    }
+                    for i, message in enumerate(messages[state["count"]:], state["count"])
+                    # Tool results are file and command output, not conversation
+                    if message.get("content", "").strip() and message["role"] != "tool"
+                ]
+
+                for start in range(0, len(pending), EMBED_BATCH_SIZE):
+                    batch = pending[start:start + EMBED_BATCH_SIZE]
+                    vectors = await self._embed([entry["content"] for entry in batch])
+                    self._append(vectors, batch)
+                    added += len(batch)
+                    # Commit progress per batch: if a later batch fails, the next update
+                    # resumes after this one instead of appending its rows again
+                    self.meta["sessions"][session_path.name] = {
+                        "count": batch[-1]["index"] + 1,
+                        "mtime": state["mtime"],
+                    }
+                    self._save_meta()
+
+                self.meta["sessions"][session_path.name] = {"count": len(messages), "mtime": mtime}
+                self._save_meta()
+            if added and self.meta["count"] > EXACT_ROWS and self.meta["dim"] > COARSE_DIM:
+                # Fit the projection here rather than in the first query after it is needed
+                await asyncio.get_running_loop().run_in_executor(None, self._get_coarse)
+            return added
+
+    def nearest(self, vector: np.ndarray, k: int) -> List[Dict]:
+        """Return the k entries most similar to a normalized query vector"""
+        matrix = self._get_matrix()
+        if matrix is None:
+            return []
+
+        k = min(k, len(matrix))
+        if len(matrix) <= EXACT_ROWS or self.meta["dim"] <= COARSE_DIM:
+            rows = np.arange(len(matrix))
+            scores = matrix @ vector
+        else:
+            # Rank by the projection first, then score the candidates with full vectors
+            mean, components = self._get_basis()
+            coarse = self._get_coarse() @ (vector @ components)
+            candidates = min(max(COARSE_CANDIDATES, k), len(coarse))
+            rows = np.sort(np.argpartition(coarse, -candidates)[-candidates:])
+            scores = matrix[rows] @ vector
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+
+        entries = self._read_entries([int(rows[i]) for i in top])
+        return [{**entry, "score": float(scores[i])} for entry, i in zip(entries, top)]
+
+    async def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        """Find past turns relevant to a query"""
+        if not self.meta["count"]:
+            return []
+        vector = (await self._embed([query]))[0]
+        return self.nearest(vector, k or self.top_k)
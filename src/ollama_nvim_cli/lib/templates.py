@@ -0,0 +1,148 @@
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# {name} is a variable, {> name} includes another template, {{ and }} are literal braces
+TOKEN_PATTERN = re.compile(r"\{\{|\}\}|\{>\s*([\w.-]+)\s*\}|\{([A-Za-z_]\w*)\}")
+
+
+class _Variables(dict):
+    """Leave unknown placeholders untouched so code snippets in templates survive"""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+class Template:
+    def __init__(self, name: str, source: str):
+        """A template parsed into literal and placeholder parts"""
+        self.name = name
+        self.source = source
+        self.parts: List[Tuple[str, str]] = []
+        self.includes: List[str] = []
+        self._parse()
+        self.compiled: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def _parse(self) -> None:
+        position = 0
+        for match in TOKEN_PATTERN.finditer(self.source):
+            if match.start() > position:
+                self.parts.append(("text", self.source[position:match.start()]))
+            token, include, variable = match.group(0), match.group(1), match.group(2)
+            if include:
+                self.parts.append(("include", include))
+                self.includes.append(include)
+            elif variable:
+                self.parts.append(("var", variable))
+            else:
+                self.parts.append(("text", token[0]))
+            position = match.end()
+        if position < len(self.source):
+            self.parts.append(("text", self.source[position:]))
+
+    @property
+    def variables(self) -> List[str]:
+        return [value for kind, value in self.parts if kind == "var"]
+
+    def render(self, variables: Dict[str, str]) -> str:
+        """Render a compiled template, one C-level format_map call"""
+        if self.compiled is None:
+            raise ValueError(self.error or f"Template '{self.name}' is not compiled")
+        return self.compiled.format_map(_Variables(variables))
+
+
+class TemplateManager:
+    def __init__(self, templates_dir: Path, check_interval: float = 1.0):
+        """Load templates once and recompile only what changed on disk"""
+        self.templates_dir = Path(templates_dir).expanduser()
+        self.check_interval = check_interval
+        self._templates: Dict[str, Template] = {}
+        self._mtimes: Dict[str, int] = {}
+        self._dir_mtime: Optional[int] = None
+        self._last_check = 0.0
+        self.reload()
+
+    def _refresh(self) -> None:
+        """Poll the directory at most once per check interval"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        self.reload()
+
+    def reload(self) -> bool:
+        """Re-read templates whose mtime changed; returns True if anything changed"""
+        try:
+            dir_mtime = self.templates_dir.stat().st_mtime_ns
+        except OSError:
+            changed = bool(self._templates)
+            self._templates, self._mtimes, self._dir_mtime = {}, {}, None
+            return changed
+
+        changed = dir_mtime != self._dir_mtime
+        self._dir_mtime = dir_mtime
+
+        seen = set()
+        for path in self.templates_dir.glob("*.md"):
+            name = path.stem
+            seen.add(name)
+            try:
+                mtime = path.stat().st_mtime_ns
+                if self._mtimes.get(name) == mtime:
+                    continue
+                self._templates[name] = Template(name, path.read_text())
+                self._mtimes[name] = mtime
+                changed = True
+            except OSError:
+                continue
+
+        for name in set(self._templates) - seen:
+            del self._templates[name]
+            del self._mtimes[name]
+            changed = True
+
+        if changed:
+            self._compile_all()
+        return changed
+
+    def _compile_all(self) -> None:
+        """Inline includes and turn each template into a single format string"""
+        for template in self._templates.values():
+            try:
+                template.compiled, template.error = self._compile(template, ()), None
+            except ValueError as e:
+                template.compiled, template.error = None, str(e)
+
+    def _compile(self, template: Template, stack: Tuple[str, ...]) -> str:
+        if template.name in stack:
+            chain = " -> ".join([*stack, template.name])
+            raise ValueError(f"Template include cycle: {chain}")
+
+        pieces = []
+        for kind, value in template.parts:
+            if kind == "text":
+                pieces.append(value.replace("{", "{{").replace("}", "}}"))
+            elif kind == "var":
+                pieces.append("{" + value + "}")
+            else:
+                included = self._templates.get(value)
+                if included is None:
+                    raise ValueError(f"Template '{template.name}' includes unknown template '{value}'")
+                pieces.append(self._compile(included, (*stack, template.name)))
+        return "".join(pieces)
+
+    def names(self) -> List[str]:
+        self._refresh()
+        return sorted(self._templates)
+
+    def get(self, name: str) -> Optional[Template]:
+        self._refresh()
+        return self._templates.get(name)
+
+    def render(self, name: str, variables: Dict[str, str]) -> str:
+        template = self.get(name)
+        if template is None:
+            raise KeyError(f"Template '{name}' not found in {self.templates_dir}")
+        return template.render(variables)
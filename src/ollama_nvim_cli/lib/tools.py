@@ -0,0 +1,294 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BINARY_SNIFF_BYTES = 8192
+MAX_LISTED_FILES = 500
+MAX_GREP_MATCHES = 200
+MAX_PATTERN_CHARS = 1000
+MAX_GREP_LINE_CHARS = 4000
+MAX_GREP_FILE_BYTES = 2_000_000
+
+
+def truncate(text: str, limit: int, keep: str = "head") -> str:
+    """Cut tool output to limit characters; command output keeps its tail, where errors are"""
+    if len(text) <= limit:
+        return text
+    dropped = len(text) - limit
+    if keep == "tail":
+        return f"[{dropped:,} characters cut]\n" + text[-limit:]
+    return text[:limit] + f"\n[{dropped:,} characters cut]"
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill a tool command together with everything it started"""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        process.kill()
+
+
+def grep_files(pattern: str, flags: int, files: List[Path], root: Path) -> List[str]:
+    """Lines of files matching pattern as path:line: text, at most MAX_GREP_MATCHES
+
+    Runs in a worker process: re cannot be interrupted, and a model-written pattern
+    can backtrack for hours on the wrong line. Only the first MAX_GREP_LINE_CHARS of
+    a line are searched and files over MAX_GREP_FILE_BYTES are skipped.
+    """
+    regex = re.compile(pattern, flags)
+    matches = []
+    for file in files:
+        try:
+            if file.stat().st_size > MAX_GREP_FILE_BYTES:
+                continue
+            with open(file, "rb") as f:
+                if b"\0" in f.read(BINARY_SNIFF_BYTES):
+                    continue
+            with open(file, "r", encoding="utf-8", errors="replace") as f:
+                for number, line in enumerate(f, 1):
+                    if regex.search(line, 0, MAX_GREP_LINE_CHARS):
+                        matches.append(f"{file.relative_to(root).as_posix()}:{number}: {line.rstrip()[:300]}")
+                        if len(matches) >= MAX_GREP_MATCHES:
+                            return matches
+        except OSError:
+            continue
+    return matches
+
+
+class ToolRegistry:
+    def __init__(self, config, context_loader):
+        """Local functions the model can call through Ollama's `tools` field
+
+        Paths are resolved against the working directory the chat started in and may
+        not leave it. run_command is only offered when tools.allow_commands is set.
+        """
+        tools_config = config.get("tools", {})
+        self.root = Path.cwd().resolve()
+        self.timeout = tools_config.get("timeout", 60)
+        self.max_output = tools_config.get("max_output_chars", 16000)
+        self.test_command = tools_config.get("test_command", "python -m pytest -q")
+        self.context_loader = context_loader
+        self.tools: Dict[str, Dict] = {}
+        # Commands still running, killed by close()
+        self._processes = set()
+        self._processes_lock = threading.Lock()
+
+        self.register(
+            "read_file", self.read_file, "Read a text file, optionally a range of lines",
+            {
+                "path": {"type": "string", "description": "File path relative to the project"},
+                "start_line": {"type": "integer", "description": "First line to read, from 1"},
+                "end_line": {"type": "integer", "description": "Last line to read"},
+            },
+            required=["path"],
+        )
+        self.register(
+            "list_files", self.list_files, "List the files in a directory or matching a glob, honouring .gitignore",
+            {"path": {"type": "string", "description": "Directory or glob, default the project root"}},
+        )
+        self.register(
+            "grep", self.grep, "Search files for a regular expression, returning file:line: text matches",
+            {
+                "pattern": {"type": "string", "description": "Python regular expression"},
+                "path": {"type": "string", "description": "File, directory or glob to search, default the project"},
+                "ignore_case": {"type": "boolean"},
+            },
+            required=["pattern"],
+        )
+        self.register(
+            "run_tests", self.run_tests, f"Run the test suite ({self.test_command}) and return its output",
+            {"args": {"type": "string", "description": "Extra arguments, e.g. a test file or -k filter"}},
+        )
+        if tools_config.get("allow_commands", False):
+            self.register(
+                "run_command", self.run_command, "Run a shell command in the project and return its output",
+                {"command": {"type": "string"}},
+                required=["command"],
+            )
+
+    def register(
+        self,
+        name: str,
+        function: Callable,
+        description: str,
+        properties: Dict,
+        required: Optional[List[str]] = None,
+    ) -> None:
+        """Register a function taking the tool arguments as keywords and returning text"""
+        self.tools[name] = {
+            "function": function,
+            "schema": {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": description,
+                    "parameters": {"type": "object", "properties": properties, "required": required or []},
+                },
+            },
+        }
+
+    def schemas(self) -> List[Dict]:
+        """The `tools` field of a chat request"""
+        return [tool["schema"] for tool in self.tools.values()]
+
+    def call(self, tool_call: Dict) -> Dict:
+        """Run one call from a model response, never raising: errors are the model's to read
+
+        Blocking: runs in the executor's threads.
+        """
+        function = tool_call.get("function", {})
+        name = function.get("name", "")
+        arguments = function.get("arguments") or {}
+        started = time.perf_counter()
+        try:
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments)
+            tool = self.tools.get(name)
+            if tool is None:
+                raise ValueError(f"Unknown tool '{name}', available: {', '.join(self.tools)}")
+            content = tool["function"](**arguments)
+            error = False
+        except subprocess.TimeoutExpired:
+            content, error = f"Error: timed out after {self.timeout}s", True
+        except Exception as e:
+            content, error = f"Error: {str(e)}", True
+        return {
+            "name": name,
+            "arguments": arguments,
+            "content": content,
+            "error": error,
+            "duration": time.perf_counter() - started,
+        }
+
+    def _inside(self, path: Path) -> bool:
+        try:
+            path.relative_to(self.root)
+        except ValueError:
+            return False
+        return True
+
+    def _path(self, path: str) -> Path:
+        resolved = (self.root / os.path.expanduser(path)).resolve()
+        if not self._inside(resolved):
+            raise ValueError(f"'{path}' is outside the project ({self.root})")
+        return resolved
+
+    def _files(self, path: str) -> List[Path]:
+        if not any(c in path for c in "*?["):
+            return self.context_loader.resolve(str(self._path(path)))
+        files = self.context_loader.resolve(str(self.root / path))
+        return [f for f in files if self._inside(f)]
+
+    def read_file(self, path: str, start_line: int = 1, end_line: Optional[int] = None) -> str:
+        target = self._path(path)
+        with open(target, "rb") as f:
+            if b"\0" in f.read(BINARY_SNIFF_BYTES):
+                raise ValueError(f"'{path}' is a binary file")
+        with open(target, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+        start = max(1, int(start_line))
+        selected = lines[start - 1:int(end_line) if end_line else None]
+        return truncate("".join(selected), self.max_output)
+
+    def list_files(self, path: str = ".") -> str:
+        files = [f.relative_to(self.root).as_posix() for f in self._files(path)]
+        more = f"\n[{len(files) - MAX_LISTED_FILES} more]" if len(files) > MAX_LISTED_FILES else ""
+        return "\n".join(files[:MAX_LISTED_FILES]) + more
+
+    def grep(self, pattern: str, path: str = ".", ignore_case: bool = False) -> str:
+        """Search in a worker process, killed after tools.timeout seconds like a command"""
+        if len(pattern) > MAX_PATTERN_CHARS:
+            raise ValueError(f"Pattern is longer than {MAX_PATTERN_CHARS} characters")
+        flags = re.IGNORECASE if ignore_case else 0
+        # Syntax errors are reported without starting a process
+        re.compile(pattern, flags)
+        files = self._files(path)
+        # Leaving the block terminates the worker, finished or not
+        with multiprocessing.Pool(1) as pool:
+            try:
+                matches = pool.apply_async(grep_files, (pattern, flags, files, self.root)).get(self.timeout)
+            except multiprocessing.TimeoutError:
+                raise subprocess.TimeoutExpired("grep", self.timeout)
+        if len(matches) >= MAX_GREP_MATCHES:
+            return "\n".join(matches) + f"\n[stopped at {MAX_GREP_MATCHES} matches]"
+        return truncate("\n".join(matches), self.max_output) if matches else "No matches"
+
+    def _run(self, args, shell: bool = False) -> str:
+        """Run a subprocess in the project, killed after tools.timeout seconds
+
+        The child leads its own process group, so a timeout also kills whatever it
+        started (a shell's commands, test workers) rather than only the child itself.
+        """
+        process = subprocess.Popen(
+            args,
+            shell=shell,
+            cwd=self.root,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+            start_new_session=True,
+        )
+        with self._processes_lock:
+            self._processes.add(process)
+        try:
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            process.communicate()
+            raise
+        finally:
+            with self._processes_lock:
+                self._processes.discard(process)
+        output = (stdout + stderr).strip()
+        return f"exit code {process.returncode}\n" + truncate(output, self.max_output, keep="tail")
+
+    def close(self) -> None:
+        """Kill commands that are still running"""
+        with self._processes_lock:
+            for process in self._processes:
+                _kill(process)
+
+    def run_tests(self, args: str = "") -> str:
+        return self._run(shlex.split(self.test_command) + shlex.split(args))
+
+    def run_command(self, command: str) -> str:
+        return self._run(command, shell=True)
+
+
+class ToolExecutor:
+    def __init__(self, registry: ToolRegistry, workers: int = 8):
+        """Runs the tool calls of one model turn in parallel on a thread pool
+
+        The calls a model makes in one response cannot depend on each other's results
+        (it has seen none of them yet), so they all start at once. File tools are I/O
+        bound and subprocess tools wait on their child, so threads are enough.
+        """
+        self.registry = registry
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="onc-tool")
+
+    def shutdown(self) -> None:
+        """Stop the pool without waiting on commands, which are killed instead"""
+        self.registry.close()
+        self._pool.shutdown(wait=False)
+
+    async def run(self, tool_calls: List[Dict]) -> List[Dict]:
+        """Results in the order of the calls, see ToolRegistry.call"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(loop.run_in_executor(self._pool, self.registry.call, call) for call in tool_calls)
+        )
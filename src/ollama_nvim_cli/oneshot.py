@@ -0,0 +1,181 @@
+# One-shot mode: `onc -p "question"` and `cmd | onc -p`. Kept free of rich,
+# prompt_toolkit and typer so scripts and editor `:!` commands get the first
+# token quickly. Diagnostics go to stderr, the exit code says what happened.
+import argparse
+import asyncio
+import os
+import stat
+import sys
+import time
+from typing import List, Optional
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+PIPE_FLUSH_BYTES = 4096
+PIPE_FLUSH_INTERVAL = 0.05
+
+
+def wants_oneshot(argv: List[str]) -> bool:
+    """True when the arguments ask for one-shot mode before any subcommand"""
+    for arg in argv:
+        if arg in ("-p", "--prompt") or arg.startswith("--prompt="):
+            return True
+        if not arg.startswith("-"):
+            return False
+    return False
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="onc",
+        description="Ask a single question and stream the answer to stdout. "
+        "Piped stdin is appended to the question.",
+    )
+    parser.add_argument("-p", "--prompt", nargs="?", const="", required=True, help="Question to ask")
+    parser.add_argument("-m", "--model", help="Model to use (not saved)")
+    parser.add_argument("--config-file", help="Path to config file")
+    parser.add_argument(
+        "-s", "--session",
+        help="Append the exchange to a session: 'new', 'last' or a session file path",
+    )
+    parser.add_argument(
+        "-i", "--image", action="append", default=[],
+        help="Attach an image (repeatable, for multimodal models)",
+    )
+    parser.add_argument("--no-daemon", action="store_true", help="Talk to Ollama directly")
+    return parser
+
+
+class StreamWriter:
+    def __init__(self, stream):
+        """Write tokens as they arrive: every token to a terminal, batched to pipes"""
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def write(self, text: str) -> None:
+        self.stream.write(text)
+        self.pending += len(text)
+        now = time.monotonic()
+        if (
+            self.interactive
+            or "\n" in text
+            or self.pending >= PIPE_FLUSH_BYTES
+            or now - self.last_flush >= PIPE_FLUSH_INTERVAL
+        ):
+            self.flush(now)
+
+    def flush(self, now: Optional[float] = None) -> None:
+        self.stream.flush()
+        self.pending = 0
+        self.last_flush = now or time.monotonic()
+
+
+def stdin_is_piped() -> bool:
+    """Only pipes and redirected files count, an inherited non-tty device would block"""
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISREG(mode)
+
+
+def read_question(args) -> str:
+    """Combine the -p text with piped stdin"""
+    parts = []
+    if args.prompt:
+        parts.append(args.prompt)
+    if stdin_is_piped():
+        piped = sys.stdin.read()
+        if piped.strip():
+            parts.append(piped)
+    return "\n\n".join(parts).strip()
+
+
+def open_session(config, session: str):
+    from .lib.history import HistoryManager
+
+    history_manager = HistoryManager(config)
+    if session == "last":
+        sessions = history_manager.all_sessions()
+        if sessions:
+            history_manager.load_session(str(sessions[0]))
+    elif session != "new":
+        history_manager.load_session(os.path.expanduser(session))
+    return history_manager
+
+
+async def run(
+    config, question: str, session: Optional[str], use_daemon: bool, image_paths: List[str] = ()
+) -> str:
+    refs, images = [], []
+    if image_paths:
+        from .lib.images import ImageStore
+
+        store = ImageStore(config)
+        refs = [store.attach(path) for path in image_paths]
+        images = [store.encoded(ref) for ref in refs]
+
+    if use_daemon:
+        from .api.daemon import create_client
+
+        client = create_client(config)
+    else:
+        from .api.ollama import OllamaClient
+
+        client = OllamaClient(config)
+
+    writer = StreamWriter(sys.stdout)
+    answer = []
+    async with client:
+        async for chunk in client.generate(question, images=images):
+            answer.append(chunk)
+            writer.write(chunk)
+    if answer and not answer[-1].endswith("\n"):
+        writer.write("\n")
+    writer.flush()
+
+    response = "".join(answer)
+    if session:
+        history_manager = open_session(config, session)
+        history_manager.add_message("user", question, images=refs)
+        history_manager.add_message("assistant", response)
+        print(f"onc: saved to {history_manager.current_session}", file=sys.stderr)
+    return response
+
+
+def main(argv: List[str]) -> int:
+    args = build_parser().parse_args(argv)
+
+    from .lib.config import Config, ConfigError
+
+    try:
+        config = Config(args.config_file)
+        if args.model:
+            config.set("model", args.model, persist=False)
+    except ConfigError as e:
+        print(f"onc: config error: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+
+    question = read_question(args)
+    if not question:
+        print("onc: nothing to ask, pass -p TEXT or pipe text on stdin", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        asyncio.run(run(config, question, args.session, not args.no_daemon, args.image))
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly like other filters
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return EXIT_OK
+    except Exception as e:
+        print(f"onc: {str(e)}", file=sys.stderr)
+        return EXIT_ERROR
+    return EXIT_OK
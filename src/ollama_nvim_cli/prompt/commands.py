@@ -0,0 +1,55 @@
+import inspect
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class CommandDispatcher:
+    def __init__(self):
+        """Route /commands typed at the prompt to their handlers"""
+        self.commands: Dict[str, Tuple[Callable, str]] = {}
+        self.aliases: Dict[str, str] = {}
+
+    def register(
+        self, name: str, handler: Callable, help: str = "", aliases: Optional[List[str]] = None
+    ) -> None:
+        """Register a handler taking the argument string after the command name"""
+        self.commands[name] = (handler, help)
+        for alias in aliases or []:
+            self.aliases[alias] = name
+
+    def command(self, name: str, help: str = "", aliases: Optional[List[str]] = None):
+        """Decorator form of register"""
+        def decorator(handler: Callable) -> Callable:
+            self.register(name, handler, help, aliases)
+            return handler
+        return decorator
+
+    @staticmethod
+    def is_command(text: str) -> bool:
+        return text.startswith("/")
+
+    def resolve(self, name: str) -> Optional[Callable]:
+        name = self.aliases.get(name, name)
+        entry = self.commands.get(name)
+        return entry[0] if entry else None
+
+    def names(self) -> List[str]:
+        return sorted([*self.commands, *self.aliases])
+
+    def help_rows(self) -> List[Tuple[str, str]]:
+        rows = []
+        for name, (_, help) in sorted(self.commands.items()):
+            aliases = [alias for alias, target in self.aliases.items() if target == name]
+            label = " / ".join(f"/{n}" for n in [name, *aliases])
+            rows.append((label, help))
+        return rows
+
+    async def dispatch(self, text: str) -> None:
+        """Run the handler for a command line like '/template default'"""
+        name, _, args = text[1:].partition(" ")
+        handler = self.resolve(name)
+        if handler is None:
+            raise ValueError(f"Unknown command '/{name}', type /help for the list of commands")
+
+        result = handler(args.strip())
+        if inspect.isawaitable(result):
+            await result
@@ -1,8 +1,19 @@
+import base64
 import tempfile
 import os
+import sys
 from shutil import which
 import subprocess
 
+# Tried in order; the first one installed wins
+CLIPBOARD_COMMANDS = [
+    ["pbcopy"],
+    ["wl-copy"],
+    ["xclip", "-selection", "clipboard"],
+    ["xsel", "--clipboard", "--input"],
+    ["clip.exe"],
+]
+
 
 class Editor:
     def __init__(self, editor_cmd: str = "lvim"):
@@ -58,3 +69,15 @@ class Editor:
             subprocess.run([editor_path, file_path], check=True)
         except Exception as e:
             print(f"Error opening file in editor: {str(e)}")
+
+    def copy_to_clipboard(self, text: str) -> str:
+        """Copy text with the first available clipboard tool, falling back to OSC 52"""
+        for command in CLIPBOARD_COMMANDS:
+            if which(command[0]):
+                subprocess.run(command, input=text.encode("utf-8"), check=True)
+                return command[0]
+        # Understood by most terminals and tmux, and works over SSH
+        payload = base64.b64encode(text.encode("utf-8")).decode("ascii")
+        sys.__stdout__.write(f"\033]52;c;{payload}\a")
+        sys.__stdout__.flush()
+        return "terminal (OSC 52)"
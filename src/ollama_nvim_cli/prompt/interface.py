@@ -4,7 +4,6 @@ from prompt_toolkit.styles import Style
 from prompt_toolkit import PromptSession
 from rich.console import Console
 from rich.theme import Theme
-from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
 from rich.align import Align
@@ -17,6 +16,8 @@ import sys
 
 from .keyboard import KeyboardHandler
 from .editor import Editor
+from .render import HighlightCache, ResponseMarkdown
+from ..lib.codeblocks import CodeBlockIndex
 
 class ChatInterface:
     def __init__(self, config: dict, history_manager, ollama_client):
@@ -28,6 +29,7 @@ class ChatInterface:
         self.start_time = time.time()
         self.last_response = None
         self.editor = Editor(config["editor"])
+        self.highlight_cache = HighlightCache()
 
         # Initialize console with theme
         self.console = Console(
@@ -110,10 +112,13 @@ class ChatInterface:
         self.console.print("\r" + " " * 80 + "\r", end="")
         
         # Print AI response with model prefix
-        self.console.print(
-            f"[blue]{model_name}[/][white]>>>  [/]{accumulated_response.strip()}",
-            soft_wrap=True
-        )
+        self.console.print(f"[blue]{model_name}[/][white]>>>[/]")
+        self.console.print(ResponseMarkdown(
+            accumulated_response.strip(),
+            self.highlight_cache,
+            CodeBlockIndex.from_text(accumulated_response),
+            self.theme.get("code", "monokai"),
+        ))
         
         return accumulated_response
 
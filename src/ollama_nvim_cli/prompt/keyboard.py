@@ -1,7 +1,9 @@
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.keys import Keys
+from prompt_toolkit.filters import Condition
 from rich.table import Table
 from rich.panel import Panel
+import statistics
 import time
 import sys
 from datetime import datetime
@@ -11,6 +13,9 @@ class KeyboardHandler:
     def __init__(self, interface):
         self.interface = interface
         self.kb = KeyBindings()
+        # The legacy ChatInterface has no history search
+        self.search = getattr(interface, "history_search", None)
+        self.search_active = Condition(lambda: bool(self.search and self.search.active))
         self.setup_bindings()
 
     def setup_bindings(self):
@@ -21,6 +26,35 @@ class KeyboardHandler:
             if help_file.exists():
                 self.interface.editor.open_file(str(help_file))
 
+        @self.kb.add("c-r")
+        def handle_history_search(event):
+            """Fuzzy search prompt history"""
+            if self.search:
+                self.search.start(event.current_buffer)
+
+        @self.kb.add("enter", filter=self.search_active)
+        def handle_accept_search(event):
+            """Put the selected (or best) match in the prompt for review before sending"""
+            buffer = event.current_buffer
+            state = buffer.complete_state
+            selected = state.current_completion if state else None
+            if selected:
+                text = selected.text
+            else:
+                # The menu may still be computing when Enter follows fast typing
+                match = self.search.best_match(buffer.text)
+                text = match or buffer.text
+            self.search.stop()
+            buffer.cancel_completion()
+            buffer.text = text
+            buffer.cursor_position = len(text)
+
+        @self.kb.add("escape", filter=self.search_active)
+        def handle_cancel_search(event):
+            """Leave history search, keeping the typed text"""
+            self.search.stop()
+            event.current_buffer.cancel_completion()
+
         @self.kb.add("backspace")
         def handle_backspace(event):
             """Handle backspace normally"""
@@ -98,6 +132,40 @@ class KeyboardHandler:
             if help_file.exists():
                 self.interface.editor.open_file(str(help_file))
 
+    def add_prewarm_rows(self, table, prewarmer):
+        """Compare time to first token of prewarmed turns against cold ones"""
+        warm, cold = [], []
+        for msg in self.interface.history_manager.messages:
+            stats = msg.get("stats") or {}
+            # First turns have no prefix to prewarm and often include loading the model
+            if msg["role"] != "assistant" or "ttft" not in stats or not stats.get("history"):
+                continue
+            (warm if stats.get("prewarmed") else cold).append(stats["ttft"])
+
+        table.add_row("Prewarms", f"{prewarmer.completed} done, {prewarmer.cancelled} cancelled")
+        if warm:
+            table.add_row("TTFT (prewarmed)", f"{statistics.median(warm) * 1000:.0f} ms median")
+        if cold:
+            table.add_row("TTFT (cold)", f"{statistics.median(cold) * 1000:.0f} ms median")
+        if warm and cold:
+            saved = statistics.median(cold) - statistics.median(warm)
+            table.add_row("TTFT Saved", f"{saved * 1000:.0f} ms per turn")
+
+    def add_tool_rows(self, table):
+        """Latency of each tool the model called in this session"""
+        durations = {}
+        for msg in self.interface.history_manager.messages:
+            stats = msg.get("stats") or {}
+            if msg["role"] == "tool" and "duration" in stats:
+                durations.setdefault(msg.get("tool_name", "?"), []).append(stats["duration"])
+
+        for name, values in sorted(durations.items()):
+            calls = f"{len(values)} call{'s' if len(values) > 1 else ''}"
+            table.add_row(
+                f"Tool {name}",
+                f"{calls}, {statistics.median(values) * 1000:.0f} ms median, {max(values) * 1000:.0f} ms max",
+            )
+
     def display_stats(self):
         """Display session statistics"""
         elapsed_time = time.time() - self.interface.start_time
@@ -129,6 +197,11 @@ class KeyboardHandler:
             "AI/User Ratio", f"{(ai_chars/user_chars if user_chars else 0):.2f}"
         )
 
+        prewarmer = getattr(self.interface, "prewarmer", None)
+        if prewarmer and prewarmer.enabled:
+            self.add_prewarm_rows(table, prewarmer)
+        self.add_tool_rows(table)
+
         self.interface.console.print(
             Panel(
                 table,
@@ -1,33 +1,74 @@
 from prompt_toolkit import PromptSession
+from prompt_toolkit.completion import ThreadedCompleter
 from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.styles import Style
+from prompt_toolkit.patch_stdout import patch_stdout
 from rich.console import Console
 from rich.theme import Theme
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
 from rich.align import Align
-from rich.spinner import Spinner
-from rich.live import Live
 from datetime import datetime
 from pathlib import Path
 import time
 import sys
 import asyncio
+import json
 
 from .keyboard import KeyboardHandler
 from .editor import Editor
+from ..lib.history import HistoryManager
+from ..lib.recall import RecallIndex
+from ..lib.context import ContextLoader, estimate_tokens
+from ..lib.templates import TemplateManager
+from ..lib.prewarm import Prewarmer
+from ..lib import profiling
+from ..lib.codeblocks import CodeBlockIndex
+from ..lib.images import ImageStore
+from ..lib.jsonstream import JSONStream, JSONStreamError, SchemaError, format_path
+from ..lib.tools import ToolExecutor, ToolRegistry
+from .commands import CommandDispatcher
+from .render import HighlightCache, ResponseMarkdown
+from .search import HistorySearch
+from .tabs import Tab
+
+FALLBACK_TEMPLATE = "Context: {context}\n\nQuestion: {question}"
+TOOLBAR_REFRESH = 0.25
+JSON_INSTRUCTION = "\n\nRespond only with JSON."
+SCHEMA_INSTRUCTION = "\n\nRespond only with JSON matching this schema:\n{schema}"
 
 class Prompt:
     def __init__(self, config: dict, history_manager, ollama_client):
         self.config = config
-        self.history_manager = history_manager
+        self.tabs = [Tab(1, history_manager)]
+        self.active = self.tabs[0]
+        self._turns = 0
         self.ollama_client = ollama_client
         self.theme = config.get("theme", {})
+        self.code_theme = self.theme.get("code", "monokai")
+        self.highlight_cache = HighlightCache()
         self.config_dir = Path(config.config_path).parent
         self.start_time = time.time()
         self.last_response = None
         self.editor = Editor(config.get("editor", "nvim"))
+        self.context_loader = ContextLoader(config)
+        self.images = ImageStore(config)
+        self.max_history_images = config.get("images.max_history_images")
+        self.recall = RecallIndex(config, ollama_client, history_manager)
+        self._recall_task = None
+        self._recall_auto = config.get("recall", {}).get("auto_index", True)
+        self.templates = TemplateManager(self.config_dir / "templates")
+        self.active_template = None
+        self.json_format = None
+        self.tools = ToolRegistry(config, self.context_loader)
+        self.tool_executor = ToolExecutor(self.tools, config.get("tools.workers"))
+        self.tools_enabled = config.get("tools.enabled")
+        self.max_tool_rounds = config.get("tools.max_rounds")
+        self.commands = CommandDispatcher()
+        self.register_commands()
+        self.prewarmer = Prewarmer(ollama_client, config)
+        self._prepare_task = None
 
         # Initialize console with theme
         self.console = Console(
@@ -41,6 +82,7 @@ class Prompt:
         )
 
         # Initialize keyboard handler
+        self.history_search = HistorySearch(history_manager.prompt_history)
         self.keyboard = KeyboardHandler(self)
 
         # Setup prompt session
@@ -56,7 +98,52 @@ class Prompt:
             ),
             style=self.style,
             key_bindings=self.keyboard.kb,
+            bottom_toolbar=self.toolbar,
+            history=history_manager.prompt_history,
+            # Searching runs in a thread so a large history never blocks typing
+            completer=ThreadedCompleter(self.history_search),
+            complete_while_typing=self.history_search.is_active,
         )
+        self.session.default_buffer.on_text_changed += self.on_text_changed
+
+    @property
+    def history_manager(self):
+        """The active tab's session"""
+        return self.active.history_manager
+
+    @property
+    def last_response(self):
+        return self.active.last_response
+
+    @last_response.setter
+    def last_response(self, value):
+        self.active.last_response = value
+        self.active.code_index = None
+
+    @property
+    def attachments(self):
+        """The active tab's /add targets; context and images below are per tab as well"""
+        return self.active.attachments
+
+    @attachments.setter
+    def attachments(self, value):
+        self.active.attachments = value
+
+    @property
+    def context(self):
+        return self.active.context
+
+    @context.setter
+    def context(self, value):
+        self.active.context = value
+
+    @property
+    def pending_images(self):
+        return self.active.pending_images
+
+    @pending_images.setter
+    def pending_images(self, value):
+        self.active.pending_images = value
 
     def format_header(self) -> str:
         """Format the welcome header with keyboard shortcuts"""
@@ -72,6 +159,7 @@ class Prompt:
         shortcuts.add_column("Description", style="dim", justify="left")
         
         shortcuts.add_row("Ctrl+H or F1", "Show help")
+        shortcuts.add_row("Ctrl+R", "Fuzzy search prompt history")
         shortcuts.add_row("Ctrl+I", "Edit current prompt")
         shortcuts.add_row("Esc, E", "Edit last response")
         shortcuts.add_row("Esc, S", "Show sessions")
@@ -93,67 +181,788 @@ class Prompt:
             padding=(1, 2),
         )
 
-    async def process_response(self, response_generator):
-        accumulated_response = ""
-        start_time = time.time()
-        spinner = Spinner("dots")
-        model_name = self.ollama_client.model.split(":")[0]
+    def refresh_toolbar(self) -> None:
+        # No-op while the prompt is not running
+        self.session.app.invalidate()
 
-        async def update_spinner():
-            while True:
-                current_time = time.time()
-                yield f"{spinner.render(current_time)} Generating response... {current_time - start_time:.1f}s"
-                await asyncio.sleep(0.1)
+    async def process_response(self, tab, response_generator, json_stream=None, tool_calls=None):
+        """Collect a streamed answer in the background, keeping the job status current
 
-        spinner_gen = update_spinner()
-        
-        with Live(
-            await anext(spinner_gen),  # Get first spinner frame
-            console=self.console,
-            refresh_per_second=10
-        ) as live:
-            async for chunk in response_generator:
-                accumulated_response += chunk
+        With a json_stream each chunk is parsed as it arrives, and the request is
+        aborted as soon as the output can no longer be valid. A response that only
+        calls tools (filled into tool_calls by the client) is not shown.
+        """
+        accumulated_response = ""
+        tracer = profiling.tracer
+        request_start = time.perf_counter()
+        first_token = None
+        last_refresh = 0.0
+        json_error = None
+        code_index = CodeBlockIndex()
+
+        async for chunk in response_generator:
+            if first_token is None:
+                first_token = time.perf_counter()
+                tab.status = "generating"
+            accumulated_response += chunk
+            tab.received += len(chunk)
+            code_index.feed(chunk)
+            if json_stream:
                 try:
-                    live.update(await anext(spinner_gen))
-                except StopAsyncIteration:
+                    json_stream.feed(chunk)
+                except (JSONStreamError, SchemaError) as e:
+                    json_error = str(e)
                     break
+            if time.perf_counter() - last_refresh > TOOLBAR_REFRESH:
+                self.refresh_toolbar()
+                last_refresh = time.perf_counter()
+        if json_error:
+            # Closing the generator closes the connection, so Ollama stops decoding
+            await response_generator.aclose()
+        elif json_stream and not tool_calls:
+            try:
+                json_stream.finish()
+            except (JSONStreamError, SchemaError) as e:
+                json_error = str(e)
+        done = time.perf_counter()
+        tracer.complete("ollama.first_token", request_start, first_token or done)
+        tracer.complete("ollama.stream", first_token or done, done)
+        code_index.finish()
+        tab.code_index = code_index
 
-        # Clear any remaining loading indicator
-        self.console.print("\r" + " " * 80 + "\r", end="")
+        if tool_calls and not accumulated_response.strip():
+            return accumulated_response
+        with tracer.span("render"):
+            self.show_response(tab, accumulated_response, json_stream is not None and not json_error)
+        if json_error:
+            json_stream.error = json_error
+            self.console.print(f"[red]Invalid JSON after {len(accumulated_response):,} characters: {json_error}[/]")
+
+        return accumulated_response
 
+    def show_response(self, tab, response: str, is_json: bool = False) -> None:
+        """Print an answer if its tab is in front, otherwise just say it is ready"""
+        if tab is not self.active:
+            tab.unread = True
+            self.console.print(f"[green]Tab {tab.number} answered, /tab {tab.number} to read it[/]")
+            return
+
+        tab.unread = False
+        model_name = self.ollama_client.model.split(":")[0]
+        label = f"[dim]tab {tab.number}[/] " if len(self.tabs) > 1 else ""
         # Print AI response with model prefix, new line, and left alignment
-        self.console.print(f"\n[blue]{model_name}[/][white]>>>[/]")
-        self.console.print(accumulated_response.strip(), soft_wrap=True)
+        self.console.print(f"\n{label}[blue]{model_name}[/][white]>>>[/]")
+        if is_json:
+            self.console.print_json(response)
+        else:
+            self.console.print(
+                ResponseMarkdown(response.strip(), self.highlight_cache, tab.code_index, self.code_theme)
+            )
         self.console.print()  # Add an extra newline
 
-        return accumulated_response
+    def show_json_item(self, tab, path, value) -> None:
+        """Print each completed top-level item while the rest is still generating"""
+        if tab is self.active:
+            self.console.print(f"[dim]{format_path(path)}[/] {json.dumps(value)[:120]}", highlight=False)
 
-    async def chat_loop(self) -> None:
-        """Main chat loop"""
-        self.console.print(Panel(self.format_header()))
+    def template_variables(self, question: str, context: str) -> dict:
+        """Variables available to every template"""
+        return {
+            **self.config.get("templates", {}).get("variables", {}),
+            "question": question,
+            "context": context,
+            "model": self.ollama_client.model,
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "cwd": str(Path.cwd()),
+        }
 
-        while True:
+    def render_prompt(self, question: str, context: str) -> str:
+        """Render the active template, or the default one when there is context to fill"""
+        name = self.active_template or ("default" if context else None)
+        if not name:
+            return question
+
+        variables = self.template_variables(question, context)
+        template = self.templates.get(name)
+        if template is None:
+            return FALLBACK_TEMPLATE.format_map(variables)
+        return template.render(variables)
+
+    def build_prompt(self, question: str, attached=(), recalled=()) -> str:
+        """Fill the template with attached files and recalled turns"""
+        context = "\n\n".join([*attached, *recalled])
+        prompt = self.render_prompt(question, context)
+        if isinstance(self.json_format, dict):
+            prompt += SCHEMA_INSTRUCTION.format(schema=json.dumps(self.json_format, indent=2))
+        elif self.json_format:
+            prompt += JSON_INSTRUCTION
+        return prompt
+
+    def toolbar(self):
+        """Live preview of what the next message expands to, rendered on every keystroke"""
+        if self.history_search.active:
+            return "history search: type to filter, Enter to accept, Esc to cancel"
+        parts = [f"model: {self.ollama_client.model}"]
+        if len(self.tabs) > 1:
+            unread = ", ".join(str(tab.number) for tab in self.tabs if tab.unread)
+            parts.insert(0, f"tab {self.active.number}/{len(self.tabs)}" + (f" (unread: {unread})" if unread else ""))
+        jobs = [tab.describe() for tab in self.tabs if tab.busy]
+        if jobs:
+            parts.append(", ".join(jobs))
+        pool = getattr(self.ollama_client, "pool", None)
+        waiting = sum(host.waiting for host in pool.hosts) if pool else 0
+        if waiting:
+            parts.append(f"{waiting} waiting for a host slot")
+        if self.attachments:
+            parts.append(f"attached: {len(self.attachments)}")
+        if self.pending_images:
+            parts.append(f"images: {len(self.pending_images)}")
+        if self.json_format:
+            parts.append("json: schema" if isinstance(self.json_format, dict) else "json")
+        if self.tools_enabled:
+            parts.append(f"tools: {len(self.tools.tools)}")
+        if self.active_template or self.context or self.active.attached_blocks:
+            text = self.session.default_buffer.text
+            context = "\n\n".join([*self.active.attached_blocks, *self.context])
             try:
-                user_input = await self.session.prompt_async()
-                if user_input is None or user_input.strip().lower() in ['exit', 'quit']:
-                    break
+                rendered = self.render_prompt(text, context)
+                parts.append(f"template: {self.active_template or 'default'} (~{estimate_tokens(rendered):,} tokens)")
+            except ValueError as e:
+                parts.append(f"template error: {str(e)}")
+        return "  |  ".join(parts)
 
-                user_input = user_input.strip()
-                if not user_input:
-                    continue
+    def conversation(self, tab=None) -> list:
+        """Messages as sent to /api/chat, rebuilt only when the tab's session changed"""
+        tab = tab or self.active
+        messages = tab.history_manager.messages
+        # The tab holds on to the list it compares against, so its id cannot be reused
+        if messages is not tab.conversation_source or len(messages) != tab.conversation_length:
+            # Memory only: this runs on every keystroke, preload_images does the disk reads
+            tab.conversation = tab.history_manager.chat_messages(self.images.cached, self.max_history_images)
+            tab.conversation_source, tab.conversation_length = messages, len(messages)
+        return tab.conversation
+
+    async def preload_images(self, tab=None) -> None:
+        """Read or encode the images a conversation sends in a worker thread"""
+        tab = tab or self.active
+        refs = [
+            ref
+            for message in tab.history_manager.messages
+            for ref in message.get("images") or []
+        ]
+        if self.max_history_images:
+            refs = refs[-self.max_history_images:]
+        missing = [ref for ref in refs if self.images.cached(ref) is None]
+        if not missing:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.images.preload, missing)
+        # The cached conversation was built without them
+        tab.conversation_source = None
+
+    def prepare_conversation(self) -> None:
+        """Load the active conversation's images in the background, then prefill it"""
+        tab = self.active
+
+        async def prepare():
+            await self.preload_images(tab)
+            if tab is self.active:
+                self.prewarmer.schedule(self.conversation())
+
+        self._prepare_task = asyncio.create_task(prepare())
+
+    def on_text_changed(self, buffer) -> None:
+        if buffer.text:
+            self.prewarmer.on_typing(self.conversation())
+
+    def schedule_recall_update(self) -> None:
+        """Index new turns in the background without blocking the prompt"""
+        if not self._recall_auto or (self._recall_task and not self._recall_task.done()):
+            return
+
+        async def update():
+            try:
+                await self.recall.update()
+            except Exception as e:
+                # Stop retrying every turn, /recall will try again on demand
+                self._recall_auto = False
+                self.console.print(f"[yellow]Recall index not updated: {str(e)}[/]")
+
+        self._recall_task = asyncio.create_task(update())
+
+    async def recall_command(self, query: str) -> None:
+        """Pull the most relevant past turns into the next prompt"""
+        if not query:
+            self.console.print("[yellow]Usage: /recall <query>[/]")
+            return
+
+        with self.console.status("Searching history..."):
+            if self._recall_task and not self._recall_task.done():
+                await self._recall_task
+            await self.recall.update()
+            results = await self.recall.search(query)
+
+        if not results:
+            self.console.print("[yellow]Nothing relevant found in history[/]")
+            return
+
+        table = Table(title="Recalled turns", show_header=True, border_style="cyan")
+        table.add_column("Score", style="cyan", justify="right")
+        table.add_column("Role", style="green")
+        table.add_column("Excerpt", style="dim")
+        for result in results:
+            self.context.append(f"[{result['role']}] {result['content']}")
+            excerpt = " ".join(result["content"].split())[:80]
+            table.add_row(f"{result['score']:.2f}", result["role"], excerpt)
+
+        self.console.print(table)
+        self.console.print(f"[cyan]{len(results)} turns added to the context of your next message[/]")
+
+    async def load_attachments(self, tab=None) -> list:
+        """Read a tab's attached files in a worker thread so the prompt stays responsive"""
+        tab = tab or self.active
+        if not tab.attachments:
+            return []
+        loop = asyncio.get_running_loop()
+        blocks, warnings = await loop.run_in_executor(
+            None, self.context_loader.load, list(tab.attachments)
+        )
+        for warning in warnings:
+            self.console.print(f"[yellow]{warning}[/]")
+        tab.attached_blocks = blocks
+        return blocks
+
+    async def add_command(self, target: str) -> None:
+        """Attach files, directories or globs as context for every following message"""
+        if not target:
+            self.console.print("[yellow]Usage: /add <path|glob>[/]")
+            return
+
+        self.attachments.append(target)
+        try:
+            with self.console.status(f"Reading {target}..."):
+                blocks = await self.load_attachments()
+        except BaseException:
+            # A target that cannot be read would otherwise fail every following turn
+            self.attachments.remove(target)
+            raise
+
+        if not blocks:
+            self.attachments.remove(target)
+            self.console.print(f"[yellow]Nothing readable in {target}[/]")
+            return
+        tokens = sum(estimate_tokens(block) for block in blocks)
+        self.console.print(
+            f"[cyan]Attached {target}: {len(blocks)} chunks, ~{tokens:,} tokens of context in total[/]"
+        )
+
+    async def image_command(self, target: str) -> None:
+        """Attach an image to the next message, list pending images or clear them"""
+        if target == "clear":
+            self.pending_images = []
+            self.console.print("[cyan]Images cleared[/]")
+            return
+        if not target:
+            if not self.pending_images:
+                self.console.print("[yellow]No images attached, usage: /image <path>[/]")
+            for ref in self.pending_images:
+                self.console.print(f"[cyan]{ref['path']}[/]")
+            return
+
+        # Hashing, resizing and encoding would stall the prompt, run them in a worker
+        loop = asyncio.get_running_loop()
+        with self.console.status(f"Encoding {target}..."):
+            ref = await loop.run_in_executor(None, self.images.attach, target)
+        if any(pending["sha256"] == ref["sha256"] for pending in self.pending_images):
+            self.console.print(f"[yellow]{target} is already attached[/]")
+            return
+        self.pending_images.append(ref)
+        self.console.print(
+            f"[cyan]Attached image {Path(ref['path']).name} ({self.images.size(ref) / 1024:,.0f} KiB encoded), "
+            f"sent with your next message[/]"
+        )
+
+    def drop_command(self, target: str) -> None:
+        """Detach one attachment, or all of them"""
+        if target:
+            if target not in self.attachments:
+                self.console.print(f"[yellow]{target} is not attached[/]")
+                return
+            self.attachments.remove(target)
+        else:
+            self.attachments = []
+        if not self.attachments:
+            self.active.attached_blocks = []
+        self.console.print("[cyan]Attachments: " + (", ".join(self.attachments) or "none") + "[/]")
+
+    def template_command(self, args: str) -> None:
+        """Select, list or turn off the template applied to each message"""
+        if not args:
+            names = self.templates.names()
+            active = self.active_template or "none"
+            self.console.print(f"[cyan]Templates: {', '.join(names) or 'none'} (active: {active})[/]")
+            return
+
+        if args == "off":
+            self.active_template = None
+            self.console.print("[cyan]Template turned off[/]")
+            return
+
+        template = self.templates.get(args)
+        if template is None:
+            raise ValueError(f"Template '{args}' not found in {self.templates.templates_dir}")
+        if template.error:
+            raise ValueError(template.error)
+        self.active_template = args
+        variables = ", ".join(dict.fromkeys(template.variables)) or "none"
+        self.console.print(f"[cyan]Using template '{args}' (variables: {variables})[/]")
 
-                self.history_manager.add_message("user", user_input)
-                response_generator = self.ollama_client.generate(user_input)
-                self.last_response = await self.process_response(response_generator)
-                self.history_manager.add_message("assistant", self.last_response)
-
-            except KeyboardInterrupt:
-                self.console.print("\n[yellow]Goodbye![/]")
-                sys.exit(0)
-            except EOFError:
-                self.console.print("\n[yellow]Goodbye![/]")
-                sys.exit(0)
+    def load_schema(self, spec: str) -> dict:
+        """Read a schema given inline, as a file path, or by name from config_dir/schemas"""
+        if spec.lstrip().startswith("{"):
+            text = spec
+        else:
+            path = Path(spec).expanduser()
+            if not path.is_file():
+                path = self.config_dir / "schemas" / f"{spec}.json"
+            if not path.is_file():
+                raise ValueError(f"Schema '{spec}' not found (tried {spec} and {path})")
+            text = path.read_text()
+        try:
+            schema = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Schema '{spec}' is not valid JSON: {str(e)}")
+        if not isinstance(schema, dict):
+            raise ValueError(f"Schema '{spec}' must be a JSON object")
+        return schema
+
+    def json_command(self, args: str) -> None:
+        """Ask for JSON answers, optionally constrained to a schema"""
+        if args == "off":
+            self.json_format = None
+            self.console.print("[cyan]JSON mode turned off[/]")
+            return
+        if not args:
+            self.json_format = "json"
+            self.console.print("[cyan]JSON mode on, answers are parsed as they stream[/]")
+            return
+
+        self.json_format = self.load_schema(args)
+        properties = ", ".join(self.json_format.get("properties", {})) or "none"
+        self.console.print(f"[cyan]JSON mode on with a schema (properties: {properties})[/]")
+
+    def tools_command(self, args: str) -> None:
+        """Turn tool calling on or off, or list the tools the model can call"""
+        if args in ("on", "off"):
+            self.tools_enabled = args == "on"
+            self.console.print(f"[cyan]Tools turned {args}[/]")
+            return
+        if args:
+            raise ValueError("Usage: /tools [on|off]")
+
+        table = Table(title=f"Tools ({'on' if self.tools_enabled else 'off'})", show_header=True, border_style="cyan")
+        table.add_column("Tool", style="bold cyan")
+        table.add_column("Description", style="dim")
+        for name, tool in self.tools.tools.items():
+            table.add_row(name, tool["schema"]["function"]["description"])
+        self.console.print(table)
+        self.console.print(f"[dim]Paths are limited to {self.tools.root}[/]")
+
+    async def run_tools(self, tab, tool_calls: list, stats: dict) -> None:
+        """Run the calls of one response in parallel and store them with their results"""
+        history_manager = tab.history_manager
+        history_manager.add_message("assistant", tab.last_response or "", stats=stats, tool_calls=tool_calls)
+
+        tab.status = f"running {len(tool_calls)} tool{'s' if len(tool_calls) > 1 else ''}"
+        self.refresh_toolbar()
+        started = time.perf_counter()
+        with profiling.tracer.span("tools.run", calls=len(tool_calls)):
+            results = await self.tool_executor.run(tool_calls)
+        elapsed = time.perf_counter() - started
+        tab.status = "waiting"
+
+        for result in results:
+            history_manager.add_message(
+                "tool",
+                result["content"],
+                tool_name=result["name"],
+                stats={"duration": result["duration"], "error": result["error"]},
+            )
+        if tab is not self.active:
+            return
+        for result in results:
+            arguments = json.dumps(result["arguments"], ensure_ascii=False)
+            style = "red" if result["error"] else "dim"
+            self.console.print(
+                f"[{style}]tool {result['name']}({arguments[:100]}) {result['duration'] * 1000:.0f} ms[/]",
+                highlight=False,
+            )
+        if len(results) > 1:
+            serial = sum(result["duration"] for result in results)
+            self.console.print(f"[dim]{len(results)} tools in {elapsed * 1000:.0f} ms ({serial * 1000:.0f} ms one by one)[/]")
+
+    def code_blocks(self) -> CodeBlockIndex:
+        """Code blocks of the active tab's last answer, indexed while it streamed"""
+        tab = self.active
+        if tab.code_index is None:
+            # Answers loaded from a session were never streamed, index them once
+            tab.code_index = CodeBlockIndex.from_text(tab.last_response or "")
+        return tab.code_index
+
+    def code_block(self, number: str) -> dict:
+        if not number.isdigit():
+            raise ValueError("Code blocks are numbered from 1, /copy lists them")
+        return self.code_blocks().get(int(number))
+
+    def copy_command(self, args: str) -> None:
+        """List the code blocks of the last answer, or copy one to the clipboard"""
+        if args:
+            block = self.code_block(args)
+            target = self.editor.copy_to_clipboard(block["code"])
+            lines = block["code"].count("\n") + 1
+            self.console.print(f"[cyan]Copied block {args} ({block['language']}, {lines} lines) via {target}[/]")
+            return
+
+        blocks = self.code_blocks().blocks
+        if not blocks:
+            self.console.print("[yellow]The last answer has no code blocks[/]")
+            return
+        table = Table(title="Code blocks", show_header=True, border_style="cyan")
+        table.add_column("№", style="cyan", justify="right")
+        table.add_column("Language", style="green")
+        table.add_column("Lines", style="yellow", justify="right")
+        table.add_column("Starts with", style="dim")
+        for i, block in enumerate(blocks, 1):
+            first = next((line.strip() for line in block["code"].splitlines() if line.strip()), "")
+            table.add_row(str(i), block["language"], str(block["code"].count("\n") + 1), first[:60])
+        self.console.print(table)
+
+    def save_command(self, args: str) -> None:
+        """Write a code block of the last answer to a file"""
+        number, _, path = args.partition(" ")
+        if not path.strip():
+            raise ValueError("Usage: /save N <path>")
+        block = self.code_block(number)
+        target = Path(path.strip()).expanduser()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(block["code"] + "\n")
+        self.console.print(f"[cyan]Saved block {number} ({block['language']}) to {target}[/]")
+
+    def require_idle(self) -> None:
+        if self.active.busy:
+            raise ValueError(
+                f"Tab {self.active.number} is still answering, wait for it or open another with /tab new"
+            )
+
+    def clear_command(self, args: str) -> None:
+        """Start a fresh session, dropping context and attachments"""
+        self.require_idle()
+        self.history_manager.current_session = None
+        self.history_manager.messages = []
+        self.context = []
+        self.attachments = []
+        self.active.attached_blocks = []
+        self.last_response = None
+        self.console.print("[cyan]Session cleared, the next message starts a new one[/]")
+
+    def switched_conversation(self, note: str) -> None:
+        """Report a branch change and prefill the new conversation so the next turn is fast"""
+        messages = self.history_manager.messages
+        self.last_response = next(
+            (m["content"] for m in reversed(messages) if m["role"] == "assistant"), None
+        )
+        name = Path(self.history_manager.current_session).name
+        self.console.print(f"[cyan]{note}: {name} ({len(messages)} messages)[/]")
+        # The shared prefix is usually still cached, only the divergent part needs prefill
+        self.prepare_conversation()
+
+    def fork_command(self, args: str) -> None:
+        """Continue in a branch of this session, leaving the original untouched"""
+        self.require_idle()
+        if not self.history_manager.messages:
+            self.console.print("[yellow]Nothing to fork yet[/]")
+            return
+        self.history_manager.branch(len(self.history_manager.messages))
+        self.switched_conversation("Forked into")
+
+    def rewind_command(self, args: str) -> None:
+        """Branch off before the last N user messages to try a different follow-up"""
+        self.require_idle()
+        try:
+            turns = int(args or 1)
+        except ValueError:
+            raise ValueError("Usage: /rewind [N]")
+        user_turns = [i for i, m in enumerate(self.history_manager.messages) if m["role"] == "user"]
+        if turns < 1 or turns > len(user_turns):
+            raise ValueError(f"Can rewind between 1 and {len(user_turns)} turns")
+        self.history_manager.branch(user_turns[-turns])
+        self.switched_conversation(f"Rewound {turns} turn{'s' if turns > 1 else ''} into")
+
+    def branch_command(self, args: str) -> None:
+        """List the branches of this session, or switch to one by number"""
+        if not self.history_manager.current_session:
+            self.console.print("[yellow]No session yet[/]")
+            return
+        family = self.history_manager.family()
+        if args:
+            self.require_idle()
+            try:
+                target = family[int(args) - 1]
+            except (ValueError, IndexError):
+                raise ValueError(f"Usage: /branch [1-{len(family)}]")
+            self.history_manager.load_session(str(target))
+            self.switched_conversation("Switched to")
+            return
+
+        links = self.history_manager.branches()
+        current = Path(self.history_manager.current_session).name
+        table = Table(title="Branches", show_header=True, border_style="cyan")
+        table.add_column("№", style="cyan", justify="right")
+        table.add_column("Session", style="green")
+        table.add_column("Branched from", style="dim")
+        table.add_column("Messages", style="yellow", justify="right")
+        for i, path in enumerate(family, 1):
+            link = links.get(path.name)
+            origin = f"{link['parent']} @ {link['parent_messages']}" if link else ""
+            marker = " *" if path.name == current else ""
+            count = len(self.history_manager.resolve_messages(path))
+            table.add_row(str(i), path.name + marker, origin, str(count))
+        self.console.print(table)
+
+    def switch_tab(self, tab) -> None:
+        self.active = tab
+        self.console.print(f"[cyan]Tab {tab.number}: {tab.name} ({len(tab.history_manager.messages)} messages)[/]")
+        if tab.unread and tab.last_response:
+            self.show_response(tab, tab.last_response)
+        self.prepare_conversation()
+
+    def tab_command(self, args: str) -> None:
+        """List tabs, open a new one, switch to or close one"""
+        action, _, rest = args.partition(" ")
+        if action == "new":
+            tab = Tab(max(t.number for t in self.tabs) + 1, HistoryManager(self.config))
+            self.tabs.append(tab)
+            self.switch_tab(tab)
+            return
+
+        if not action:
+            table = Table(title="Tabs", show_header=True, border_style="cyan")
+            table.add_column("№", style="cyan", justify="right")
+            table.add_column("Session", style="green")
+            table.add_column("Messages", style="yellow", justify="right")
+            table.add_column("Status", style="dim")
+            for tab in self.tabs:
+                marker = " *" if tab is self.active else ""
+                status = tab.describe() if tab.busy else ("unread answer" if tab.unread else "idle")
+                table.add_row(str(tab.number) + marker, tab.name, str(len(tab.history_manager.messages)), status)
+            self.console.print(table)
+            return
+
+        number = rest if action == "close" else action
+        try:
+            tab = next(t for t in self.tabs if t.number == int(number or self.active.number))
+        except (ValueError, StopIteration):
+            raise ValueError("Usage: /tab [new | N | close [N]]")
+
+        if action != "close":
+            self.switch_tab(tab)
+            return
+        if len(self.tabs) == 1:
+            raise ValueError("Cannot close the only tab, use /clear to start over")
+        tab.cancel()
+        self.tabs.remove(tab)
+        self.console.print(f"[cyan]Closed tab {tab.number}[/]")
+        if tab is self.active:
+            self.switch_tab(self.tabs[-1])
+
+    def help_command(self, args: str) -> None:
+        """Show help.md and the registered commands"""
+        help_file = self.config_dir / "help.md"
+        if help_file.exists():
+            self.console.print(Markdown(help_file.read_text()))
+
+        table = Table(title="Commands", show_header=False, box=None)
+        table.add_column("Command", style="bold cyan")
+        table.add_column("Description", style="dim")
+        for label, description in self.commands.help_rows():
+            table.add_row(label, description)
+        self.console.print(table)
+
+    def exit_command(self, args: str) -> None:
+        raise EOFError
+
+    def register_commands(self) -> None:
+        """Wire up the slash commands available in the chat loop"""
+        self.commands.register("template", self.template_command, "Use a template: /template <name|off>")
+        self.commands.register("recall", self.recall_command, "Add relevant past turns to the next message")
+        self.commands.register("add", self.add_command, "Attach files, directories or globs as context")
+        self.commands.register("drop", self.drop_command, "Detach one or all attachments")
+        self.commands.register("image", self.image_command, "Attach an image to the next message: /image [path|clear]")
+        self.commands.register("copy", self.copy_command, "List code blocks, or copy one: /copy [N]")
+        self.commands.register("save", self.save_command, "Save a code block: /save N <path>")
+        self.commands.register("json", self.json_command, "Answer in JSON: /json [schema|off]")
+        self.commands.register("tools", self.tools_command, "Let the model call local tools: /tools [on|off]")
+        self.commands.register("tab", self.tab_command, "Tabs: /tab [new | N | close [N]]")
+        self.commands.register("fork", self.fork_command, "Continue in a branch of this session")
+        self.commands.register("rewind", self.rewind_command, "Branch off before the last N turns: /rewind [N]")
+        self.commands.register("branch", self.branch_command, "List branches, or switch: /branch [n]")
+        self.commands.register("clear", self.clear_command, "Clear the current session")
+        self.commands.register("help", self.help_command, "Show help")
+        self.commands.register("exit", self.exit_command, "Exit chat", aliases=["quit"])
+
+    async def run_turn(self, tab, user_input: str, recalled=(), images=()) -> None:
+        """Send one message and collect the answer, each phase traced when profiling is on
+
+        recalled and images are the tab's pending inputs, taken when the message was sent.
+        """
+        tracer = profiling.tracer
+        history_manager = tab.history_manager
+        with tracer.span("images.load"):
+            await self.preload_images(tab)
+        history = self.conversation(tab)
+        prewarmed = bool(history) and self.prewarmer.is_warm(history)
+        self.prewarmer.cancel()
+
+        with tracer.span("attachments.load"):
+            attached = await self.load_attachments(tab)
+        with tracer.span("prompt.build"):
+            prompt = self.build_prompt(user_input, attached, recalled)
+        with tracer.span("history.add_message", role="user"):
+            # Sessions keep path and hash references, the payloads stay in the image cache
+            history_manager.add_message(
+                "user", user_input, prompt=prompt if prompt != user_input else None, images=images
+            )
+
+        stats = {"history": len(history), "prewarmed": prewarmed}
+        json_format = self.json_format
+        tools = self.tools.schemas() if self.tools_enabled else None
+        rounds = 0
+        while True:
+            json_stream = None
+            if json_format:
+                schema = json_format if isinstance(json_format, dict) else None
+                json_stream = JSONStream(schema, on_item=lambda path, value: self.show_json_item(tab, path, value))
+            tool_calls = [] if tools else None
+            response_generator = self.ollama_client.chat(
+                self.conversation(tab), stats=stats, format=json_format, tools=tools, tool_calls=tool_calls
+            )
+            request_start = time.perf_counter()
+            tab.last_response = await self.process_response(tab, response_generator, json_stream, tool_calls)
+            self.trace_server_timings(request_start, stats)
+            if not tool_calls:
+                break
+            # Results go back as tool messages and the model continues from them
+            await self.run_tools(tab, tool_calls, stats)
+            stats = {"history": len(history_manager.messages), "prewarmed": False}
+            rounds += 1
+            if rounds >= self.max_tool_rounds:
+                # Out of rounds: ask for an answer from what the tools returned so far
+                tools = None
+        if json_stream:
+            stats["json"] = json_stream.error or "valid"
+
+        with tracer.span("history.add_message", role="assistant"):
+            history_manager.add_message("assistant", tab.last_response, stats=stats)
+
+    def submit(self, user_input: str) -> None:
+        """Run the turn as a background job; messages to a busy tab wait for its answer
+
+        Recalled turns and images go with this message, so they are taken off the tab
+        now rather than when a queued job starts.
+        """
+        tab = self.active
+        previous = tab.job if tab.busy else None
+        if previous:
+            tab.queued += 1
+            self.console.print(f"[yellow]Tab {tab.number} is still answering, your message is queued[/]")
+        recalled, tab.context = tab.context, []
+        images, tab.pending_images = tab.pending_images, []
+        tab.add_job(asyncio.create_task(self.run_job(tab, user_input, previous, recalled, images)))
+
+    async def run_job(self, tab, user_input: str, previous=None, recalled=(), images=()) -> None:
+        if previous:
+            await asyncio.wait({previous})
+            tab.queued -= 1
+        tab.begin("waiting")
+        self.refresh_toolbar()
+        self._turns += 1
+        try:
+            with profiling.tracer.turn(self._turns):
+                await self.run_turn(tab, user_input, recalled, images)
+        except Exception as e:
+            label = f" in tab {tab.number}" if len(self.tabs) > 1 else ""
+            self.console.print(f"[red]Error{label}: {str(e)}[/]")
+            return
+        finally:
+            tab.finish()
+            self.refresh_toolbar()
+
+        if tab is self.active:
+            self.prewarmer.schedule(self.conversation())
+        self.schedule_recall_update()
+
+    def trace_server_timings(self, request_start: float, stats: dict) -> None:
+        """Place Ollama's own prefill and decode durations on the server lane"""
+        tracer = profiling.tracer
+        if not tracer.enabled or "prompt_eval_duration" not in stats:
+            return
+        prefill = stats["prompt_eval_duration"] / 1e9
+        decode = stats.get("eval_duration", 0) / 1e9
+        # The server reports durations only; prefill ends just before the first token
+        prefill_end = request_start + stats.get("ttft", prefill)
+        tracer.complete(
+            "ollama.prefill", prefill_end - prefill, prefill_end, lane="ollama",
+            tokens=stats.get("prompt_eval_count", 0),
+        )
+        tracer.complete(
+            "ollama.decode", prefill_end, prefill_end + decode, lane="ollama",
+            tokens=stats.get("eval_count", 0),
+        )
+
+    def close(self) -> None:
+        """Release what outlives the chat loop: tool threads and the commands they run"""
+        self.tool_executor.shutdown()
+
+    def goodbye(self) -> None:
+        running = [tab for tab in self.tabs if tab.busy]
+        if running:
+            self.console.print(f"\n[yellow]Dropping {len(running)} unfinished answer(s)[/]")
+        self.console.print("\n[yellow]Goodbye![/]")
+        sys.exit(0)
+
+    async def chat_loop(self, images=()) -> None:
+        """Main chat loop; answers are generated in background jobs so typing never blocks"""
+        self.console.print(Panel(self.format_header()))
+        for image in images:
+            try:
+                await self.image_command(image)
             except Exception as e:
                 self.console.print(f"[red]Error: {str(e)}[/]")
-                continue 
\ No newline at end of file
+        # A resumed session may send images that are only on disk
+        self.prepare_conversation()
+
+        # Output from background jobs is printed above the prompt instead of through it
+        with patch_stdout(raw=True):
+            while True:
+                try:
+                    user_input = await self.session.prompt_async()
+                    self.history_search.stop()
+                    if user_input is None or user_input.strip().lower() in ['exit', 'quit']:
+                        break
+
+                    user_input = user_input.strip()
+                    if not user_input:
+                        continue
+
+                    if self.commands.is_command(user_input):
+                        await self.commands.dispatch(user_input)
+                        continue
+
+                    self.submit(user_input)
+
+                except KeyboardInterrupt:
+                    self.goodbye()
+                except EOFError:
+                    self.goodbye()
+                except Exception as e:
+                    self.console.print(f"[red]Error: {str(e)}[/]")
+                    continue
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+from pygments.lexer import Lexer
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+from rich.markdown import CodeBlock, Markdown
+from rich.syntax import Syntax
+from rich.text import Text
+
+from ..lib.codeblocks import CodeBlockIndex, block_hash
+
+HIGHLIGHT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=64)
+def get_lexer(name: str, tab_size: int = 4) -> Optional[Lexer]:
+    """Look up a lexer once per language instead of on every render"""
+    try:
+        return get_lexer_by_name(name, stripnl=False, ensurenl=True, tabsize=tab_size)
+    except ClassNotFound:
+        return None
+
+
+class HighlightCache:
+    def __init__(self, size: int = HIGHLIGHT_CACHE_SIZE):
+        """Highlighted code blocks keyed by content hash, language and theme (LRU)"""
+        self.size = size
+        self.entries: "OrderedDict[Tuple[str, str, str], Text]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, str], build: Callable[[], Text]) -> Text:
+        text = self.entries.get(key)
+        if text is None:
+            self.misses += 1
+            text = self.entries[key] = build()
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        # Rendering may restyle the text, keep the cached one pristine
+        return text.copy()
+
+
+class CachedSyntax(Syntax):
+    def __init__(self, code: str, language: str, cache: HighlightCache, theme: str, **kwargs):
+        """Syntax that reuses highlighted text for code it has rendered before"""
+        super().__init__(code, get_lexer(language) or language, theme=theme, **kwargs)
+        self.cache = cache
+        self.cache_key = (block_hash(code), language, theme)
+
+    def highlight(self, code: str, line_range=None) -> Text:
+        if line_range:
+            return super().highlight(code, line_range)
+        return self.cache.get(self.cache_key, lambda: super(CachedSyntax, self).highlight(code))
+
+
+class NumberedCodeBlock(CodeBlock):
+    """Code block labelled with its /copy number, highlighted through the cache"""
+
+    @classmethod
+    def create(cls, markdown: "ResponseMarkdown", token) -> "NumberedCodeBlock":
+        block = super().create(markdown, token)
+        block.index = markdown.code_index
+        block.cache = markdown.highlight_cache
+        return block
+
+    def __rich_console__(self, console, options):
+        code = str(self.text).rstrip()
+        number = self.index.number_of(code) if self.index else None
+        if number:
+            yield Text(f"[{number}] {self.lexer_name}", style="dim")
+        yield CachedSyntax(code, self.lexer_name, self.cache, self.theme, word_wrap=True, padding=1)
+
+
+class ResponseMarkdown(Markdown):
+    elements = {**Markdown.elements, "fence": NumberedCodeBlock, "code_block": NumberedCodeBlock}
+
+    def __init__(
+        self,
+        markup: str,
+        highlight_cache: HighlightCache,
+        code_index: Optional[CodeBlockIndex] = None,
+        code_theme: str = "monokai",
+    ):
+        """A response rendered as Markdown, code blocks numbered from code_index"""
+        super().__init__(markup, code_theme=code_theme)
+        self.highlight_cache = highlight_cache
+        self.code_index = code_index
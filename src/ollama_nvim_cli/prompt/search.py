@@ -0,0 +1,49 @@
+from typing import List, Optional
+
+from prompt_toolkit.completion import Completer, Completion
+from prompt_toolkit.filters import Condition
+
+from ..lib.prompt_history import FuzzyIndex
+
+
+class HistorySearch(Completer):
+    def __init__(self, history, limit: int = 50):
+        """Fuzzy Ctrl+R search over prompt history, shown as a completion menu"""
+        self.history = history
+        self.limit = limit
+        self.index = FuzzyIndex()
+        self.active = False
+        self._indexed: Optional[List[str]] = None
+        self.is_active = Condition(lambda: self.active)
+
+    def start(self, buffer) -> None:
+        self.active = True
+        buffer.start_completion(select_first=False)
+
+    def stop(self) -> None:
+        self.active = False
+
+    def _refresh_index(self) -> None:
+        """Rebuild when entries were loaded, added or moved to the front since the last search"""
+        strings = self.history.get_strings()
+        # Mostly identity checks, cheap next to a rebuild
+        if strings != self._indexed:
+            self.index.build(strings[::-1])
+            self._indexed = strings
+
+    def best_match(self, query: str):
+        self._refresh_index()
+        matches = self.index.search(query, limit=1)
+        return matches[0] if matches else None
+
+    def get_completions(self, document, complete_event):
+        if not self.active:
+            return
+        self._refresh_index()
+        for entry in self.index.search(document.text, self.limit):
+            display = " ".join(entry.split())
+            yield Completion(
+                entry,
+                start_position=-len(document.text),
+                display=display[:100],
+            )
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..lib.codeblocks import CodeBlockIndex
+
+
+class Tab:
+    def __init__(self, number: int, history_manager):
+        """One conversation in the chat loop, with at most one generation running at a time"""
+        self.number = number
+        self.history_manager = history_manager
+        self.last_response: Optional[str] = None
+        # Code blocks of last_response, None when it has to be indexed again
+        self.code_index: Optional[CodeBlockIndex] = None
+        # Inputs for this conversation only: /add targets and their loaded chunks,
+        # /recall results and /image refs waiting for the next message
+        self.attachments: List[str] = []
+        self.attached_blocks: List[str] = []
+        self.context: List[str] = []
+        self.pending_images: List[Dict] = []
+        # /api/chat messages built from history_manager.messages, and the list they came from
+        self.conversation: List[Dict] = []
+        self.conversation_source: Optional[List[Dict]] = None
+        self.conversation_length = 0
+        # The running job first, then any queued behind it
+        self.jobs: List[asyncio.Task] = []
+        self.queued = 0
+        self.status = "idle"
+        self.started_at = 0.0
+        self.received = 0
+        self.unread = False
+
+    @property
+    def job(self) -> Optional[asyncio.Task]:
+        """The newest job, which finishes last"""
+        return self.jobs[-1] if self.jobs else None
+
+    @property
+    def busy(self) -> bool:
+        return any(not job.done() for job in self.jobs)
+
+    def add_job(self, job: asyncio.Task) -> None:
+        self.jobs = [j for j in self.jobs if not j.done()]
+        self.jobs.append(job)
+
+    def cancel(self) -> None:
+        """Stop the running job and drop the queued ones"""
+        for job in self.jobs:
+            job.cancel()
+
+    @property
+    def name(self) -> str:
+        session = self.history_manager.current_session
+        return Path(session).stem if session else "new session"
+
+    def begin(self, status: str) -> None:
+        self.status = status
+        self.started_at = time.monotonic()
+        self.received = 0
+
+    def finish(self) -> None:
+        self.status = "idle"
+
+    def describe(self) -> str:
+        """Short job status for the toolbar"""
+        elapsed = time.monotonic() - self.started_at
+        if self.status == "generating":
+            return f"tab {self.number}: {self.received:,} chars {elapsed:.0f}s"
+        queued = f" (+{self.queued} queued)" if self.queued else ""
+        return f"tab {self.number}: {self.status} {elapsed:.0f}s{queued}"
@@ -0,0 +1,82 @@
+"""Config layering, environment coercion and help.md versioning (python -m unittest discover tests)"""
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.config import HELP_MARKER, Config, ConfigError, coerce  # noqa: E402
+
+
+class ConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "config.json"
+
+    def config(self, **environ) -> Config:
+        return Config(self.path, environ=environ)
+
+    def test_coerce_follows_the_schema(self):
+        self.assertEqual(coerce("ollama.timeout", "45"), 45)
+        self.assertEqual(coerce("ollama.timeout", "2.5"), 2.5)
+        self.assertEqual(coerce("tools.timeout", "3"), 3)
+        self.assertIs(coerce("recall.auto_index", "Yes"), True)
+        self.assertIs(coerce("recall.auto_index", "0"), False)
+        self.assertEqual(coerce("ollama.hosts", "http://a:1, ,http://b:2"), ["http://a:1", "http://b:2"])
+        self.assertEqual(coerce("model", "llama3"), "llama3")
+        with self.assertRaises(ConfigError):
+            coerce("ollama.timeout", "soon")
+
+    def test_layers(self):
+        self.path.write_text(json.dumps({"model": "from-file", "ollama": {"timeout": 10}}))
+        config = self.config(ONC_OLLAMA__TIMEOUT="20", OLLAMA_HOST="gpu:11434")
+        self.assertEqual(config.get("model"), "from-file")
+        self.assertEqual(config.get("ollama.timeout"), 20)
+        self.assertEqual(config.get("ollama.host"), "http://gpu:11434")
+        # Defaults fill in what the file leaves out
+        self.assertEqual(config.get("ollama.routing"), "affinity")
+        config.override("ollama.timeout", "30")
+        self.assertEqual(config.get("ollama.timeout"), 30)
+
+    def test_bad_environment_value_is_a_config_error(self):
+        config = self.config(ONC_OLLAMA__TIMEOUT="soon")
+        with self.assertRaisesRegex(ConfigError, "ONC_OLLAMA__TIMEOUT"):
+            config.get("ollama.timeout")
+
+    def test_invalid_values_are_rejected(self):
+        config = self.config()
+        with self.assertRaises(ConfigError):
+            config.set("ollama.timeout", "soon")
+        with self.assertRaises(ConfigError):
+            config.set("recall.top_k", True)
+        self.path.write_text(json.dumps({"history": {"max_sessions": "many"}}))
+        with self.assertRaisesRegex(ConfigError, "history.max_sessions"):
+            self.config()
+
+    def test_set_only_writes_changed_values(self):
+        config = self.config()
+        config.set("model", "llama3")
+        config.flush()
+        self.assertEqual(json.loads(self.path.read_text())["model"], "llama3")
+        self.assertEqual(self.config().get("model"), "llama3")
+
+    def test_help_is_rewritten_for_a_new_version(self):
+        help_file = self.path.parent / "help.md"
+        self.config()
+        self.assertTrue(help_file.read_text().startswith(HELP_MARKER))
+
+        help_file.write_text("# Ollama Chat Help\n\nold text\n")
+        self.config()
+        self.assertTrue(help_file.read_text().startswith(HELP_MARKER))
+
+        current = HELP_MARKER + "\nkept as it is\n"
+        help_file.write_text(current)
+        self.config()
+        self.assertEqual(help_file.read_text(), current)
+
+
+if __name__ == "__main__":
+    unittest.main()
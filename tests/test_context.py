@@ -0,0 +1,109 @@
+"""File context loading: chunking, the token budget and caching (python -m unittest discover tests)"""
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib import context  # noqa: E402
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.context import ContextLoader  # noqa: E402
+
+
+class ContextTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        base = Path(self.tmp.name)
+        self.project = base / "project"
+        self.project.mkdir()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.project)
+        environ = {
+            "ONC_CONTEXT__CACHE_DIR": str(base / "cache"),
+            "ONC_CONTEXT__CHUNK_TOKENS": "10",
+            "ONC_CONTEXT__MAX_TOKENS": "50",
+            "ONC_CONTEXT__WORKERS": "2",
+        }
+        self.config = Config(base / "config.json", environ=environ)
+        self.loader = ContextLoader(self.config)
+
+    def write(self, name: str, text: str) -> Path:
+        path = self.project / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        return path
+
+    def test_small_file_is_one_block(self):
+        self.write("a.py", "x = 1\n")
+        blocks, warnings = self.loader.load(["a.py"])
+        self.assertEqual(blocks, ["File: a.py\n```py\nx = 1\n\n```"])
+        self.assertEqual(warnings, [])
+
+    def test_chunks_split_on_lines(self):
+        text = "".join(f"line {i:02d}\n" for i in range(12))
+        self.write("a.txt", text)
+        blocks, _ = self.loader.load(["a.txt"])
+        self.assertEqual(len(blocks), 3)
+        self.assertTrue(blocks[0].startswith("File: a.txt (part 1/3)\n```txt\nline 00\n"))
+        # Chunks hold whole lines and nothing is lost between them
+        self.assertEqual("".join(block.split("\n", 2)[2][:-4] for block in blocks), text)
+
+    def test_budget_stops_reading_a_large_file(self):
+        self.write("big.txt", ("z" * 39 + "\n") * 100_000)
+        blocks, warnings = self.loader.load(["big.txt"])
+        self.assertEqual(len(blocks), 5)
+        # Cut short, so the total number of parts is unknown
+        self.assertTrue(blocks[-1].startswith("File: big.txt (part 5)\n"))
+        self.assertIn("Context budget of 50 tokens reached", warnings[0])
+        ((chunks, complete),) = self.loader._chunks.values()
+        self.assertFalse(complete)
+        self.assertLess(sum(map(len, chunks)), 100_000)
+
+    def test_budget_skips_files_past_it(self):
+        for i in range(10):
+            self.write(f"f{i}.txt", "w" * 39 + "\n")
+        blocks, warnings = self.loader.load(["*.txt"])
+        self.assertEqual([b.split("\n")[0] for b in blocks], [f"File: f{i}.txt" for i in range(5)])
+        self.assertEqual(len(warnings), 1)
+
+    def test_directories_honour_gitignore(self):
+        self.write(".gitignore", "*.log\nbuild/\n!keep.log\n")
+        self.write("src/a.py", "a\n")
+        self.write("debug.log", "noise\n")
+        self.write("keep.log", "kept\n")
+        self.write("build/out.py", "generated\n")
+        self.write("node_modules/x.js", "vendored\n")
+        self.write("blob.bin", "\0binary")
+        files = [p.relative_to(self.project).as_posix() for p in self.loader.resolve(".")]
+        self.assertEqual(sorted(files), ["blob.bin", "keep.log", "src/a.py"])
+        blocks, _ = self.loader.load(["."])
+        self.assertEqual(sorted(b.split("\n")[0] for b in blocks), ["File: keep.log", "File: src/a.py"])
+
+    def test_missing_targets_are_warnings(self):
+        blocks, warnings = self.loader.load(["nope.py", "*.nothing"])
+        self.assertEqual(blocks, [])
+        self.assertEqual(len(warnings), 2)
+
+    def test_changed_file_is_read_again(self):
+        path = self.write("a.txt", "old\n")
+        self.assertIn("old", self.loader.load(["a.txt"])[0][0])
+        path.write_text("newer\n")
+        self.assertIn("newer", self.loader.load(["a.txt"])[0][0])
+        # And a fresh loader finds the first version's chunks on disk by content
+        path.write_text("old\n")
+        self.assertIn("old", ContextLoader(self.config).load(["a.txt"])[0][0])
+
+    def test_memory_cache_is_bounded(self):
+        for i in range(5):
+            self.write(f"f{i}.txt", f"{i}\n")
+        with mock.patch.object(context, "CACHED_FILES", 3):
+            self.loader.load(["*.txt"])
+        self.assertEqual(len(self.loader._chunks), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Streaming session export formats (python -m unittest discover tests)"""
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.export import export_file, export_many, export_session  # noqa: E402
+from ollama_nvim_cli.lib.history import HistoryManager  # noqa: E402
+
+TOOL_CALL = {"function": {"name": "read_file", "arguments": {"path": "README.md"}}}
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        environ = {"ONC_HISTORY__SAVE_DIR": str(self.dir / "h"), "ONC_MODEL": "stub:latest"}
+        self.history = HistoryManager(Config(self.dir / "config.json", environ=environ))
+
+    def session(self) -> str:
+        self.history.add_message("user", "hi <b>there</b>", prompt="Context...\n\nhi <b>there</b>")
+        self.history.add_message("assistant", "hello\n\n```py\nx = 1\n```")
+        return self.history.current_session
+
+    def export(self, session, fmt: str) -> str:
+        out = io.StringIO()
+        export_session(session, fmt, out)
+        return out.getvalue()
+
+    def test_markdown(self):
+        text = self.export(self.session(), "md")
+        self.assertTrue(text.startswith("# chat_session_"))
+        self.assertIn("_stub:latest, ", text)
+        self.assertIn("\n## User\n\nhi <b>there</b>\n", text)
+        self.assertIn("\n## Assistant\n\nhello\n\n```py\nx = 1\n```\n", text)
+
+    def test_jsonl_resolves_the_branch_prefix(self):
+        self.session()
+        branch = self.history.branch(1)
+        self.history.add_message("assistant", "other")
+        lines = [json.loads(line) for line in self.export(branch, "jsonl").splitlines()]
+        self.assertNotIn("parent", lines[0])
+        self.assertEqual(lines[0]["model"], "stub:latest")
+        self.assertEqual([m["content"] for m in lines[1:]], ["hi <b>there</b>", "other"])
+
+    def test_openai_sends_prompts_as_the_model_saw_them(self):
+        line = json.loads(self.export(self.session(), "openai"))
+        self.assertEqual(
+            line["messages"],
+            [
+                {"role": "user", "content": "Context...\n\nhi <b>there</b>"},
+                {"role": "assistant", "content": "hello\n\n```py\nx = 1\n```"},
+            ],
+        )
+
+    def test_openai_tool_rounds(self):
+        self.history.add_message("user", "read it")
+        self.history.add_message("assistant", "", tool_calls=[TOOL_CALL, TOOL_CALL])
+        self.history.add_message("tool", "first", tool_name="read_file")
+        self.history.add_message("tool", "second", tool_name="read_file")
+        self.history.add_message("tool", "orphan", tool_name="read_file")
+        self.history.add_message("assistant", "done")
+
+        messages = json.loads(self.export(self.history.current_session, "openai"))["messages"]
+        calls = messages[1]["tool_calls"]
+        self.assertIsNone(messages[1]["content"])
+        self.assertEqual([c["id"] for c in calls], ["call_1", "call_2"])
+        self.assertEqual(calls[0]["type"], "function")
+        self.assertEqual(calls[0]["function"], {"name": "read_file", "arguments": '{"path": "README.md"}'})
+        # Each result answers its call in order; one no call asked for is left out
+        self.assertEqual(
+            [(m["role"], m.get("tool_call_id"), m["content"]) for m in messages[2:]],
+            [("tool", "call_1", "first"), ("tool", "call_2", "second"), ("assistant", None, "done")],
+        )
+
+    def test_html_escapes_raw_html(self):
+        text = self.export(self.session(), "html")
+        self.assertIn("<!DOCTYPE html>", text)
+        self.assertIn("hi &lt;b&gt;there&lt;/b&gt;", text)
+        self.assertNotIn("<b>there</b>", text)
+        self.assertIn('<code class="language-py">x = 1', text)
+        self.assertTrue(text.endswith("</html>\n"))
+
+    def test_export_file_leaves_no_partial_output(self):
+        target = self.dir / "out.md"
+        with self.assertRaises(OSError):
+            export_file(str(self.dir / "h" / "missing.jsonl"), "md", str(target))
+        self.assertEqual(list(self.dir.glob("out.md*")), [])
+
+    def test_export_many(self):
+        first = self.session()
+        self.history.create_session()
+        self.history.add_message("user", "second")
+        second = self.history.current_session
+        missing = self.dir / "h" / "chat_session_missing.jsonl"
+
+        results = {
+            Path(session).name: (output.name, count, error)
+            for session, output, count, error in export_many(
+                [Path(first), Path(second), missing], "openai", self.dir / "out", jobs=2
+            )
+        }
+        self.assertEqual(results[Path(first).name][:2], (Path(first).stem + ".openai.jsonl", 2))
+        self.assertEqual(results[Path(second).name][1], 1)
+        self.assertIsNone(results[Path(second).name][2])
+        self.assertIsNotNone(results[missing.name][2])
+        self.assertEqual(len(list((self.dir / "out").iterdir())), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
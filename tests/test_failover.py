@@ -0,0 +1,207 @@
+"""Routing and failover of OllamaClient across stub hosts (python -m unittest discover tests)"""
+import asyncio
+import json
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.api.ollama import OllamaClient, OllamaError  # noqa: E402
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+
+MODEL = "stub:latest"
+TOOL_CALL = {"function": {"name": "read_file", "arguments": {"path": "README.md"}}}
+
+
+class StubHost(BaseHTTPRequestHandler):
+    """Ollama stand-in; `mode` decides how /api/chat behaves:
+
+    ok        streams "hello world" and finishes
+    drop      closes the connection before sending a response
+    partial   streams one token, then closes mid-body
+    tools     streams a tool call without text, then closes mid-body
+    error     streams an error line, as Ollama does when generation fails
+    missing   answers 404 as Ollama does for a model that is not pulled
+    """
+
+    protocol_version = "HTTP/1.1"
+    mode = "ok"
+    resident = False
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": MODEL}]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": [{"name": MODEL}] if self.resident else []})
+        else:
+            self._send_json({}, 404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.chat_requests += 1
+        if self.mode == "drop":
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if self.mode == "missing":
+            self._send_json({"error": f"model '{MODEL}' not found"}, 404)
+            return
+
+        lines = [
+            {"message": {"role": "assistant", "content": "hello "}, "done": False},
+            {"message": {"role": "assistant", "content": "world"}, "done": False},
+            {"message": {"role": "assistant", "content": ""}, "done": True},
+        ]
+        if self.mode == "tools":
+            lines[0] = {"message": {"role": "assistant", "content": "", "tool_calls": [TOOL_CALL]}, "done": False}
+        elif self.mode == "error":
+            lines[1] = {"error": "model runner has unexpectedly stopped"}
+        body = b"".join((json.dumps(line) + "\n").encode() for line in lines)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.mode in ("partial", "tools"):
+            # Fewer bytes than announced, then hang up: the stream breaks after a token
+            self.wfile.write((json.dumps(lines[0]) + "\n").encode())
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.wfile.write(body)
+
+
+def start_host(mode: str = "ok", resident: bool = False) -> ThreadingHTTPServer:
+    handler = type("Handler", (StubHost,), {"mode": mode, "resident": resident})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.chat_requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def unused_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+class FailoverTest(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.tmp.cleanup()
+
+    def host(self, mode: str = "ok", resident: bool = False) -> ThreadingHTTPServer:
+        server = start_host(mode, resident)
+        self.servers.append(server)
+        return server
+
+    def client(self, *urls: str) -> OllamaClient:
+        environ = {"ONC_OLLAMA__HOSTS": ",".join(urls), "ONC_MODEL": MODEL}
+        return OllamaClient(Config(Path(self.tmp.name) / "config.json", environ=environ))
+
+    def chat(self, client: OllamaClient, tool_calls=None):
+        """Collect the streamed tokens, and the error if the stream failed"""
+        tokens = []
+
+        async def run():
+            async with client:
+                try:
+                    messages = [{"role": "user", "content": "hi"}]
+                    async for token in client.chat(messages, tool_calls=tool_calls):
+                        tokens.append(token)
+                except OllamaError as e:
+                    return e
+            return None
+
+        return tokens, asyncio.run(run())
+
+    def pool_host(self, client: OllamaClient, server: ThreadingHTTPServer):
+        return next(host for host in client.pool.hosts if host.url == url(server))
+
+    def test_routes_to_healthy_host(self):
+        good = self.host()
+        client = self.client(unused_url(), url(good))
+        tokens, error = self.chat(client)
+        self.assertIsNone(error)
+        self.assertEqual("".join(tokens), "hello world")
+        self.assertFalse(client.pool.hosts[0].healthy)
+        self.assertEqual(good.chat_requests, 1)
+
+    def test_affinity_prefers_resident_host(self):
+        cold, warm = self.host(), self.host(resident=True)
+        client = self.client(url(cold), url(warm))
+        tokens, error = self.chat(client)
+        self.assertIsNone(error)
+        self.assertEqual((cold.chat_requests, warm.chat_requests), (0, 1))
+
+    def test_fails_over_when_dropped_before_first_token(self):
+        flaky, good = self.host("drop", resident=True), self.host()
+        client = self.client(url(flaky), url(good))
+        tokens, error = self.chat(client)
+        self.assertIsNone(error)
+        self.assertEqual("".join(tokens), "hello world")
+        self.assertEqual((flaky.chat_requests, good.chat_requests), (1, 1))
+        self.assertFalse(self.pool_host(client, flaky).healthy)
+
+    def test_no_retry_after_tokens_streamed(self):
+        broken, good = self.host("partial", resident=True), self.host()
+        client = self.client(url(broken), url(good))
+        tokens, error = self.chat(client)
+        self.assertIsInstance(error, OllamaError)
+        self.assertEqual(tokens, ["hello "])
+        self.assertEqual(good.chat_requests, 0)
+
+    def test_no_retry_after_tool_calls_streamed(self):
+        broken, good = self.host("tools", resident=True), self.host()
+        client = self.client(url(broken), url(good))
+        tool_calls = []
+        tokens, error = self.chat(client, tool_calls)
+        self.assertIsInstance(error, OllamaError)
+        self.assertEqual(tool_calls, [TOOL_CALL])
+        self.assertEqual(good.chat_requests, 0)
+
+    def test_error_line_raises(self):
+        failing = self.host("error")
+        tokens, error = self.chat(self.client(url(failing)))
+        self.assertIsInstance(error, OllamaError)
+        self.assertIn("unexpectedly stopped", str(error))
+        self.assertEqual(tokens, ["hello "])
+
+    def test_client_error_keeps_host_healthy(self):
+        missing, good = self.host("missing", resident=True), self.host()
+        client = self.client(url(missing), url(good))
+        tokens, error = self.chat(client)
+        self.assertIsNone(error)
+        self.assertEqual("".join(tokens), "hello world")
+        self.assertEqual(missing.chat_requests, 1)
+        self.assertTrue(self.pool_host(client, missing).healthy)
+
+
+if __name__ == "__main__":
+    unittest.main()
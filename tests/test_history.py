@@ -0,0 +1,101 @@
+"""Session branching and prefix resolution of HistoryManager (python -m unittest discover tests)"""
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.history import HistoryManager, iter_session  # noqa: E402
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.history = self.manager("jsonl")
+
+    def manager(self, fmt: str) -> HistoryManager:
+        environ = {"ONC_HISTORY__SAVE_DIR": str(Path(self.tmp.name) / "h"), "ONC_HISTORY__FORMAT": fmt}
+        return HistoryManager(Config(Path(self.tmp.name) / "config.json", environ=environ))
+
+    def say(self, *contents):
+        for content in contents:
+            self.history.add_message("user", content)
+
+    def contents(self, messages):
+        return [m["content"] for m in messages]
+
+    def test_messages_are_appended_and_reloaded(self):
+        self.say("one", "two")
+        session = self.history.current_session
+        fresh = self.manager("jsonl")
+        self.assertEqual(self.contents(fresh.load_session(session)), ["one", "two"])
+
+    def test_branch_stores_only_its_own_suffix(self):
+        self.say("one", "two", "three")
+        root = self.history.current_session
+        branch = self.history.branch(2)
+        self.say("alt three")
+
+        self.assertEqual(self.contents(self.history.read_messages(branch)), ["alt three"])
+        self.assertEqual(self.contents(self.history.resolve_messages(branch)), ["one", "two", "alt three"])
+        self.assertEqual(self.contents(iter_session(branch)), ["one", "two", "alt three"])
+        # The parent is untouched
+        self.assertEqual(self.contents(self.history.resolve_messages(root)), ["one", "two", "three"])
+        self.assertEqual(
+            self.history.branches(), {Path(branch).name: {"parent": Path(root).name, "parent_messages": 2}}
+        )
+
+    def test_branch_links_to_the_closest_ancestor_holding_the_prefix(self):
+        self.say("one", "two", "three")
+        root = Path(self.history.current_session).name
+        first = Path(self.history.branch(2)).name
+        self.say("alt three")
+        # Keeping one message needs nothing from the first branch
+        second = Path(self.history.branch(1)).name
+        self.say("alt two")
+
+        links = self.history.branches()
+        self.assertEqual(links[second], {"parent": root, "parent_messages": 1})
+        self.assertEqual(self.contents(self.history.messages), ["one", "alt two"])
+        self.assertEqual([p.name for p in self.history.family()], [root, first, second])
+
+    def test_branch_of_a_branch_resolves_through_the_chain(self):
+        self.say("one", "two")
+        self.history.branch(1)
+        self.say("b")
+        nested = self.history.branch(2)
+        self.say("c")
+        fresh = self.manager("jsonl")
+        self.assertEqual(self.contents(fresh.load_session(nested)), ["one", "b", "c"])
+
+    def test_resolved_prefix_follows_a_parent_that_changes(self):
+        self.say("one")
+        root = self.history.current_session
+        branch = self.history.branch(1)
+        self.assertEqual(self.contents(self.history.resolve_messages(branch)), ["one"])
+
+        lines = Path(root).read_text().splitlines()
+        message = json.loads(lines[1])
+        message["content"] = "edited"
+        Path(root).write_text("\n".join([lines[0], json.dumps(message)]) + "\n")
+        self.assertEqual(self.contents(self.history.resolve_messages(branch)), ["edited"])
+
+    def test_branch_without_a_session_fails(self):
+        with self.assertRaises(ValueError):
+            self.history.branch(0)
+
+    def test_markdown_sessions_branch_too(self):
+        self.history = self.manager("md")
+        self.say("one", "two")
+        branch = self.history.branch(1)
+        self.say("alt two")
+        self.assertTrue(branch.endswith(".md"))
+        self.assertEqual(self.contents(self.manager("md").load_session(branch)), ["one", "alt two"])
+
+
+if __name__ == "__main__":
+    unittest.main()
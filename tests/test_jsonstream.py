@@ -0,0 +1,94 @@
+"""Incremental JSON parsing and early schema aborts (python -m unittest discover tests)"""
+import json
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.jsonstream import JSONStream, JSONStreamError, SchemaError  # noqa: E402
+
+SCHEMA = {
+    "type": "array",
+    "maxItems": 2,
+    "items": {
+        "type": "object",
+        "properties": {"id": {"type": "integer"}, "tag": {"enum": ["x", "y"]}},
+        "required": ["id"],
+        "additionalProperties": False,
+    },
+}
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    roll = rng.random()
+    if depth > 3 or roll < 0.4:
+        return rng.choice([1, -2.5, 'x\\y"z', True, None, False, "", 0, 1e10, "é ☃"])
+    if roll < 0.7:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}": random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+
+
+class JSONStreamTest(unittest.TestCase):
+    def stream(self, text: str, schema=None, step: int = 3):
+        """Feed text in step-sized chunks, keeping the reported items on the stream"""
+        items = []
+        stream = JSONStream(schema, on_item=lambda path, value: items.append((path, value)))
+        stream.items_seen = items
+        for start in range(0, len(text), step):
+            stream.feed(text[start:start + step])
+        stream.finish()
+        return stream
+
+    def test_matches_json_loads_at_any_chunk_size(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            value = random_value(rng)
+            text = json.dumps(value, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+            stream = self.stream(text, step=rng.randint(1, 7))
+            self.assertEqual(stream.value, value, text)
+
+    def test_reports_top_level_items_as_they_complete(self):
+        stream = self.stream('[1, "two", {"three": [3]}]')
+        self.assertEqual(stream.items_seen, [([0], 1), ([1], "two"), ([2], {"three": [3]})])
+
+    def test_invalid_json_fails_at_the_bad_character(self):
+        for text in ("[1,,2]", '{"a" 1}', "[1] x", "[01]", "tru", "[1, 2"):
+            with self.subTest(text=text), self.assertRaises(JSONStreamError):
+                self.stream(text)
+
+    def test_stops_before_the_end_when_the_output_goes_wrong(self):
+        stream = JSONStream()
+        with self.assertRaises(JSONStreamError):
+            stream.feed('{"a": 1,, ')
+        # The rest of the generation is never needed to know it is broken
+        self.assertLess(stream.parser.pos, 20)
+
+    def test_schema_accepts_valid_output(self):
+        stream = self.stream('[{"id": 1, "tag": "x"}, {"id": 2}]', SCHEMA)
+        self.assertEqual(stream.value, [{"id": 1, "tag": "x"}, {"id": 2}])
+
+    def test_schema_violations_abort(self):
+        cases = {
+            "wrong top-level type": '{"id": 1}',
+            "unknown property": '[{"id": 1, "bad": 2}]',
+            "wrong member type": '[{"id": "s"}]',
+            "missing required": '[{"tag": "x"}]',
+            "too many items": '[{"id": 1}, {"id": 2}, {"id": 3}]',
+            "not in enum": '[{"id": 1, "tag": "z"}]',
+        }
+        for name, text in cases.items():
+            with self.subTest(name), self.assertRaises(SchemaError):
+                self.stream(text, SCHEMA)
+
+    def test_unknown_property_aborts_at_its_key(self):
+        stream = JSONStream(SCHEMA)
+        text = '[{"id": 1, "bad": "' + "x" * 1000
+        with self.assertRaises(SchemaError):
+            stream.feed(text)
+        self.assertLess(stream.parser.pos, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Prompt history store and its fuzzy index (python -m unittest discover tests)"""
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.prompt_history import FuzzyIndex, SQLiteHistory  # noqa: E402
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    def index(self, entries):
+        index = FuzzyIndex()
+        index.build(entries)
+        return index
+
+    def test_span(self):
+        self.assertEqual(FuzzyIndex.span("git status", "gst"), 6)
+        # The backward pass starts the window at the latest "a" before the "b"
+        self.assertEqual(FuzzyIndex.span("xa ab", "ab"), 2)
+        self.assertEqual(FuzzyIndex.span("abc", "abc"), 3)
+        self.assertIsNone(FuzzyIndex.span("abc", "cb"))
+
+    def test_tight_matches_first_then_recent(self):
+        index = self.index(["refactor the parser", "run pytest", "rerun the pytest suite", "run pytest"])
+        self.assertEqual(index.search("rpy"), ["run pytest", "rerun the pytest suite"])
+        self.assertEqual(index.search("rpr"), ["refactor the parser"])
+        self.assertEqual(len(index), 3)
+
+    def test_query_is_case_and_space_insensitive(self):
+        index = self.index(["Explain   this\nfunction"])
+        self.assertEqual(index.search("EXPLAIN this fun"), ["Explain   this\nfunction"])
+        self.assertEqual(index.search("  "), ["Explain   this\nfunction"])
+
+    def test_long_entries_stay_fast(self):
+        # A pasted file: the scan is linear and only its start is indexed
+        entries = ["a" * 200_000 + "b"] * 50 + [f"prompt {i}" for i in range(5_000)]
+        index = self.index(list(dict.fromkeys(entries)) + ["a" * 100 + "x" * 100_000])
+        started = time.perf_counter()
+        self.assertEqual(index.search("a" * 30 + "b", limit=5), [])
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(len(index.search("prompt 4", limit=5)), 5)
+
+
+class SQLiteHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def test_entries_are_deduplicated_newest_first(self):
+        history = SQLiteHistory(self.dir / "h.db")
+        for text in ("one", "two", "one"):
+            history.store_string(text)
+            time.sleep(0.001)
+        self.assertEqual(list(history.load_history_strings()), ["one", "two"])
+
+    def test_legacy_file_is_migrated_once(self):
+        legacy = self.dir / ".prompt_history"
+        legacy.write_text("\n# 2024-01-01\n+first\n\n# 2024-01-02\n+multi\n+line\n\n# 2024-01-03\n+first\n")
+        history = SQLiteHistory(self.dir / "h.db", legacy_path=legacy)
+        self.assertEqual(list(history.load_history_strings()), ["first", "multi\nline"])
+
+        legacy.write_text(legacy.read_text() + "\n+added later\n")
+        again = SQLiteHistory(self.dir / "h.db", legacy_path=legacy)
+        self.assertEqual(list(again.load_history_strings()), ["first", "multi\nline"])
+
+
+if __name__ == "__main__":
+    unittest.main()
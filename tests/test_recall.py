@@ -0,0 +1,100 @@
+"""On-disk recall index: incremental updates and the projected search (python -m unittest discover tests)"""
+import asyncio
+import sys
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib import recall  # noqa: E402
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.history import HistoryManager  # noqa: E402
+
+DIM = 128
+
+
+class WordClient:
+    """Embeds text as a bag of hashed words, so texts sharing words are close"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    async def embed(self, texts, model=None):
+        self.embedded += len(texts)
+        vectors = []
+        for text in texts:
+            vector = [0.0] * DIM
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode()) % DIM] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+class RecallTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        environ = {"ONC_HISTORY__SAVE_DIR": str(Path(self.tmp.name) / "h")}
+        self.config = Config(Path(self.tmp.name) / "config.json", environ=environ)
+        self.history = HistoryManager(self.config)
+        self.client = WordClient()
+
+    def index(self) -> recall.RecallIndex:
+        return recall.RecallIndex(self.config, self.client, self.history)
+
+    def test_update_embeds_only_new_messages(self):
+        self.history.add_message("user", "how do I parse yaml")
+        self.history.add_message("assistant", "use yaml safe_load")
+        self.history.add_message("tool", "file output is not indexed")
+        index = self.index()
+        self.assertEqual(asyncio.run(index.update()), 2)
+        self.assertEqual(asyncio.run(index.update()), 0)
+
+        self.history.add_message("user", "and numpy arrays")
+        self.assertEqual(asyncio.run(self.index().update()), 1)
+        self.assertEqual(self.client.embedded, 3)
+
+        results = asyncio.run(self.index().search("and numpy arrays", k=2))
+        self.assertEqual(results[0]["content"], "and numpy arrays")
+        self.assertEqual(results[0]["index"], 3)
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+
+    def test_offsets_are_rebuilt_when_missing(self):
+        for word in ("alpha", "beta", "gamma"):
+            self.history.add_message("user", word)
+        asyncio.run(self.index().update())
+        index = self.index()
+        index.offsets_path.unlink()
+        self.assertEqual(asyncio.run(index.search("beta", k=1))[0]["content"], "beta")
+        self.assertTrue(index.offsets_path.exists())
+
+    def test_projected_search_matches_the_exact_scan(self):
+        rng = np.random.default_rng(0)
+        # Rows around a few topics, like the embeddings of one person's chats
+        topics = rng.standard_normal((8, DIM))
+        vectors = topics[rng.integers(0, 8, 600)] + 0.5 * rng.standard_normal((600, DIM))
+        vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+        index = self.index()
+        index._append(vectors[:500], [{"content": str(i)} for i in range(500)])
+
+        with mock.patch.object(recall, "EXACT_ROWS", 100), mock.patch.object(recall, "COARSE_CANDIDATES", 50):
+            index._get_coarse()
+            # Rows added once the projection exists extend it rather than refitting
+            index._append(vectors[500:], [{"content": str(i)} for i in range(500, 600)])
+            self.assertEqual(index.coarse_path.stat().st_size, 600 * recall.COARSE_DIM * 4)
+
+            for row in (3, 250, 555):
+                query = vectors[row] + 0.05 * rng.standard_normal(DIM).astype(np.float32)
+                query /= np.linalg.norm(query)
+                exact = np.argsort(vectors @ query)[::-1][:5]
+                found = [int(entry["content"]) for entry in index.nearest(query, 5)]
+                self.assertEqual(found, list(exact))
+
+
+if __name__ == "__main__":
+    unittest.main()
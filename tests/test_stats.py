@@ -0,0 +1,115 @@
+"""Incremental refresh of the `onc stats` message table (python -m unittest discover tests)"""
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.analytics import PARALLEL_MIN_FILES, HistoryStats  # noqa: E402
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.history import HistoryManager  # noqa: E402
+
+STATS = {"eval_count": 20, "eval_duration": 1e9, "ttft": 0.5}
+
+
+class StatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.history = self.manager("jsonl")
+
+    def manager(self, fmt: str) -> HistoryManager:
+        environ = {
+            "ONC_HISTORY__SAVE_DIR": str(Path(self.tmp.name) / "h"),
+            "ONC_HISTORY__FORMAT": fmt,
+            "ONC_MODEL": "stub:latest",
+        }
+        return HistoryManager(Config(Path(self.tmp.name) / "config.json", environ=environ))
+
+    def session(self, answers: int = 1) -> str:
+        self.history.create_session()
+        for _ in range(answers):
+            self.history.add_message("user", "question")
+            self.history.add_message("assistant", "answer", stats=STATS)
+        return self.history.current_session
+
+    def refresh(self, **kwargs):
+        """A fresh HistoryStats, as each `onc stats` run starts from the cache on disk"""
+        stats = HistoryStats(self.history)
+        return stats, stats.refresh(**kwargs)
+
+    def test_unchanged_sessions_are_reused(self):
+        self.session()
+        self.session(answers=2)
+        stats, counts = self.refresh()
+        self.assertEqual(counts, (2, 0))
+        self.assertEqual(len(stats.table), 6)
+
+        stats, counts = self.refresh()
+        self.assertEqual(counts, (0, 2))
+        self.assertEqual(len(stats.table), 6)
+
+    def test_appended_session_is_read_from_its_offset(self):
+        session = self.session()
+        stats, _ = self.refresh()
+        offset = stats.meta["sessions"][Path(session).name]["offset"]
+        self.assertEqual(offset, Path(session).stat().st_size)
+
+        self.history.add_message("user", "more")
+        # A line still being written is left for the next run
+        with open(session, "a", encoding="utf-8") as f:
+            f.write('{"role": "assistant", "cont')
+        stats, counts = self.refresh()
+        self.assertEqual(counts, (1, 0))
+        self.assertEqual(len(stats.table), 3)
+        added = len(json.dumps(self.history.messages[-1]) + "\n")
+        self.assertEqual(stats.meta["sessions"][Path(session).name]["offset"], offset + added)
+
+    def test_rewritten_and_deleted_sessions_are_dropped(self):
+        first = self.session(answers=2)
+        second = self.session()
+        self.refresh()
+
+        lines = Path(first).read_text().splitlines(keepends=True)
+        Path(first).write_text("".join(lines[:2]))
+        Path(second).unlink()
+        stats, counts = self.refresh()
+        self.assertEqual(counts, (1, 0))
+        self.assertEqual(list(stats.meta["sessions"]), [Path(first).name])
+        self.assertEqual(len(stats.table), 1)
+
+    def test_rebuild_ignores_the_cache(self):
+        self.session()
+        self.refresh()
+        stats, counts = self.refresh(rebuild=True)
+        self.assertEqual(counts, (1, 0))
+        self.assertEqual(len(stats.table), 2)
+
+    def test_markdown_sessions_in_worker_processes(self):
+        self.history = self.manager("md")
+        for _ in range(PARALLEL_MIN_FILES):
+            self.session()
+        stats, counts = self.refresh(jobs=2)
+        self.assertEqual(counts, (PARALLEL_MIN_FILES, 0))
+        self.assertEqual(len(stats.table), 2 * PARALLEL_MIN_FILES)
+
+    def test_aggregates(self):
+        self.session(answers=3)
+        self.session()
+        stats, _ = self.refresh()
+
+        (summary,) = stats.model_summary()
+        self.assertEqual((summary["model"], summary["sessions"], summary["answers"]), ("stub:latest", 2, 4))
+        self.assertEqual(summary["output_tokens"], 80)
+        self.assertEqual(list(summary["tokens_per_second"]), [20.0, 20.0, 20.0])
+
+        counts, dates = stats.messages_per_day(7)
+        self.assertEqual(len(dates), 7)
+        self.assertEqual(list(counts), [0] * 6 + [8])
+        self.assertEqual(stats.session_lengths()["max"], 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
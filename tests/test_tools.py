@@ -0,0 +1,102 @@
+"""Model tool calls: project confinement, limits and timeouts (python -m unittest discover tests)"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ollama_nvim_cli.lib.config import Config  # noqa: E402
+from ollama_nvim_cli.lib.context import ContextLoader  # noqa: E402
+from ollama_nvim_cli.lib.tools import MAX_PATTERN_CHARS, ToolRegistry  # noqa: E402
+
+
+class ToolsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        base = Path(self.tmp.name)
+        self.project = base / "project"
+        (self.project / "src").mkdir(parents=True)
+        (self.project / "src" / "app.py").write_text("def main():\n    return 1\n")
+        (self.project / "notes.txt").write_text("one\ntwo\nthree\n")
+        (self.project / "blob.bin").write_bytes(b"secret\0")
+        (base / "outside").mkdir()
+        (base / "outside" / "secret.txt").write_text("secret\n")
+        os.symlink(base / "outside", self.project / "link")
+
+        # Tools work relative to the directory the chat started in
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.project)
+        environ = {
+            "ONC_TOOLS__TIMEOUT": "1",
+            "ONC_TOOLS__ALLOW_COMMANDS": "true",
+            "ONC_CONTEXT__CACHE_DIR": str(base / "cache"),
+        }
+        config = Config(base / "config.json", environ=environ)
+        self.registry = ToolRegistry(config, ContextLoader(config))
+        self.addCleanup(self.registry.close)
+
+    def call(self, name: str, **arguments):
+        return self.registry.call({"function": {"name": name, "arguments": arguments}})
+
+    def test_read_file(self):
+        result = self.call("read_file", path="notes.txt", start_line=2, end_line=2)
+        self.assertEqual((result["content"], result["error"]), ("two\n", False))
+
+    def test_arguments_may_arrive_as_a_json_string(self):
+        result = self.registry.call({"function": {"name": "read_file", "arguments": '{"path": "notes.txt"}'}})
+        self.assertEqual(result["content"], "one\ntwo\nthree\n")
+
+    def test_paths_may_not_leave_the_project(self):
+        outside = str(Path(self.tmp.name) / "outside" / "secret.txt")
+        for path in ("../outside/secret.txt", outside, "link/secret.txt"):
+            with self.subTest(path=path):
+                result = self.call("read_file", path=path)
+                self.assertTrue(result["error"])
+                self.assertIn("outside the project", result["content"])
+
+    def test_globs_only_list_project_files(self):
+        for path in ("../*", "link/*", "**/*"):
+            with self.subTest(path=path):
+                listed = self.call("list_files", path=path)["content"].splitlines()
+                self.assertFalse([name for name in listed if "secret" in name], listed)
+        self.assertEqual(self.call("grep", pattern="secret", path="../*")["content"], "No matches")
+
+    def test_binary_files_are_refused(self):
+        self.assertIn("binary file", self.call("read_file", path="blob.bin")["content"])
+        self.assertEqual(self.call("grep", pattern="secret")["content"], "No matches")
+
+    def test_grep(self):
+        result = self.call("grep", pattern="RETURN", ignore_case=True)
+        self.assertEqual(result["content"], "src/app.py:2:     return 1")
+
+    def test_bad_patterns_are_reported(self):
+        self.assertTrue(self.call("grep", pattern="(")["error"])
+        result = self.call("grep", pattern="a" * (MAX_PATTERN_CHARS + 1))
+        self.assertIn("longer than", result["content"])
+
+    def test_backtracking_grep_times_out(self):
+        (self.project / "slow.txt").write_text("a" * 40 + "!\n")
+        started = time.monotonic()
+        result = self.call("grep", pattern="(a+)+$", path="slow.txt")
+        self.assertEqual(result["content"], "Error: timed out after 1s")
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_command_timeout_kills_its_children(self):
+        marker = self.project / "marker"
+        result = self.call("run_command", command=f"(sleep 2; touch {marker}) & wait")
+        self.assertEqual(result["content"], "Error: timed out after 1s")
+        time.sleep(2)
+        self.assertFalse(marker.exists())
+
+    def test_unknown_tool(self):
+        result = self.call("delete_everything")
+        self.assertTrue(result["error"])
+        self.assertIn("Unknown tool", result["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()